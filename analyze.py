@@ -0,0 +1,161 @@
+"""
+analyze.py — Headless Offline Video Analysis
+============================================
+Runs Detector → CentroidTracker → LaneManager → TrafficAnalyzer →
+SignalOptimizer over recorded footage as fast as the model allows: no
+rendering, no sleeping to TARGET_FPS, frames batched through the
+detector, files spread over a process pool (one model per worker).
+
+Per video it writes <out>/<name>.npz (columns, see core/offline.py), and
+summary.json for the whole run. --record also logs the detections
+(core/detection_log.py); .detlog inputs are replayed without the model.
+
+Usage:
+  python analyze.py ambulance.mp4 north.mp4 --out results/
+  python analyze.py footage/*.mp4 --workers 4 --batch 16 --stride 2 --record logs/
+  python analyze.py logs/*.detlog --out results/
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import config
+
+_detector = None   # One per worker process
+
+
+def _init_worker():
+    global _detector
+    from core.detector import Detector
+    _detector = Detector()
+
+
+def analyze_file(path: str, out_dir: str, batch: int = 8, stride: int = 1,
+                 width: int = None, height: int = None, record_dir: str = None) -> dict:
+    """Analyze one video (or replay one .detlog); returns its summary (plus timing)."""
+    from core.offline import OfflineAnalysis
+    from core.detection_log import DetectionRecorder, replay
+
+    if path.endswith(".detlog"):
+        return replay(path, out_dir)
+    if _detector is None:
+        _init_worker()
+    width  = width  or config.FRAME_WIDTH
+    height = height or config.FRAME_HEIGHT
+    name = os.path.splitext(os.path.basename(path))[0]
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        return {"name": name, "source": path, "error": "cannot open"}
+    fps = cap.get(cv2.CAP_PROP_FPS) or config.TARGET_FPS
+
+    run = OfflineAnalysis(width, height, name=name)
+    recorder = (DetectionRecorder(os.path.join(record_dir, f"{name}.detlog"), width, height, source=path)
+                if record_dir else None)
+    buffers = [np.empty((height, width, 3), np.uint8) for _ in range(batch)]
+    decode_buf = None
+    pending, stamps = [], []
+    source_frames = 0
+    wall0 = time.perf_counter()
+
+    def flush():
+        for t, dets in zip(stamps, _detector.detect_batch(pending)):
+            if recorder: recorder.record(t, dets)
+            run.step(t, dets)
+        pending.clear(); stamps.clear()
+
+    with run.running():
+        while cap.grab():
+            n = source_frames
+            source_frames += 1
+            if n % stride:
+                continue   # Grabbed, never decoded
+            ok, decode_buf = cap.retrieve(decode_buf)
+            if not ok:
+                break
+            pending.append(cv2.resize(decode_buf, (width, height), dst=buffers[len(pending)]))
+            stamps.append(n / fps)
+            if len(pending) == batch:
+                flush()
+        if pending:
+            flush()
+    cap.release()
+    if recorder: recorder.close()
+
+    wall = time.perf_counter() - wall0
+    out = run.save(os.path.join(out_dir, f"{name}.npz"))
+    summary = run.summary()
+    summary.update({
+        "source":         path,
+        "output":         out,
+        "source_frames":  source_frames,
+        "wall_seconds":   round(wall, 2),
+        "frames_per_s":   round(run.frames / wall, 1) if wall else 0.0,
+        "speedup":        round(source_frames / fps / wall, 2) if wall else 0.0,   # × real time
+    })
+    return summary
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Headless offline traffic analysis")
+    p.add_argument("videos", nargs="+", help="Video files to analyze (or .detlog files to replay)")
+    p.add_argument("--out",     type=str, default="analysis")
+    p.add_argument("--workers", type=int, default=None, help="Processes (default: min(files, 4))")
+    p.add_argument("--batch",   type=int, default=config.INFERENCE_MAX_BATCH, help="Frames per detector call")
+    p.add_argument("--stride",  type=int, default=1, help="Analyze every Nth source frame")
+    p.add_argument("--width",   type=int, default=config.FRAME_WIDTH)
+    p.add_argument("--height",  type=int, default=config.FRAME_HEIGHT)
+    p.add_argument("--record",  type=str, default=None, help="Also log detections to DIR/<video>.detlog")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    os.makedirs(args.out, exist_ok=True)
+    workers = max(1, args.workers or min(len(args.videos), 4))
+    job = dict(out_dir=args.out, batch=max(1, args.batch), stride=max(1, args.stride),
+               width=args.width, height=args.height, record_dir=args.record)
+    needs_model = any(not v.endswith(".detlog") for v in args.videos)
+
+    t0 = time.perf_counter()
+    if workers == 1:
+        results = [analyze_file(v, **job) for v in args.videos]
+    else:
+        with ProcessPoolExecutor(workers, mp_context=mp.get_context("spawn"),
+                                 initializer=_init_worker if needs_model else None) as pool:
+            futures = [pool.submit(analyze_file, v, **job) for v in args.videos]
+            results = [f.result() for f in futures]
+    wall = time.perf_counter() - t0
+
+    report = {
+        "files":         results,
+        "workers":       workers,
+        "wall_seconds":  round(wall, 2),
+        "video_seconds": round(sum(r.get("video_seconds", 0) for r in results), 1),
+        "frames":        sum(r.get("frames", 0) for r in results),
+    }
+    with open(os.path.join(args.out, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    for r in results:
+        if "error" in r:
+            print(f"  {r['name']:<24} ERROR: {r['error']}")
+            continue
+        print(f"  {r['name']:<24} {r['frames']:>6} frames  {r['frames_per_s']:>7.1f} fps  "
+              f"{r['speedup']:>5.2f}× real time  {r['unique_tracks']:>4} tracks  "
+              f"alerts {r['alerts'] or '-'}")
+    print(f"[Analyze] {report['frames']} frames / {report['video_seconds']}s of video in "
+          f"{report['wall_seconds']}s on {workers} worker(s) → {args.out}/summary.json")
+
+
+if __name__ == "__main__":
+    main()
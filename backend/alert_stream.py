@@ -0,0 +1,60 @@
+"""
+backend/alert_stream.py — Server-Sent Events Alert Stream
+==========================================================
+Pushes new alerts from the AlertStore to a client, starting after a
+client-supplied cursor (alert id). Shared by main.py and main_4way.py.
+
+Wire format (text/event-stream):
+    id: <alert_id>
+    event: alert
+    data: {...Alert.to_dict()...}
+"""
+
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+POLL_INTERVAL = 0.02   # Seconds between cursor checks (well under one frame)
+KEEPALIVE     = 15.0   # Seconds between comment pings on an idle stream
+
+
+def resolve_cursor(request: Request, cursor: Optional[int], store) -> int:
+    """Cursor from the query string, else Last-Event-ID, else 'only new alerts'."""
+    if cursor is None:
+        header = request.headers.get("last-event-id")
+        if header and header.isdigit():
+            cursor = int(header)
+    if cursor is None or cursor > store.last_id:
+        cursor = store.last_id
+    return max(0, cursor)
+
+
+async def alert_events(store, cursor: int, request: Request) -> AsyncIterator[str]:
+    """Yield SSE frames for every alert with id > cursor until the client leaves."""
+    yield "retry: 1000\n\n"
+    last_sent = time.monotonic()
+
+    while not await request.is_disconnected():
+        if store.last_id > cursor:
+            for alert in store.since(cursor):
+                cursor = alert.alert_id
+                yield f"id: {cursor}\nevent: alert\ndata: {json.dumps(alert.to_dict())}\n\n"
+            last_sent = time.monotonic()
+        elif time.monotonic() - last_sent > KEEPALIVE:
+            yield ": keepalive\n\n"
+            last_sent = time.monotonic()
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+def alert_stream_response(store, request: Request, cursor: Optional[int]) -> StreamingResponse:
+    """Build the StreamingResponse for /api/alerts/stream."""
+    start = resolve_cursor(request, cursor, store)
+    return StreamingResponse(
+        alert_events(store, start, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,225 @@
+"""
+backend/clip_recorder.py — Pre/Post-Roll Incident Clips
+=======================================================
+Keeps the last few seconds of every camera view as the JPEG bytes the
+stream already produces. When an accident or ambulance alert is raised,
+it writes pre-roll + post-roll to a clip file.
+
+  - JpegRing is bounded by bytes, not frame count, so a busy scene (bigger
+    JPEGs) holds fewer seconds instead of more memory. A triggered clip
+    takes its pre-roll out of the ring at once and collects post-roll as
+    frames arrive, so the ring only has to cover the pre-roll.
+  - Frames come from the processor's get_encoded_frame(), the cache
+    shared with /ws/video and MJPEG, at stream quality. A frame a viewer
+    already pulled costs nothing more, and the recorder thread encodes
+    the rest itself, never the compositor or capture thread.
+  - Triggers are read from the AlertStore by cursor (like the SSE stream),
+    so the analyzer is not touched. Alerts while a clip is still in
+    post-roll extend that clip (up to CLIP_MAX_SECONDS) instead of starting
+    an overlapping one.
+  - A separate writer thread does the file I/O. A clip is <id>.mjpeg
+    (concatenated JPEGs: `ffplay -f mjpeg clip.mjpeg`, or
+    `ffmpeg -f mjpeg -r <fps> -i clip.mjpeg clip.mp4`) plus <id>.json
+    with per-frame capture times, the alerts and a SHA-256 of the clip.
+
+    clips = ClipRecorder({"main": processor.get_encoded_frame}, analyzer.alert_store)
+    clips.start()
+"""
+
+import hashlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+
+class JpegRing:
+    """(capture_ts, frame_id, jpeg) in time order, at most max_bytes of JPEG."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: deque = deque()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.evicted = 0
+
+    def push(self, capture_ts: float, frame_id, jpg: bytes):
+        with self._lock:
+            self._items.append((capture_ts, frame_id, jpg))
+            self.bytes += len(jpg)
+            while self.bytes > self.max_bytes and len(self._items) > 1:
+                self.bytes -= len(self._items.popleft()[2])
+                self.evicted += 1
+
+    def window(self, start: float, end: float) -> List[tuple]:
+        with self._lock:
+            return [item for item in self._items if start <= item[0] <= end]
+
+    @property
+    def seconds(self) -> float:
+        with self._lock:
+            return self._items[-1][0] - self._items[0][0] if len(self._items) > 1 else 0.0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class ClipRecorder:
+    """
+    sources: view name → get_encoded() returning (frame_id, capture_ts, jpeg) or None.
+    views_for(alert) picks the views an alert concerns (default: all).
+    """
+
+    def __init__(self, sources: Dict[str, Callable[[], Optional[tuple]]], alert_store,
+                 views_for: Callable[[object], List[str]] = None, directory: str = None,
+                 pre: float = None, post: float = None, fps: float = None, ring_bytes: int = None):
+        self.sources = sources
+        self.alert_store = alert_store
+        self.views_for = views_for or (lambda alert: list(sources))
+        self.directory = directory or config.CLIP_DIR
+        self.pre  = config.CLIP_PRE_SECONDS  if pre  is None else pre
+        self.post = config.CLIP_POST_SECONDS if post is None else post
+        self.interval = 1.0 / (fps or config.CLIP_FPS)
+        self.rings = {view: JpegRing(ring_bytes or config.CLIP_RING_BYTES) for view in sources}
+
+        self._last_ids: Dict[str, object] = {}
+        self._cursor = alert_store.last_id          # Only alerts raised from now on
+        self._open: Dict[str, Dict] = {}            # view → clip still in post-roll
+        self._writes: queue.Queue = queue.Queue()
+        self._recent: deque = deque(maxlen=50)      # Written clips' metadata
+        self._running = False
+        self._threads: List[threading.Thread] = []
+
+        self.clips_written = 0
+        self.write_errors = 0
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._running = True
+        self._threads = [threading.Thread(target=self._run, name="clip-ring", daemon=True),
+                         threading.Thread(target=self._writer, name="clip-writer", daemon=True)]
+        for t in self._threads:
+            t.start()
+
+    def stop(self):
+        """Flush clips still in post-roll with what has been buffered."""
+        self._running = False
+        if not self._threads:
+            return
+        ring_thread, writer = self._threads
+        ring_thread.join(timeout=3.0)
+        for view in list(self._open):
+            self._writes.put(self._close(view))
+        self._writes.put(None)
+        writer.join(timeout=5.0)
+
+    # ── Ring thread ───────────────────────────────────────────────────────────
+    def _run(self):
+        while self._running:
+            start = time.time()
+            for view, get_encoded in self.sources.items():
+                encoded = get_encoded()
+                if encoded is None or encoded[0] == self._last_ids.get(view):
+                    continue
+                frame_id, capture_ts, jpg = encoded
+                self._last_ids[view] = frame_id
+                self.rings[view].push(capture_ts, frame_id, jpg)
+                clip = self._open.get(view)
+                if clip is not None:
+                    clip["frames"].append((capture_ts, frame_id, jpg))   # Post-roll, same bytes object
+
+            for alert in self.alert_store.since(self._cursor):
+                self._cursor = alert.alert_id
+                if alert.alert_type in config.CLIP_TRIGGERS:
+                    self._trigger(alert, start)
+            for view in [v for v, clip in self._open.items() if clip["end"] <= start]:
+                self._writes.put(self._close(view))
+
+            time.sleep(max(0.0, self.interval - (time.time() - start)))
+
+    def _trigger(self, alert, now: float):
+        for view in self.views_for(alert):
+            clip = self._open.get(view)
+            if clip is None:
+                clip = self._open[view] = {
+                    "id":    f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{alert.alert_id}-{view}",
+                    "view":  view,
+                    "start": now - self.pre,
+                    "alerts": [],
+                    # Pre-roll taken now, before the ring evicts it during post-roll
+                    "frames": self.rings[view].window(now - self.pre, now),
+                }
+            clip["end"] = min(now + self.post, clip["start"] + config.CLIP_MAX_SECONDS)
+            clip["alerts"].append(alert.to_dict())
+
+    def _close(self, view: str) -> Dict:
+        return self._open.pop(view)
+
+    # ── Writer thread ─────────────────────────────────────────────────────────
+    def _writer(self):
+        while True:
+            clip = self._writes.get()
+            if clip is None:
+                return
+            try:
+                self._write(clip)
+            except OSError as e:
+                self.write_errors += 1
+                print(f"[ClipRecorder] Failed to write {clip['id']}: {e}")
+
+    def _write(self, clip: Dict):
+        frames = clip.pop("frames")
+        if not frames:
+            return
+        path = os.path.join(self.directory, f"{clip['id']}.mjpeg")
+        digest = hashlib.sha256()
+        with open(path, "wb") as f:
+            for _, _, jpg in frames:
+                f.write(jpg)
+                digest.update(jpg)
+        span = frames[-1][0] - frames[0][0]
+        meta = {
+            **clip,
+            "file":          os.path.basename(path),
+            "sha256":        digest.hexdigest(),
+            "frame_count":   len(frames),
+            "first_capture": frames[0][0],
+            "last_capture":  frames[-1][0],
+            "fps":           round((len(frames) - 1) / span, 2) if span > 0 else 0.0,
+            "pre_roll_s":    round(clip["start"] + self.pre - frames[0][0], 2),
+            "frames":        [{"frame_id": fid, "capture_ts": ts, "bytes": len(jpg)}
+                              for ts, fid, jpg in frames],
+        }
+        with open(os.path.join(self.directory, f"{clip['id']}.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=1)
+        self.clips_written += 1
+        self._recent.appendleft({k: v for k, v in meta.items() if k != "frames"})
+        print(f"[ClipRecorder] {meta['file']}: {len(frames)} frames, {span:.1f}s")
+
+    # ── Reads ─────────────────────────────────────────────────────────────────
+    def recent(self) -> List[Dict]:
+        return list(self._recent)
+
+    def path(self, clip_id: str) -> Optional[str]:
+        """File of a written clip (only ids this recorder listed, no path traversal)."""
+        for meta in list(self._recent):
+            if meta["id"] == clip_id:
+                return os.path.join(self.directory, meta["file"])
+        return None
+
+    def get_stats(self) -> Dict:
+        return {
+            "clips_written": self.clips_written,
+            "write_errors":  self.write_errors,
+            "recording":     sorted(self._open),
+            "rings": {view: {"frames": len(r), "bytes": r.bytes, "seconds": round(r.seconds, 1),
+                             "evicted": r.evicted} for view, r in self.rings.items()},
+        }
@@ -0,0 +1,80 @@
+"""
+backend/frame_pool.py — Reusable Frame Buffers
+===============================================
+Preallocated buffers for the capture / annotate path, so steady-state
+frames cost no full-frame allocations.
+
+Frames are published by reference swap and never modified afterwards. A
+buffer goes back into rotation only when nothing else references it: not
+the published slot, not a consumer still reading it, not a view of it.
+CPython reference counts tell us that exactly, so a consumer that holds
+an old frame for a long time just makes the pool hand out another buffer.
+Only when every buffer is held does acquire() allocate, and that is
+counted.
+
+    pool = FramePool((720, 1280, 3), name="annotated")
+    buf = pool.acquire()
+    cv2.resize(src, (1280, 720), dst=buf)
+"""
+
+import sys
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+class FramePool:
+    def __init__(self, shape: Tuple[int, ...], dtype=np.uint8, max_buffers: int = 4,
+                 name: str = "frames"):
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        self.max_buffers = max_buffers
+        self.name = name
+        self._lock = threading.Lock()
+        self._buffers: List[np.ndarray] = [np.empty(self.shape, dtype)]
+        self._free_refs = self._refs(0)     # Refcount of a buffer only the pool holds
+
+        self.allocations = 1
+        self.acquires = 0
+
+    def _refs(self, i: int) -> int:
+        return sys.getrefcount(self._buffers[i])
+
+    def acquire(self) -> np.ndarray:
+        """A buffer nobody else references (contents undefined)."""
+        with self._lock:
+            self.acquires += 1
+            for i in range(len(self._buffers)):
+                if self._refs(i) <= self._free_refs:
+                    return self._buffers[i]
+            buf = np.empty(self.shape, self.dtype)
+            self.allocations += 1
+            if len(self._buffers) < self.max_buffers:
+                self._buffers.append(buf)
+            return buf
+
+    def get_stats(self) -> Dict:
+        return {
+            "shape":       list(self.shape),
+            "buffers":     len(self._buffers),
+            "acquires":    self.acquires,
+            "allocations": self.allocations,
+        }
+
+
+def alloc_stats(pools: List[FramePool], frame_allocs) -> Dict:
+    """Pool stats plus full-frame allocations per displayed frame (recent window)."""
+    recent = list(frame_allocs)
+    return {
+        "pools": {p.name: p.get_stats() for p in pools},
+        "allocs_per_frame": round(sum(recent) / len(recent), 3) if recent else 0.0,
+        "allocs_last_frame": recent[-1] if recent else 0,
+    }
+
+
+def alloc_samples(pools: List[FramePool], frame_allocs) -> List[tuple]:
+    """core.perf collector samples: pool allocations (counter), allocations per frame (gauge)."""
+    stats = alloc_stats(pools, frame_allocs)
+    return ([("counter", "pool_allocations", {"pool": p.name}, p.allocations) for p in pools]
+            + [("gauge", "allocs_per_frame", {}, stats["allocs_per_frame"])])
@@ -0,0 +1,40 @@
+"""
+backend/frame_protocol.py — Binary Video Frame Messages
+========================================================
+Raw JPEG frames for the /ws/video channel, replacing base64 inside the
+JSON state (≈33% smaller, no JSON encode of the image, no data-URI
+decode in the browser).
+
+Message layout (little-endian, 20-byte header + JPEG payload):
+
+    offset  size  field
+    0       4     magic        b"TFRM"
+    4       1     version      1
+    5       1     flags        reserved (0)
+    6       2     camera_id    0 = full / composite view
+    8       4     frame_id     capture-thread frame counter (wraps at 2^32)
+    12      8     capture_ts   unix seconds (float64) when the frame was read
+    20      …     JPEG bytes
+"""
+
+import struct
+from typing import Tuple
+
+MAGIC   = b"TFRM"
+VERSION = 1
+HEADER  = struct.Struct("<4sBBHId")
+
+
+def pack_frame(frame_id: int, capture_ts: float, jpeg: bytes,
+               camera_id: int = 0, flags: int = 0) -> bytes:
+    """Header + JPEG bytes as a single binary WebSocket message."""
+    return HEADER.pack(MAGIC, VERSION, flags, camera_id,
+                       frame_id & 0xFFFFFFFF, capture_ts) + jpeg
+
+
+def unpack_frame(msg: bytes) -> Tuple[int, int, float, bytes]:
+    """Inverse of pack_frame → (camera_id, frame_id, capture_ts, jpeg)."""
+    magic, version, _flags, camera_id, frame_id, ts = HEADER.unpack_from(msg)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a TFRM v1 frame message")
+    return camera_id, frame_id, ts, msg[HEADER.size:]
@@ -0,0 +1,268 @@
+"""
+backend/frame_source.py — Threaded Per-Camera Decoder
+======================================================
+One decoder thread per video source, publishing into a LATEST-only slot.
+
+  - Each source decodes and resizes on its own thread, so one slow or
+    stalled camera never holds up the others.
+  - The slot is one reference (frame_no, capture_ts, frame), swapped
+    atomically. Consumers (compositor, inference) read the freshest frame
+    independently and never block the decoder.
+  - A decoded frame no consumer took before the next one replaced it is
+    counted as a drop.
+  - Decoding and resizing reuse their buffers (backend/frame_pool.py), so
+    a running source allocates no frames.
+  - Every source frame is grab()bed, but only those on the display or
+    inference stride (FrameStride) are retrieve()d, i.e. decoded; the
+    others cost no decode, resize or copy.
+  - Files rewind at EOF; a source that fails to read is released and
+    reopened every `reopen_interval` seconds. Once its newest frame is
+    older than `stale_after`, is_stale() reports it so callers can show
+    it as stale.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from backend.frame_pool import FramePool
+from core.perf import perf
+
+
+class FrameSource:
+    """
+    Usage:
+        src = FrameSource("north.mp4", size=(640, 360), name="north")
+        src.start()
+        item = src.latest()          # (frame_no, capture_ts, frame) or None
+        item = src.latest_for_inference()
+        src.is_stale()
+    """
+
+    def __init__(self, path, size: Tuple[int, int], name: str = None, fps: float = None,
+                 stale_after: float = None, reopen_interval: float = None,
+                 display_every: int = None, infer_every: int = None):
+        self.path = path
+        self.size = size                                   # (width, height)
+        self.name = name or str(path)
+        self.fps_limit = fps or config.TARGET_FPS
+        self.stale_after = stale_after or config.SOURCE_STALE_SECONDS
+        self.reopen_interval = reopen_interval or config.SOURCE_REOPEN_INTERVAL
+        self.is_file = isinstance(path, str) and os.path.isfile(path)
+
+        self.stride = FrameStride(display_every, infer_every)
+        self._slot: Optional[tuple] = None                 # (frame_no, capture_ts, frame)
+        self._infer_slot: Optional[tuple] = None           # Same, inference stride only
+        self._pool = FramePool((size[1], size[0], 3), name=self.name)
+        self._decode_buf: Optional[np.ndarray] = None
+        self._taken_no = 0
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        # Counters
+        self.frames = 0
+        self.dropped = 0
+        self.read_failures = 0
+        self.reopens = 0
+        self.decode_allocations = 0
+        self._stamps: deque = deque(maxlen=64)
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"decode-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=3.0)
+
+    @property
+    def alive(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    # ── Decoder thread ────────────────────────────────────────────────────────
+    def _open(self):
+        cap = cv2.VideoCapture(self.path)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        return cap
+
+    def _grab(self, cap) -> bool:
+        if cap.grab():
+            return True
+        if self.is_file:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            return cap.grab()
+        return False
+
+    def _retrieve(self, cap) -> Optional[np.ndarray]:
+        ret, frame = cap.retrieve(self._decode_buf)
+        if not ret:
+            return None
+        if frame is not self._decode_buf:
+            self.decode_allocations += 1
+            self._decode_buf = frame
+        return frame
+
+    def _run(self):
+        frame_delay = 1.0 / self.fps_limit
+        cap = self._open()
+        while self._running:
+            if cap is None:
+                time.sleep(self.reopen_interval)
+                self.reopens += 1
+                cap = self._open()
+                continue
+
+            start_time = time.time()
+            display = infer = False
+            with perf.timer("capture", camera=self.name):
+                ok = self._grab(cap)
+            if ok:
+                display, infer = self.stride.next()
+                if display or infer:
+                    with perf.timer("decode", camera=self.name):
+                        frame = self._retrieve(cap)
+                    ok = frame is not None
+            if not ok:
+                self.read_failures += 1
+                print(f"[FrameSource] {self.name}: read failed, reopening.")
+                cap.release()
+                cap = None
+                continue
+            self.frames += 1
+            self._stamps.append(time.monotonic())
+
+            if display or infer:
+                with perf.timer("resize", camera=self.name):
+                    frame = cv2.resize(frame, self.size, dst=self._pool.acquire())
+                item = (self.frames, start_time, frame)
+                if display:
+                    prev = self._slot
+                    if prev is not None and prev[0] > self._taken_no:
+                        self.dropped += 1
+                    self._slot = item
+                if infer:
+                    self._infer_slot = item
+
+            if self.is_file:   # Files decode faster than real time; live cameras block in read()
+                time.sleep(max(0, frame_delay - (time.time() - start_time)))
+        if cap is not None:
+            cap.release()
+
+    # ── Consumers ─────────────────────────────────────────────────────────────
+    def latest(self) -> Optional[tuple]:
+        """Freshest (frame_no, capture_ts, frame); the frame must not be modified."""
+        slot = self._slot
+        if slot is not None and slot[0] > self._taken_no:
+            self._taken_no = slot[0]
+        return slot
+
+    def latest_for_inference(self) -> Optional[tuple]:
+        """Freshest frame on the inference stride (same shape as latest())."""
+        return self._infer_slot
+
+    @property
+    def latest_no(self) -> int:
+        """Number of the newest frame (0 before the first), without taking it."""
+        slot = self._slot
+        return slot[0] if slot else 0
+
+    @property
+    def inference_no(self) -> int:
+        slot = self._infer_slot
+        return slot[0] if slot else 0
+
+    def is_stale(self, now: float = None) -> bool:
+        slot = self._slot
+        return slot is None or (now or time.time()) - slot[1] > self.stale_after
+
+    @property
+    def fps(self) -> float:
+        stamps = self._stamps
+        if len(stamps) < 2 or time.monotonic() - stamps[-1] > self.stale_after:
+            return 0.0
+        return (len(stamps) - 1) / max(stamps[-1] - stamps[0], 1e-6)
+
+    @property
+    def allocations(self) -> int:
+        """Full-frame allocations so far (decode + resize buffers)."""
+        return self.decode_allocations + self._pool.allocations
+
+    def get_stats(self) -> Dict:
+        slot = self._slot
+        return {
+            "name":          self.name,
+            "source":        str(self.path),
+            "alive":         self.alive,
+            "stale":         self.is_stale(),
+            "fps":           round(self.fps, 1),
+            "frames":        self.frames,
+            "dropped":       self.dropped,
+            **self.stride.get_stats(),
+            "read_failures": self.read_failures,
+            "reopens":       self.reopens,
+            "age_ms":        round((time.time() - slot[1]) * 1000.0, 1) if slot else None,
+            "allocations":   self.allocations,
+        }
+
+    def perf_samples(self) -> list:
+        """Counters for core.perf collectors."""
+        labels = {"camera": self.name}
+        slot = self._slot
+        return [("counter", "frames_dropped", labels, self.dropped),
+                ("counter", "frames_decoded", labels, self.stride.decoded),
+                ("counter", "frames_skipped", labels, self.stride.skipped),
+                ("counter", "source_read_failures", labels, self.read_failures),
+                ("gauge", "source_frame_age_seconds", labels,
+                 round(time.time() - slot[1], 4) if slot else 0.0)]
+
+
+class FrameStride:
+    """
+    Which source frames to decode: every `display_every`-th for display and
+    every `infer_every`-th for inference. Frames on neither stride are
+    only grab()bed. Counts grabbed / decoded / skipped.
+
+        stride = FrameStride()
+        display, infer = stride.next()     # once per grabbed frame
+    """
+
+    def __init__(self, display_every: int = None, infer_every: int = None):
+        self.display_every = max(1, display_every or config.DISPLAY_EVERY_N_FRAMES)
+        self.infer_every   = max(1, infer_every or config.PROCESS_EVERY_N_FRAMES)
+        self.grabbed = 0
+        self.decoded = 0
+
+    def next(self) -> Tuple[bool, bool]:
+        n = self.grabbed
+        self.grabbed += 1
+        display = n % self.display_every == 0
+        infer   = n % self.infer_every == 0
+        if display or infer:
+            self.decoded += 1
+        return display, infer
+
+    @property
+    def skipped(self) -> int:
+        return self.grabbed - self.decoded
+
+    def get_stats(self) -> Dict:
+        return {
+            "grabbed":        self.grabbed,
+            "decoded":        self.decoded,
+            "skipped":        self.skipped,
+            "display_every":  self.display_every,
+            "infer_every":    self.infer_every,
+        }
@@ -0,0 +1,247 @@
+"""
+backend/incidents.py — Incident Capture Off the Render Path
+===========================================================
+The compositor only offer()s its latest annotated frame and analysis
+state (a reference swap). IncidentWorker evaluates the incident rules on
+its own thread at INCIDENT_EVAL_INTERVAL, and on a hit writes the
+snapshot and a thumbnail to disk. The compositor never encodes or waits.
+
+IncidentStore keeps the metadata: an append-only incidents.jsonl next to
+<id>.jpg / <id>_thumb.jpg, reloaded on start and pruned to INCIDENT_KEEP.
+store.json holds the next id and a random store epoch. Ids only increase
+within an epoch, and a wiped or new directory starts a new epoch, so
+(epoch, id) never names two different images. Clients poll
+/api/incidents?since=<last id>&epoch=<epoch> (a changed epoch resets the
+cursor) and fetch /api/incidents/<id>/image?epoch=<epoch>, which never
+changes once written (ETag + immutable caching).
+
+    store = IncidentStore(config.INCIDENT_DIR)
+    worker = IncidentWorker(store, on_change=lambda recent: ...)
+    worker.start()
+    worker.offer(frame, tracks, alerts, lane_stats)     # every composed frame
+"""
+
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+
+def evaluate(tracks, alerts: List[Dict], lane_stats: Dict) -> List[Dict]:
+    """Incident rules → [{"type", "description"}] (accident/ambulance, crowd, parking)."""
+    incidents = []
+    for a in alerts:
+        if a["severity"] not in ("critical", "high"):
+            continue
+        if a.get("type") == "accident" or a.get("alert_type") == "accident":
+            incidents.append({"type": "accident", "description": a["message"]})
+            break
+        if "AMBULANCE" in a["message"]:
+            incidents.append({"type": "ambulance",
+                              "description": f"Ambulance detected passing through {a['lane']} lane."})
+            break
+
+    person_count = sum(1 for t in tracks if t.is_person)
+    if person_count > config.INCIDENT_CROWD_SIZE:
+        incidents.append({"type": "crowd",
+                          "description": f"Large crowd of {person_count} pedestrians crossing."})
+
+    if not any(inc["type"] == "accident" for inc in incidents):
+        for lane, stats in lane_stats.items():
+            if stats.max_wait_time > config.INCIDENT_STALL_SECONDS:
+                incidents.append({"type": "parking",
+                                  "description": f"Potential stalled or illegally parked vehicle in {lane} lane."})
+                break
+    return incidents
+
+
+class IncidentStore:
+    """Incident metadata in memory + jsonl, snapshots as files."""
+
+    def __init__(self, directory: str = None, keep: int = None):
+        self.directory = directory or config.INCIDENT_DIR
+        self.keep = keep or config.INCIDENT_KEEP
+        os.makedirs(self.directory, exist_ok=True)
+        self._index_path = os.path.join(self.directory, "incidents.jsonl")
+        self._state_path = os.path.join(self.directory, "store.json")
+        self._lock = threading.Lock()
+        self._items: List[Dict] = []          # Oldest first
+        self.epoch, self._next_id = self._load_state()
+        self._load()
+        if self._items and self._items[-1]["id"] >= self._next_id:
+            self._next_id = self._items[-1]["id"] + 1
+        self._save_state()
+
+    def _load_state(self) -> tuple:
+        """(epoch, next_id) from store.json; a fresh epoch if it is missing or unreadable."""
+        try:
+            with open(self._state_path, encoding="utf-8") as f:
+                state = json.load(f)
+            return str(state["epoch"]), int(state["next_id"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return secrets.token_hex(4), 1
+
+    def _save_state(self):
+        tmp = self._state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"epoch": self.epoch, "next_id": self._next_id}, f)
+        os.replace(tmp, self._state_path)
+
+    def _load(self):
+        if not os.path.exists(self._index_path):
+            return
+        with open(self._index_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    continue   # Torn last line
+                if item.get("epoch") == self.epoch and os.path.exists(self.path(item["id"])):
+                    self._items.append(item)
+        self._items = self._items[-self.keep:]
+        self._rewrite_index()
+
+    def _rewrite_index(self):
+        tmp = self._index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for item in self._items:
+                f.write(json.dumps(item) + "\n")
+        os.replace(tmp, self._index_path)
+
+    def path(self, incident_id: int, thumb: bool = False) -> str:
+        return os.path.join(self.directory, f"{incident_id}{'_thumb' if thumb else ''}.jpg")
+
+    def add(self, found: List[Dict], timestamp: float, frame: np.ndarray) -> List[Dict]:
+        """Record incidents ({"type", "description"}) sharing one snapshot, encoded once."""
+        _, full = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, config.INCIDENT_JPEG_QUALITY])
+        h, w = frame.shape[:2]
+        tw = min(config.INCIDENT_THUMB_WIDTH, w)
+        small = cv2.resize(frame, (tw, max(1, h * tw // w)), interpolation=cv2.INTER_AREA)
+        _, thumb = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, 70])
+        full, thumb = full.tobytes(), thumb.tobytes()
+
+        with self._lock:
+            first_id = self._next_id
+            self._next_id += len(found)
+            self._save_state()          # Before any file exists, so ids are never reused
+        items = []
+        for incident_id, inc in enumerate(found, first_id):
+            for path, data in ((self.path(incident_id), full), (self.path(incident_id, thumb=True), thumb)):
+                with open(path, "wb") as f:
+                    f.write(data)
+            items.append({"id": incident_id, "epoch": self.epoch, "type": inc["type"],
+                          "description": inc["description"], "timestamp": timestamp,
+                          "bytes": len(full)})
+
+        with self._lock:
+            self._items.extend(items)
+            with open(self._index_path, "a", encoding="utf-8") as f:
+                for item in items:
+                    f.write(json.dumps(item) + "\n")
+            expired = self._items[:-self.keep]
+            if expired:
+                self._items = self._items[-self.keep:]
+                self._rewrite_index()
+        for old in expired:
+            for is_thumb in (False, True):
+                try:
+                    os.remove(self.path(old["id"], is_thumb))
+                except OSError:
+                    pass
+        return items
+
+    def since(self, incident_id: int = 0, limit: int = None) -> List[Dict]:
+        """Incidents newer than `incident_id`, newest first."""
+        with self._lock:
+            items = [i for i in self._items if i["id"] > incident_id]
+        items.reverse()
+        return items[:limit] if limit else items
+
+    def get(self, incident_id: int) -> Optional[Dict]:
+        with self._lock:
+            return next((i for i in self._items if i["id"] == incident_id), None)
+
+    @property
+    def latest_id(self) -> int:
+        with self._lock:
+            return self._items[-1]["id"] if self._items else 0
+
+
+class IncidentWorker:
+    """Latest-only hand-off from the compositor; rules + disk writes on this thread."""
+
+    def __init__(self, store: IncidentStore, on_change: Callable[[List[Dict]], None] = None,
+                 interval: float = None, cooldown: float = None):
+        self.store = store
+        self.on_change = on_change
+        self.interval = interval or config.INCIDENT_EVAL_INTERVAL
+        self.cooldown = config.INCIDENT_COOLDOWN if cooldown is None else cooldown
+        self._latest: Optional[tuple] = None
+        self._event = threading.Event()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._last_incident = 0.0
+        self._next_due = 0.0
+
+        self.evaluations = 0
+        self.captured = 0
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="incidents", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._event.set()
+        if self._thread:
+            self._thread.join(timeout=3.0)
+
+    def offer(self, frame: np.ndarray, tracks, alerts: List[Dict], lane_stats: Dict,
+              timestamp: float = None) -> bool:
+        """
+        Compositor side, every frame: takes a reference only when a check is
+        due (and outside the cooldown), so frames are not held in between.
+        The frame must not be modified afterwards.
+        """
+        now = timestamp or time.time()
+        if now < self._next_due or now - self._last_incident <= self.cooldown:
+            return False
+        self._next_due = now + self.interval
+        self._latest = (frame, tracks, alerts, lane_stats, now)
+        self._event.set()
+        return True
+
+    def _run(self):
+        while self._running:
+            self._event.wait()
+            self._event.clear()
+            item, self._latest = self._latest, None
+            if item is None:
+                continue
+            frame, tracks, alerts, lane_stats, ts = item
+            del item
+            self.evaluations += 1
+            found = evaluate(tracks, alerts, lane_stats)
+            if found:
+                self._last_incident = ts
+                try:
+                    self.captured += len(self.store.add(found, ts, frame))
+                except (OSError, cv2.error) as e:
+                    print(f"[Incidents] Snapshot write failed: {e}")
+                if self.on_change:
+                    self.on_change(self.store.since(0, limit=config.INCIDENT_RECENT))
+            del frame
+
+    def get_stats(self) -> Dict:
+        return {"evaluations": self.evaluations, "captured": self.captured,
+                "latest_id": self.store.latest_id}
@@ -10,10 +10,10 @@ import json
 import time
 import os
 import sys
-from typing import Set
+from typing import Optional
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
+from fastapi import FastAPI, Query, Request, WebSocket
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
@@ -21,6 +21,15 @@ import uvicorn
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
 from backend.video_processor import VideoProcessor
+from backend.mp_pipeline import MultiProcessVideoProcessor
+from backend.alert_stream import alert_stream_response
+from backend.mjpeg_stream import clamp_fps, mjpeg_response
+from backend.profiler import profile_response
+from backend.publisher import Publisher
+from backend.ws_hub import StateHub
+from backend.state_protocol import negotiate
+from core.perf import perf
+from core.lineage import lineage
 
 # ─── App Setup ────────────────────────────────────────────────────────────────
 app = FastAPI(
@@ -38,27 +47,17 @@ app.add_middleware(
 
 # ─── Globals ──────────────────────────────────────────────────────────────────
 processor: VideoProcessor = None
-active_websockets: Set[WebSocket] = set()
-latest_state: dict = {}
-main_event_loop: asyncio.AbstractEventLoop = None # Store the main event loop
+publisher = Publisher()
+state_hub = StateHub(publisher)
 
 # ─── Startup / Shutdown ───────────────────────────────────────────────────────
 @app.on_event("startup")
 async def startup():
-    global processor, main_event_loop
-    processor = VideoProcessor()
-    main_event_loop = asyncio.get_event_loop() # Capture the main event loop
-    
-    def on_state(state: dict):
-        global latest_state
-        latest_state = state
-        # Schedule broadcast (non-blocking)
-        # Use the captured main_event_loop to safely schedule coroutine from another thread
-        if main_event_loop and main_event_loop.is_running():
-            asyncio.run_coroutine_threadsafe(broadcast(state), main_event_loop)
-    
-    processor.start(on_state=on_state)
-    print("[Server] VideoProcessor started.")
+    global processor
+    processor = MultiProcessVideoProcessor() if config.PIPELINE_PROCESSES else VideoProcessor()
+    publisher.bind(asyncio.get_running_loop())
+    processor.start(publisher=publisher)
+    print(f"[Server] {type(processor).__name__} started.")
 
 @app.on_event("shutdown")
 async def shutdown():
@@ -67,36 +66,26 @@ async def shutdown():
 
 # ─── WebSocket ────────────────────────────────────────────────────────────────
 @app.websocket("/ws")
-async def websocket_endpoint(ws: WebSocket):
+async def websocket_endpoint(ws: WebSocket, proto: Optional[str] = None,
+                             fmt: Optional[str] = None, topics: Optional[str] = None):
+    """
+    State pushes, sent only when a topic changes (latest-only per client).
+    ?proto=2[&fmt=msgpack][&topics=metrics:5,signals,chart:2] → per-topic
+    snapshot + patches (backend/state_protocol.py); no params → protocol 1,
+    the full legacy state per change.
+    """
     await ws.accept()
-    active_websockets.add(ws)
-    print(f"[WS] Client connected. Total: {len(active_websockets)}")
-    
-    try:
-        while True:
-            # Keep alive + push state on demand
-            await asyncio.sleep(0.033)  # ~30fps push
-            if processor and processor.latest_metrics:
-                state = processor.get_state()
-                try:
-                    await ws.send_json(state)
-                except Exception:
-                    break
-    except WebSocketDisconnect:
-        pass
-    finally:
-        active_websockets.discard(ws)
-        print(f"[WS] Client disconnected. Total: {len(active_websockets)}")
-
-async def broadcast(state: dict):
-    """Broadcast state to all connected WebSocket clients."""
-    dead = set()
-    for ws in list(active_websockets):
-        try:
-            await ws.send_json(state)
-        except Exception:
-            dead.add(ws)
-    active_websockets -= dead
+    print(f"[WS] Client connected. Total: {state_hub.client_count + 1}")
+    await state_hub.serve(ws, *negotiate(proto, fmt), topics=topics)
+    print(f"[WS] Client disconnected. Total: {state_hub.client_count}")
+
+@app.websocket("/ws/video")
+async def video_endpoint(ws: WebSocket, fps: Optional[float] = None):
+    """Binary JPEG frames (see backend/frame_protocol.py): the "frame" topic only."""
+    await ws.accept()
+    rate = config.PUBLISH_RATES["frame"] if fps is None else fps
+    await state_hub.serve(ws, proto=2, topics={"frame": rate})
+
 
 # ─── REST Endpoints ───────────────────────────────────────────────────────────
 # Mount React assets
@@ -137,6 +126,28 @@ async def api_metrics():
         return JSONResponse(processor.latest_metrics)
     return JSONResponse({})
 
+@app.get("/api/alerts/stream")
+async def api_alert_stream(request: Request, cursor: Optional[int] = None):
+    """Server-Sent Events stream of alerts with id > cursor (or Last-Event-ID)."""
+    if processor is None:
+        return JSONResponse({"error": "not_started"}, status_code=503)
+    return alert_stream_response(processor.analyzer.alert_store, request, cursor)
+
+@app.get("/api/history")
+def api_history(lane: Optional[str] = None,
+                from_: Optional[float] = Query(None, alias="from"),
+                to: Optional[float] = None,
+                resolution: str = "auto"):
+    """Per-lane history from the on-disk rollups (unix seconds, resolution 1s|1m|1h|auto)."""
+    if processor is None or processor.history is None:
+        return JSONResponse({"error": "history disabled"}, status_code=503)
+    end   = to if to is not None else time.time()
+    start = from_ if from_ is not None else end - 3600
+    try:
+        return JSONResponse(processor.history.query(lane, start, end, resolution))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
 @app.get("/api/frame")
 async def api_frame():
     """Latest annotated frame as JPEG (for polling fallback)."""
@@ -147,6 +158,68 @@ async def api_frame():
             return Response(content=jpg, media_type="image/jpeg")
     return Response(status_code=204)
 
+@app.get("/api/clients")
+async def api_clients():
+    """Per-client /ws delivery stats: sent, dropped, lag."""
+    return state_hub.get_stats()
+
+@app.get("/api/pipeline")
+async def api_pipeline():
+    """Pipeline mode (threads / processes) and worker stats."""
+    if processor is None:
+        return JSONResponse({"error": "not_started"}, status_code=503)
+    return processor.get_pipeline_stats()
+
+@app.get("/api/clips")
+async def api_clips():
+    """Recently written incident clips (pre/post-roll), newest first."""
+    if processor is None or processor.clips is None:
+        return JSONResponse([])
+    return JSONResponse(processor.clips.recent())
+
+@app.get("/api/clips/{clip_id}")
+async def api_clip(clip_id: str):
+    """One clip as concatenated JPEGs (ffplay -f mjpeg); its .json sidecar sits next to it."""
+    path = processor.clips.path(clip_id) if processor is not None and processor.clips else None
+    if path is None or not os.path.exists(path):
+        return JSONResponse({"error": "not_found"}, status_code=404)
+    return FileResponse(path, media_type="video/x-motion-jpeg", filename=os.path.basename(path))
+
+@app.get("/api/perf")
+async def api_perf():
+    """Per-stage latency percentiles, counters and queue gauges."""
+    return perf.snapshot()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of the same."""
+    return PlainTextResponse(perf.prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/lineage")
+async def api_lineage(recent: int = 10):
+    """Glass-to-glass, overlay-age, analysis and decision latency percentiles, plus recent frame traces."""
+    return {**lineage.get_stats(), "recent": lineage.recent(max(0, min(recent, 100)))}
+
+@app.get("/api/lineage/trace.json")
+async def api_lineage_trace(last: Optional[int] = None):
+    """Recent frame traces as a Chrome trace file (chrome://tracing, ui.perfetto.dev)."""
+    return JSONResponse(lineage.chrome_trace(last),
+                        headers={"Content-Disposition": 'attachment; filename="lineage-trace.json"'})
+
+@app.get("/api/debug/profile")
+async def api_debug_profile(request: Request, seconds: float = 5.0, thread: str = "inference",
+                            format: str = "json"):
+    """Sampled collapsed stacks of one pipeline thread (or "loop"); needs DEBUG_TOKEN."""
+    return await profile_response(processor, request, seconds, thread, format)
+
+@app.get("/api/stream.mjpg")
+async def api_stream_mjpg(request: Request, fps: Optional[float] = None):
+    """MJPEG multipart stream of the annotated feed, capped at MJPEG_MAX_FPS."""
+    if processor is None:
+        return JSONResponse({"error": "not_started"}, status_code=503)
+    return mjpeg_response(lambda: processor.frame_id, processor.get_encoded_frame,
+                          request, clamp_fps(fps, config.MJPEG_MAX_FPS))
+
 @app.get("/health")
 async def health():
     return {"ok": True, "time": time.time()}
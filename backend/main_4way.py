@@ -4,62 +4,64 @@ backend/main_4way.py — FastAPI Server with 4-Way WebSocket Dashboard
 import asyncio
 import os
 import sys
-from typing import Set
+import time
+from typing import Optional
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
+from fastapi import FastAPI, Query, Request, WebSocket
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, PlainTextResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
-from backend.video_processor_4way import VideoProcessor4Way
+from backend.video_processor_4way import MultiCameraProcessor, VideoProcessor4Way
+from backend.topology import Topology
+from backend.alert_stream import alert_stream_response
+from backend.mjpeg_stream import clamp_fps, mjpeg_response
+from backend.profiler import profile_response
+from backend.publisher import Publisher
+from backend.ws_hub import StateHub
+from backend.state_protocol import negotiate
+from core.perf import perf
+from core.lineage import lineage
 
 app = FastAPI(title="AI Traffic 4-Way Dashboard", version="1.0.0")
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
-processor: VideoProcessor4Way = None
-active_websockets: Set[WebSocket] = set()
-main_event_loop: asyncio.AbstractEventLoop = None
+processor: MultiCameraProcessor = None
+publisher = Publisher()
+state_hub = StateHub(publisher)
 
-def init_processor(v_north, v_south, v_east, v_west):
+def init_processor(v_north=None, v_south=None, v_east=None, v_west=None, topology: str = None):
+    """A topology file (backend/topology.py) wins over the four classic feeds."""
     global processor
-    processor = VideoProcessor4Way(v_north, v_south, v_east, v_west)
+    if topology:
+        processor = MultiCameraProcessor(Topology.load(topology))
+    else:
+        processor = VideoProcessor4Way(v_north, v_south, v_east, v_west)
 
 @app.on_event("startup")
 async def startup():
-    global main_event_loop
-    main_event_loop = asyncio.get_event_loop()
-    def on_state(state: dict):
-        if main_event_loop and main_event_loop.is_running():
-            asyncio.run_coroutine_threadsafe(broadcast(state), main_event_loop)
+    publisher.bind(asyncio.get_running_loop())
     if processor:
-        processor.start(on_state=on_state)
+        processor.start(publisher=publisher)
 
 @app.on_event("shutdown")
 async def shutdown():
     if processor: processor.stop()
 
 @app.websocket("/ws")
-async def websocket_endpoint(ws: WebSocket):
+async def websocket_endpoint(ws: WebSocket, proto: Optional[str] = None,
+                             fmt: Optional[str] = None, topics: Optional[str] = None):
     await ws.accept()
-    active_websockets.add(ws)
-    try:
-        while True:
-            await asyncio.sleep(0.033)
-            if processor and processor.latest_metrics:
-                try: await ws.send_json(processor.get_state())
-                except Exception: break
-    except WebSocketDisconnect: pass
-    finally: active_websockets.discard(ws)
-
-async def broadcast(state: dict):
-    dead = set()
-    for ws in list(active_websockets):
-        try: await ws.send_json(state)
-        except Exception: dead.add(ws)
-    active_websockets -= dead
+    await state_hub.serve(ws, *negotiate(proto, fmt), topics=topics)
+
+@app.websocket("/ws/video")
+async def video_endpoint(ws: WebSocket, fps: Optional[float] = None):
+    await ws.accept()
+    rate = config.PUBLISH_RATES["frame"] if fps is None else fps
+    await state_hub.serve(ws, proto=2, topics={"frame": rate})
 
 assets_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "web-dashboard", "dist", "assets")
 dist_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "web-dashboard", "dist")
@@ -89,12 +91,133 @@ async def api_frame():
         jpg = processor.get_jpeg_frame()
         if jpg: return Response(content=jpg, media_type="image/jpeg")
     return Response(status_code=204)
+
+@app.get("/api/clients")
+async def api_clients():
+    return state_hub.get_stats()
+
+@app.get("/api/pipeline")
+async def api_pipeline():
+    """Per-camera decoder stats: fps, drops, staleness."""
+    if processor is None:
+        return JSONResponse({"error": "not_started"}, status_code=503)
+    return processor.get_pipeline_stats()
+
+@app.get("/api/clips")
+async def api_clips():
+    """Recently written incident clips (pre/post-roll), newest first."""
+    if processor is None or processor.clips is None:
+        return JSONResponse([])
+    return JSONResponse(processor.clips.recent())
+
+@app.get("/api/clips/{clip_id}")
+async def api_clip(clip_id: str):
+    """One clip as concatenated JPEGs (ffplay -f mjpeg); its .json sidecar sits next to it."""
+    path = processor.clips.path(clip_id) if processor is not None and processor.clips else None
+    if path is None or not os.path.exists(path):
+        return JSONResponse({"error": "not_found"}, status_code=404)
+    return FileResponse(path, media_type="video/x-motion-jpeg", filename=os.path.basename(path))
+
+@app.get("/api/perf")
+async def api_perf():
+    """Per-stage latency percentiles, counters and queue gauges."""
+    return perf.snapshot()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of the same."""
+    return PlainTextResponse(perf.prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/lineage")
+async def api_lineage(recent: int = 10):
+    """Glass-to-glass, overlay-age, analysis and decision latency percentiles, plus recent frame traces."""
+    return {**lineage.get_stats(), "recent": lineage.recent(max(0, min(recent, 100)))}
+
+@app.get("/api/lineage/trace.json")
+async def api_lineage_trace(last: Optional[int] = None):
+    """Recent frame traces as a Chrome trace file (chrome://tracing, ui.perfetto.dev)."""
+    return JSONResponse(lineage.chrome_trace(last),
+                        headers={"Content-Disposition": 'attachment; filename="lineage-trace.json"'})
+
+@app.get("/api/debug/profile")
+async def api_debug_profile(request: Request, seconds: float = 5.0, thread: str = "inference",
+                            format: str = "json"):
+    """Sampled collapsed stacks of one pipeline thread (or "loop"); needs DEBUG_TOKEN."""
+    return await profile_response(processor, request, seconds, thread, format)
+
+@app.get("/api/topology")
+async def api_topology():
+    """Cameras, junctions, approach polygons and composite grid being run."""
+    if processor is None:
+        return JSONResponse({"error": "not_started"}, status_code=503)
+    return processor.topology.to_dict()
+
+@app.get("/api/stream.mjpg")
+async def api_stream_mjpg(request: Request, fps: Optional[float] = None, camera: str = "composite"):
+    """MJPEG stream of the composite or one camera (by topology name or index 0–N)."""
+    if processor is None:
+        return JSONResponse({"error": "not_started"}, status_code=503)
+    cams = processor.cameras
+    names = [c.lower() for c in cams]     # Topology names keep their case; match case-insensitively
+    cam = int(camera) if camera.isdigit() else (names.index(camera.lower()) if camera.lower() in names else -1)
+    if not 0 <= cam < len(cams):
+        return JSONResponse({"error": f"unknown camera '{camera}'", "cameras": list(cams)}, status_code=400)
+    return mjpeg_response(lambda: processor.frame_id,
+                          lambda: processor.get_encoded_frame(camera=cam),
+                          request, clamp_fps(fps, config.MJPEG_MAX_FPS))
+
+@app.get("/api/alerts/stream")
+async def api_alert_stream(request: Request, cursor: Optional[int] = None):
+    """Server-Sent Events stream of alerts with id > cursor (or Last-Event-ID)."""
+    if processor is None:
+        return JSONResponse({"error": "not_started"}, status_code=503)
+    return alert_stream_response(processor.analyzer.alert_store, request, cursor)
+
+@app.get("/api/history")
+def api_history(lane: Optional[str] = None,
+                from_: Optional[float] = Query(None, alias="from"),
+                to: Optional[float] = None,
+                resolution: str = "auto"):
+    """Per-lane history from the on-disk rollups (unix seconds, resolution 1s|1m|1h|auto)."""
+    if processor is None or processor.history is None:
+        return JSONResponse({"error": "history disabled"}, status_code=503)
+    end   = to if to is not None else time.time()
+    start = from_ if from_ is not None else end - 3600
+    try:
+        return JSONResponse(processor.history.query(lane, start, end, resolution))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
 @app.get("/api/incidents")
-async def api_incidents():
-    """Returns the latest captured incident snapshots (Crowd, Ambulance, Accident, Parking)."""
-    if processor:
-        return JSONResponse(processor.get_incident_history())
-    return JSONResponse([])
+async def api_incidents(since: int = 0, epoch: Optional[str] = None, limit: Optional[int] = None):
+    """
+    Incident metadata (Crowd, Ambulance, Accident, Parking) newer than
+    ?since=<id>, newest first, as {"epoch", "incidents"}. Ids are only
+    comparable within one store epoch: a client sending a stale ?epoch= gets
+    the full list. Images: /api/incidents/<id>/image?epoch=<epoch>.
+    """
+    if processor is None:
+        return JSONResponse({"epoch": None, "incidents": []})
+    store_epoch = processor.incident_store.epoch
+    if epoch != store_epoch:
+        since = 0
+    return JSONResponse({"epoch": store_epoch,
+                         "incidents": processor.get_incident_history(since, limit)})
+
+@app.get("/api/incidents/{incident_id}/image")
+async def api_incident_image(incident_id: int, request: Request, epoch: str = "", thumb: bool = False):
+    """Incident snapshot (or ?thumb=1 thumbnail); written once per (epoch, id), cached forever."""
+    store = processor.incident_store if processor is not None else None
+    if store is None or epoch != store.epoch or store.get(incident_id) is None:
+        return JSONResponse({"error": "not_found"}, status_code=404)
+    path = store.path(incident_id, thumb)
+    etag = f'"incident-{store.epoch}-{incident_id}{"-thumb" if thumb else ""}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    if not os.path.exists(path):
+        return JSONResponse({"error": "not_found"}, status_code=404)
+    return FileResponse(path, media_type="image/jpeg", headers=headers)
 
 from pydantic import BaseModel
 class SwapRequest(BaseModel):
@@ -102,7 +225,8 @@ class SwapRequest(BaseModel):
 
 @app.post("/api/swap-video")
 async def api_swap_video(req: SwapRequest):
-    if processor:
-        processor.set_quadrant_mapping(req.mapping)
+    if processor and not processor.set_tile_mapping(req.mapping):
+        return JSONResponse({"error": "mapping must be a permutation of camera indices",
+                             "cameras": len(processor.sources)}, status_code=400)
     return {"status": "ok"}
 
@@ -0,0 +1,71 @@
+"""
+backend/mjpeg_stream.py — MJPEG Multipart Video Stream
+=======================================================
+multipart/x-mixed-replace stream for video walls, VMS integrations and
+plain <img src> embeds. Shared by main.py and main_4way.py.
+
+Every client reads from the processor's shared JPEG cache, so N viewers
+cost one encode per frame (per quality/view), not N. Each client is
+rate-limited to its own fps (capped at config.MJPEG_MAX_FPS) and only
+ever receives the newest frame — a slow client skips frames instead of
+queueing them.
+"""
+
+import asyncio
+import time
+from typing import AsyncIterator, Callable, Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+BOUNDARY      = "frame"
+POLL_INTERVAL = 0.01   # Seconds between new-frame checks once a send is due
+
+
+def clamp_fps(fps: Optional[float], max_fps: float) -> float:
+    if fps is None or fps <= 0:
+        return max_fps
+    return min(fps, max_fps)
+
+
+async def mjpeg_parts(get_frame_id: Callable[[], int], get_encoded: Callable[[], Optional[tuple]],
+                      request: Request, fps: float) -> AsyncIterator[bytes]:
+    """Yield one multipart part per new frame, at most `fps` per second."""
+    interval = 1.0 / fps
+    last_id = None
+    next_due = time.monotonic()
+
+    while not await request.is_disconnected():
+        now = time.monotonic()
+        if now < next_due:
+            await asyncio.sleep(next_due - now)
+            continue
+        if get_frame_id() == last_id:
+            await asyncio.sleep(POLL_INTERVAL)
+            continue
+
+        # Cache miss encodes in a worker thread; a hit returns immediately
+        encoded = await asyncio.to_thread(get_encoded)
+        if encoded is None:
+            await asyncio.sleep(POLL_INTERVAL)
+            continue
+        last_id, capture_ts, jpg = encoded
+        yield (
+            f"--{BOUNDARY}\r\n"
+            f"Content-Type: image/jpeg\r\n"
+            f"Content-Length: {len(jpg)}\r\n"
+            f"X-Frame-Id: {last_id}\r\n"
+            f"X-Timestamp: {capture_ts:.3f}\r\n\r\n"
+        ).encode() + jpg + b"\r\n"
+        next_due = max(next_due + interval, time.monotonic())
+
+
+def mjpeg_response(get_frame_id: Callable[[], int], get_encoded: Callable[[], Optional[tuple]],
+                   request: Request, fps: float) -> StreamingResponse:
+    """Build the StreamingResponse for /api/stream.mjpg."""
+    return StreamingResponse(
+        mjpeg_parts(get_frame_id, get_encoded, request, fps),
+        media_type=f"multipart/x-mixed-replace; boundary={BOUNDARY}",
+        headers={"Cache-Control": "no-cache, no-store", "Pragma": "no-cache",
+                 "X-Accel-Buffering": "no"},
+    )
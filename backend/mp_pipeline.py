@@ -0,0 +1,433 @@
+"""
+backend/mp_pipeline.py — Multi-Process Pipeline
+================================================
+Optional replacement for VideoProcessor's threads (config.PIPELINE_PROCESSES)
+so capture, inference and the API each get their own interpreter and GIL:
+
+    capture process     decode + resize straight into a shared-memory
+                        FrameRing slot (backend/shm_ring.py)
+    inference process   newest ring frame, zero-copy → YOLO → tracker →
+                        lanes → analyzer, plus the SignalScheduler; results
+                        go back over a one-way Pipe (small pickled objects,
+                        never pixels)
+    API process         uvicorn + MultiProcessVideoProcessor: a receiver
+                        thread turns results into publisher topics, a render
+                        thread annotates the newest ring frame, copied into a
+                        pooled buffer
+
+MultiProcessVideoProcessor exposes what main.py uses on VideoProcessor:
+start/stop, frame_id, get_encoded_frame/get_jpeg_frame, latest_*,
+get_state, analyzer.alert_store (mirrored, same alert ids) and history
+(read side of the same SQLite file).
+"""
+
+import base64
+import multiprocessing as mp
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from backend.frame_pool import FramePool, alloc_stats
+from backend.frame_source import FrameStride
+from backend.clip_recorder import ClipRecorder
+from backend.shm_ring import FrameRing
+from core.detector import Detector
+from core.history_store import LaneHistoryStore
+from core.lane_manager import LaneManager
+from core.lineage import lineage
+from core.signal_optimizer import SignalOptimizer, SignalState
+from core.tracker import CentroidTracker
+from core.traffic_analyzer import TrafficAnalyzer
+
+CHART_INTERVAL = 0.5   # Seconds between chart snapshots sent by the inference process
+
+
+# ── Capture process ───────────────────────────────────────────────────────────
+def _capture_main(ring_name: str, video_path, width: int, height: int, fps: float, stop):
+    ring = FrameRing.attach(ring_name)
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"[Capture] ERROR: Cannot open: {video_path}")
+        ring.close()
+        return
+    frame_delay = 1.0 / fps
+    stride = FrameStride()
+    frame = None
+    try:
+        while not stop.is_set():
+            start_time = time.time()
+            if not cap.grab():
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                continue
+            if not any(stride.next()):   # Off both strides: grabbed, never decoded
+                time.sleep(max(0, frame_delay - (time.time() - start_time)))
+                continue
+            ret, frame = cap.retrieve(frame)    # Decode buffer reused across frames
+            if not ret:
+                frame = None
+                continue
+            frame_no, slot = ring.begin_write()
+            cv2.resize(frame, (width, height), dst=slot)
+            ring.commit(frame_no, start_time)
+            time.sleep(max(0, frame_delay - (time.time() - start_time)))
+    finally:
+        cap.release()
+        ring.close()
+
+
+# ── Inference process ─────────────────────────────────────────────────────────
+def _inference_main(ring_name: str, conn, stop, width: int, height: int):
+    from core.signal_scheduler import SignalScheduler
+
+    ring = FrameRing.attach(ring_name)
+    detector  = Detector()
+    tracker   = CentroidTracker(max_disappeared=8, max_distance=100)
+    lane_mgr  = LaneManager(width, height)
+    analyzer  = TrafficAnalyzer()
+    optimizer = SignalOptimizer()
+    history   = LaneHistoryStore() if config.HISTORY_ENABLED else None
+    scheduler = SignalScheduler()
+    scheduler.add(optimizer)
+
+    send_lock = threading.Lock()
+
+    def send(msg: Dict):
+        with send_lock:
+            try:
+                conn.send(msg)
+            except (BrokenPipeError, EOFError, OSError):
+                stop.set()
+
+    def signal_metrics() -> Dict:
+        signals = scheduler.get_metrics()
+        signals["scheduler"] = scheduler.get_stats()
+        return signals
+
+    scheduler.subscribe(lambda key, _: send({"kind": "signals", "signals": signal_metrics()}))
+    if history:
+        history.start()
+    scheduler.start()
+
+    last_no, alert_cursor, last_chart = 0, 0, 0.0
+    overruns = 0
+    try:
+        while not stop.is_set():
+            item = ring.wait(last_no, timeout=0.5, copy=False)
+            if item is None:
+                continue
+            frame_no, capture_ts, view = item
+            skipped = frame_no - last_no - 1 if last_no else 0
+            last_no = frame_no
+
+            detections = detector.detect(view)
+            if not ring.valid(frame_no):
+                overruns += 1   # Slot reused mid-inference (ring too short): torn frame, drop it
+                continue
+            tracks     = tracker.update(detections)
+            lane_stats = lane_mgr.update(tracks)
+            if history:
+                history.record(lane_stats)
+            scheduler.submit(lane_stats)
+            analyzer.update(tracks, lane_stats, list(detections))
+
+            new_alerts = analyzer.alert_store.since(alert_cursor)
+            if new_alerts:
+                alert_cursor = new_alerts[-1].alert_id
+            now = time.time()
+            chart = None
+            if now - last_chart >= CHART_INTERVAL:
+                chart, last_chart = analyzer.get_chart_data(), now
+
+            send({
+                "kind":       "result",
+                "frame_no":   frame_no,
+                "capture_ts": capture_ts,
+                "detections": detections,
+                "tracks":     tracks,
+                "lane_stats": lane_stats,
+                "metrics":    analyzer.metrics,
+                "alerts":     [a.to_dict() for a in analyzer.alerts[-5:]],
+                "new_alerts": new_alerts,
+                "chart":      chart,
+                "signals":    signal_metrics(),
+                "stats":      {"frames_skipped": skipped, "overruns": overruns,
+                               "ring_retries": ring.retries},
+            })
+    finally:
+        scheduler.stop()
+        if history:
+            history.stop()
+        ring.close()
+
+
+# ── API-process side ──────────────────────────────────────────────────────────
+class MultiProcessVideoProcessor:
+    """
+    VideoProcessor surface over capture / inference worker processes.
+
+    Usage:
+        vp = MultiProcessVideoProcessor(video_path="traffic.mp4")
+        vp.start(publisher=pub)
+    """
+
+    def __init__(self, video_path=None, frame_width=None, frame_height=None,
+                 ring_slots: int = None):
+        self.video_path   = self._resolve_video(video_path)
+        self.frame_width  = frame_width  or config.FRAME_WIDTH
+        self.frame_height = frame_height or config.FRAME_HEIGHT
+        self.ring_slots   = ring_slots or config.SHM_RING_SLOTS
+
+        # Display-side mirrors: drawing, alert store, signal panel (no model)
+        self.lane_mgr  = LaneManager(self.frame_width, self.frame_height)
+        self.tracker   = CentroidTracker()
+        self.analyzer  = TrafficAnalyzer()
+        self.optimizer = SignalOptimizer()
+        self.history   = LaneHistoryStore() if config.HISTORY_ENABLED else None
+        self.clips     = (ClipRecorder({"main": self.get_encoded_frame}, self.analyzer.alert_store)
+                          if config.CLIP_ENABLED else None)
+
+        self.is_running = False
+        self.publisher  = None
+        self.ring: Optional[FrameRing] = None
+        self._procs: List[mp.Process] = []
+        self._conn = None
+        self._stop = None
+        self._threads: List[threading.Thread] = []
+
+        self.state_lock = threading.Lock()
+        self.shared_detections: List = []
+        self.shared_source: Optional[tuple] = None   # (frame_no, capture_ts) they came from
+        self.shared_tracks: List = []
+        self.shared_lane_stats: Dict = {}
+
+        self.latest_frame:   Optional[np.ndarray] = None
+        self.latest_metrics: Dict = {}
+        self.latest_alerts:  List = []
+        self.latest_signals: Dict = {}
+        self.latest_chart:   Dict = {}
+        self._worker_stats:  Dict = {}
+        self.results_received = 0
+
+        self._frame_slot: Optional[tuple] = None     # (frame_id, capture_ts, annotated)
+        self._encode_lock = threading.Lock()
+        self._jpeg_cache: Dict[int, tuple] = {}      # quality → (frame_id, bytes)
+        self._annotated_pool = FramePool((self.frame_height, self.frame_width, 3), name="annotated")
+        self._frame_allocs: deque = deque(maxlen=256)
+
+    def _resolve_video(self, path=None):
+        candidates = [path, config.VIDEO_PATH] + config.FALLBACK_VIDEO_PATHS
+        for c in candidates:
+            if c is None:
+                continue
+            if c == 0:
+                return 0
+            if os.path.isfile(str(c)):
+                return c
+        return 0
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+    def start(self, publisher=None):
+        self.publisher = publisher
+        self.is_running = True
+        ctx = mp.get_context("spawn")
+        self.ring = FrameRing.create((self.frame_height, self.frame_width, 3), slots=self.ring_slots)
+        self._stop = ctx.Event()
+        recv_conn, send_conn = ctx.Pipe(duplex=False)
+        self._conn = recv_conn
+
+        self._procs = [
+            ctx.Process(target=_capture_main, name="traffic-capture", daemon=True,
+                        args=(self.ring.name, self.video_path, self.frame_width,
+                              self.frame_height, config.TARGET_FPS, self._stop)),
+            ctx.Process(target=_inference_main, name="traffic-inference", daemon=True,
+                        args=(self.ring.name, send_conn, self._stop,
+                              self.frame_width, self.frame_height)),
+        ]
+        for p in self._procs:
+            p.start()
+        send_conn.close()   # The inference process holds the only write end
+
+        self._threads = [
+            threading.Thread(target=self._receiver_thread, name="mp-results", daemon=True),
+            threading.Thread(target=self._render_thread, name="mp-render", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        if self.clips:
+            self.clips.start()
+        print(f"[MultiProcess] Capture pid {self._procs[0].pid}, "
+              f"inference pid {self._procs[1].pid}, ring {self.ring.name} × {self.ring_slots}")
+
+    def stop(self):
+        self.is_running = False
+        if self._stop is not None:
+            self._stop.set()
+        for p in self._procs:
+            p.join(timeout=5.0)
+            if p.is_alive():
+                p.terminate()
+        for t in self._threads:
+            t.join(timeout=2.0)
+        if self.clips:
+            self.clips.stop()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+    # ── Results from the inference process ────────────────────────────────────
+    def _receiver_thread(self):
+        while self.is_running:
+            try:
+                if not self._conn.poll(0.2):
+                    continue
+                msg = self._conn.recv()
+            except (EOFError, OSError):
+                print("[MultiProcess] Inference process closed its channel.")
+                return
+            if msg["kind"] == "result":
+                self._apply_result(msg)
+            self._apply_signals(msg["signals"])
+
+    def _apply_result(self, msg: Dict):
+        store = self.analyzer.alert_store
+        store.expire(time.time())
+        for alert in msg["new_alerts"]:
+            store.add(alert)    # Same order as the inference store → same ids
+        self.analyzer.current_fps = msg["metrics"].get("fps", 0.0)
+        lineage.since("analysis", (msg["frame_no"], msg["capture_ts"]))
+
+        with self.state_lock:
+            self.shared_detections = msg["detections"]
+            self.shared_source     = (msg["frame_no"], msg["capture_ts"])
+            self.shared_tracks     = msg["tracks"]
+            self.shared_lane_stats = msg["lane_stats"]
+            self.latest_metrics    = msg["metrics"]
+            self.latest_alerts     = msg["alerts"]
+            if msg["chart"] is not None:
+                self.latest_chart = msg["chart"]
+            self._worker_stats = msg["stats"]
+        self.results_received += 1
+
+        if self.publisher:
+            self.publisher.publish("metrics", msg["metrics"])
+            self.publisher.publish("alerts", msg["alerts"])
+            if msg["chart"] is not None:
+                self.publisher.publish("chart", msg["chart"])
+
+    def _apply_signals(self, signals: Dict):
+        """Mirror signal state into the display-side optimizer for the panel."""
+        opt = self.optimizer
+        for name, s in signals["signals"].items():
+            sig = opt.signals.get(name)
+            if sig is not None:
+                sig.state, sig.time_left = SignalState(s["state"]), s["time_left"]
+        opt.emergency_active = signals["emergency_active"]
+        opt.emergency_lane   = signals["emergency_lane"]
+        self.latest_signals = signals
+        if self.publisher:
+            self.publisher.publish("signals", signals)
+
+    # ── Annotation (API process) ──────────────────────────────────────────────
+    def _render_thread(self):
+        last_no = 0
+        while self.is_running:
+            pooled = self._annotated_pool.allocations
+            item = self.ring.wait(last_no, timeout=0.5, out=self._annotated_pool.acquire())
+            if item is None:
+                continue
+            last_no, capture_ts, annotated = item
+
+            with self.state_lock:
+                current_detections = list(self.shared_detections)
+                overlay_source     = self.shared_source
+                current_tracks     = list(self.shared_tracks)
+                current_lane_stats = dict(self.shared_lane_stats)
+
+            trace = lineage.begin(last_no, capture_ts)
+            with lineage.span(last_no, "draw"):
+                self.lane_mgr.draw_lanes(annotated)
+                if current_detections:
+                    Detector.draw(annotated, current_detections)
+                if current_tracks:
+                    self.tracker.draw_tracks(annotated, current_tracks)
+                self.optimizer.draw_signal_panel(annotated, x=10, y=10)
+                self.analyzer.draw_overlay(annotated, current_lane_stats)
+
+            self.latest_frame = annotated
+            self._frame_slot  = (last_no, capture_ts, annotated)
+            lineage.since("overlay_age", overlay_source, capture_ts)
+            if trace is not None and overlay_source is not None:
+                trace.attrs["overlay_from"] = overlay_source[0]
+            if self.publisher:
+                self.publisher.publish_lazy("frame", self.get_encoded_frame, binary=True)
+            self._frame_allocs.append(self._annotated_pool.allocations - pooled)
+
+    # ── Reads (same as VideoProcessor) ────────────────────────────────────────
+    @property
+    def frame_id(self) -> int:
+        slot = self._frame_slot
+        return slot[0] if slot else 0
+
+    def get_encoded_frame(self, quality: int = None) -> Optional[tuple]:
+        """(frame_id, capture_ts, jpeg_bytes), encoded once per frame and quality."""
+        slot = self._frame_slot
+        if slot is None:
+            return None
+        frame_id, capture_ts, frame = slot
+        q = quality or config.STREAM_JPEG_QUALITY
+        with self._encode_lock:
+            cached = self._jpeg_cache.get(q)
+            if cached is None or cached[0] != frame_id:
+                with lineage.span(frame_id, "jpeg_encode"):
+                    _, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, q])
+                cached = (frame_id, buf.tobytes())
+                self._jpeg_cache[q] = cached
+        return frame_id, capture_ts, cached[1]
+
+    def get_jpeg_frame(self, quality: int = None) -> Optional[bytes]:
+        encoded = self.get_encoded_frame(quality)
+        return encoded[2] if encoded else None
+
+    def get_b64_frame(self) -> Optional[str]:
+        jpg = self.get_jpeg_frame()
+        return base64.b64encode(jpg).decode("utf-8") if jpg else None
+
+    def get_state(self, include_frame: bool = False) -> Dict:
+        state = {
+            "metrics": self.latest_metrics,
+            "alerts":  self.latest_alerts,
+            "signals": self.latest_signals,
+            "chart":   self.latest_chart,
+        }
+        if include_frame:
+            state["frame_b64"] = self.get_b64_frame()
+        return state
+
+    def profile_threads(self) -> Dict[str, threading.Thread]:
+        """Parent-side threads only; capture and inference run in worker processes."""
+        return {t.name: t for t in self._threads}
+
+    def get_pipeline_stats(self) -> Dict:
+        ring = self.ring
+        return {
+            "mode": "processes",
+            "processes": {p.name: {"pid": p.pid, "alive": p.is_alive()} for p in self._procs},
+            "ring": {
+                "name":      ring.name if ring else None,
+                "slots":     self.ring_slots,
+                "latest_no": ring.latest_no if ring else 0,
+                "render_retries": ring.retries if ring else 0,
+            },
+            "frames_rendered":  self.frame_id,
+            "results_received": self.results_received,
+            "inference":        dict(self._worker_stats),
+            "buffers":          alloc_stats([self._annotated_pool], self._frame_allocs),
+            "clips":            self.clips.get_stats() if self.clips else None,
+        }
@@ -0,0 +1,133 @@
+"""
+backend/profiler.py — On-Demand Sampling Profiler
+=================================================
+/api/debug/profile?seconds=N&thread=inference|capture|loop samples one
+live thread's Python stack for N seconds and returns collapsed stacks
+("outer;inner;leaf count" lines) for flamegraph.pl / speedscope.
+Shared by main.py and main_4way.py.
+
+  - Sampling reads sys._current_frames() from a worker thread; the target
+    is never traced or instrumented, so nothing changes when no profile
+    is running.
+  - Each sample holds the GIL (and so stalls the target) for as long as it
+    takes to walk one stack. The sampler measures that cost and backs off
+    its interval so it stays under PROFILE_MAX_OVERHEAD of wall time.
+  - Duration is clamped to PROFILE_MAX_SECONDS and one profile runs at a
+    time (409 otherwise).
+  - Disabled unless DEBUG_TOKEN is set; requests must send it as
+    "Authorization: Bearer <token>" or "X-Debug-Token: <token>".
+"""
+
+import asyncio
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+MAX_DEPTH = 128
+_busy = threading.Lock()
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Usage:
+        prof = SamplingProfiler(interval_ms=5, max_overhead=0.02)
+        result = prof.run(thread.ident, seconds=5)     # blocks; not from the target thread
+        print(result["collapsed"])
+    """
+
+    def __init__(self, interval_ms: float = None, max_overhead: float = None):
+        self.interval = (interval_ms or config.PROFILE_INTERVAL_MS) / 1000.0
+        self.max_overhead = max_overhead or config.PROFILE_MAX_OVERHEAD
+
+    def run(self, ident: int, seconds: float) -> Dict:
+        stacks: Counter = Counter()
+        interval = self.interval
+        samples = missed = 0
+        cost = 0.0
+        start = time.perf_counter()
+        deadline = start + seconds
+
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            frame = sys._current_frames().get(ident)
+            if frame is None:
+                missed += 1
+                if missed > 3:
+                    break   # Thread exited
+            else:
+                names = []
+                while frame is not None and len(names) < MAX_DEPTH:
+                    names.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                del frame
+                stacks[";".join(reversed(names))] += 1
+                samples += 1
+            spent = time.perf_counter() - t0
+            cost += spent
+            # Keep spent / (spent + sleep) under the cap
+            interval = max(interval, spent / self.max_overhead - spent)
+            time.sleep(min(interval, max(0.0, deadline - time.perf_counter())))
+
+        wall = max(time.perf_counter() - start, 1e-9)
+        return {
+            "seconds":     round(wall, 3),
+            "samples":     samples,
+            "interval_ms": round(interval * 1000.0, 3),
+            "overhead":    round(cost / wall, 5),
+            "collapsed":   "\n".join(f"{stack} {n}" for stack, n in stacks.most_common()),
+        }
+
+
+def authorized(request: Request) -> bool:
+    token = config.DEBUG_TOKEN
+    auth = request.headers.get("authorization", "")
+    given = auth[7:] if auth.lower().startswith("bearer ") else request.headers.get("x-debug-token", "")
+    return bool(token) and hmac.compare_digest(given.encode(), token.encode())
+
+
+def _resolve(processor, target: str, loop_ident: int) -> Optional[threading.Thread]:
+    """Processor-named threads (profile_threads()), then any live thread by name."""
+    if target == "loop":
+        return next((t for t in threading.enumerate() if t.ident == loop_ident), None)
+    named = processor.profile_threads() if processor is not None else {}
+    thread = named.get(target) or next((t for t in threading.enumerate() if t.name == target), None)
+    return thread if thread is not None and thread.is_alive() else None
+
+
+async def profile_response(processor, request: Request, seconds: float, thread: str,
+                           fmt: str = "json"):
+    """Run one capped profile of `thread` ("loop" = this event loop) off the loop."""
+    if not config.DEBUG_TOKEN:
+        return JSONResponse({"error": "disabled"}, status_code=404)
+    if not authorized(request):
+        return JSONResponse({"error": "unauthorized"}, status_code=401)
+
+    target = _resolve(processor, thread, threading.get_ident())
+    if target is None:
+        names = ["loop"] + sorted(processor.profile_threads() if processor is not None else {})
+        return JSONResponse({"error": f"unknown thread '{thread}'", "threads": names}, status_code=400)
+    if not _busy.acquire(blocking=False):
+        return JSONResponse({"error": "profile already running"}, status_code=409)
+    try:
+        seconds = min(max(seconds, 0.1), config.PROFILE_MAX_SECONDS)
+        result = await asyncio.to_thread(SamplingProfiler().run, target.ident, seconds)
+    finally:
+        _busy.release()
+
+    if fmt == "collapsed":
+        return PlainTextResponse(result["collapsed"] + "\n")
+    return {"thread": thread, "thread_name": target.name, **result}
@@ -0,0 +1,209 @@
+"""
+backend/publisher.py — In-Process Topic Publisher
+==================================================
+The single place processor state leaves the pipeline threads. Each topic
+is produced once per change and fanned out by subscribers (ws_hub.py)
+at their own per-topic rate.
+
+Topics:
+    frame      latest annotated JPEG (lazy: encoded only when a client sends)
+    metrics    TrafficAnalyzer.metrics, after every inference update
+    signals    signal metrics, on phase change and countdown tick
+    alerts     the 5 most recent active alerts
+    chart      TrafficAnalyzer.get_chart_data() (lazy: built only when sent)
+    incidents  incident summaries (type, description, timestamp)
+
+publish() takes a JSON-able value, drops it if identical to the current
+one, and precomputes the patch from the previous version on the calling
+thread. publish_lazy() takes a builder that runs at most once, on first
+read. Subscribers are called on the event loop with the set of changed
+topics; calls are coalesced, never queued.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Set, Union
+
+import numpy as np
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend import state_protocol as sp
+
+TOPICS = ("frame", "metrics", "signals", "alerts", "chart", "incidents")
+
+
+class TopicEntry:
+    """One version of one topic, plus its encodings (computed once, shared)."""
+
+    def __init__(self, topic: str, version: int, value=None, full: str = None,
+                 build: Callable = None, binary: bool = False):
+        self.topic = topic
+        self.version = version
+        self.binary = binary
+        self.full = full
+        self.published = time.monotonic()
+        self._value = value
+        self._build = build
+        self._lock = threading.Lock()
+        self._encoded: Dict[tuple, Union[str, bytes]] = {}
+
+        # Patch from the previous version (eager JSON topics)
+        self.base = 0
+        self.changes: Dict = {}
+        self.deletions: List[list] = []
+
+    @property
+    def resolved(self) -> bool:
+        return self._build is None
+
+    @property
+    def value(self):
+        if self._build is not None:
+            with self._lock:
+                if self._build is not None:
+                    value = self._build()
+                    # JSON round trip so lazy values diff like eager ones
+                    self._value = value if self.binary else json.loads(json.dumps(value))
+                    self._build = None
+        return self._value
+
+    def encoded(self, kind: str, fmt: str = "json", base_version: int = None,
+                base_value: Dict = None) -> Union[str, bytes]:
+        """snapshot / patch (against base_version, default the previous version)."""
+        if kind == "patch" and base_version is None:
+            base_version = self.base
+        key = (kind, fmt, base_version)
+        out = self._encoded.get(key)
+        if out is None:
+            if kind == "snapshot":
+                msg = sp.snapshot_message(self.version, self.value, fmt, self.topic)
+            elif base_version == self.base and self.base:
+                msg = sp.patch_message(self.version, self.base, self.changes,
+                                       self.deletions, self.topic)
+            else:
+                changes, deletions = sp.diff(base_value, self.value)
+                msg = sp.patch_message(self.version, base_version, changes, deletions, self.topic)
+            out = self._encoded[key] = sp.encode(msg, fmt)
+        return out
+
+    def legacy(self) -> str:
+        """Protocol-1 encoding of a combined state entry."""
+        out = self._encoded.get(("legacy",))
+        if out is None:
+            out = self._encoded[("legacy",)] = json.dumps(sp.legacy_state(self.value))
+        return out
+
+
+class Publisher:
+    """
+    Usage:
+        pub = Publisher()
+        pub.bind(asyncio.get_running_loop())       # at startup
+        pub.subscribe(lambda topics: ...)          # event-loop callback
+        pub.publish("metrics", metrics)            # any thread
+        pub.publish_lazy("chart", analyzer.get_chart_data)
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()      # Serializes producer threads
+        self._latest: Dict[str, TopicEntry] = {}
+        self._versions: Dict[str, int] = {t: 0 for t in TOPICS}
+        self._changed: Set[str] = set()
+        self._fanout_pending = False
+        self._subscribers: List[Callable[[Set[str]], None]] = []
+
+        self.published: Dict[str, int] = {t: 0 for t in TOPICS}
+        self.unchanged: Dict[str, int] = {t: 0 for t in TOPICS}
+        # Per-tick payload size: full JSON vs the shared JSON patch
+        self._full_bytes:  Dict[str, deque] = {}
+        self._patch_bytes: Dict[str, deque] = {}
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def subscribe(self, callback: Callable[[Set[str]], None]):
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Set[str]], None]):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def latest(self, topic: str) -> Optional[TopicEntry]:
+        return self._latest.get(topic)
+
+    # ── Producer side (any thread) ────────────────────────────────────────────
+    def publish(self, topic: str, value) -> bool:
+        """Publish a JSON-able value. Returns False if unchanged."""
+        full = json.dumps(value, separators=(",", ":"))
+        with self._publish_lock:
+            prev = self._latest.get(topic)
+            if prev is not None and prev.full == full:
+                self.unchanged[topic] = self.unchanged.get(topic, 0) + 1
+                return False
+            entry = TopicEntry(topic, self._versions.get(topic, 0) + 1,
+                               value=json.loads(full), full=full)
+            self._full_bytes.setdefault(topic, deque(maxlen=256)).append(len(full))
+            if prev is not None and prev.resolved and not prev.binary:
+                entry.base = prev.version
+                entry.changes, entry.deletions = sp.diff(prev.value, entry.value)
+                self._patch_bytes.setdefault(topic, deque(maxlen=256)).append(
+                    len(entry.encoded("patch")))
+            self._commit(entry)
+        return True
+
+    def publish_lazy(self, topic: str, build: Callable, binary: bool = False):
+        """Publish a new version whose value is built on first read."""
+        with self._publish_lock:
+            entry = TopicEntry(topic, self._versions.get(topic, 0) + 1,
+                               build=build, binary=binary)
+            self._commit(entry)
+
+    def _commit(self, entry: TopicEntry):
+        with self._lock:
+            self._versions[entry.topic] = entry.version
+            self.published[entry.topic] = self.published.get(entry.topic, 0) + 1
+            self._latest[entry.topic] = entry
+            self._changed.add(entry.topic)
+            if self._fanout_pending or self._loop is None or not self._loop.is_running():
+                return
+            self._fanout_pending = True
+        self._loop.call_soon_threadsafe(self._fanout)
+
+    def _fanout(self):
+        with self._lock:
+            self._fanout_pending = False
+            changed, self._changed = self._changed, set()
+        for cb in list(self._subscribers):
+            try:
+                cb(changed)
+            except Exception as e:
+                print(f"[Publisher] Subscriber error: {e}")
+
+    # ── Stats ─────────────────────────────────────────────────────────────────
+    def get_stats(self) -> Dict:
+        topics = {}
+        for topic in self._versions:
+            full  = np.asarray(self._full_bytes.get(topic, ()), dtype=float)
+            patch = np.asarray(self._patch_bytes.get(topic, ()), dtype=float)
+            stats = {
+                "version":   self._versions[topic],
+                "published": self.published.get(topic, 0),
+                "unchanged": self.unchanged.get(topic, 0),
+            }
+            if full.size:
+                stats["payload_bytes"] = {
+                    "full_last":     int(full[-1]),
+                    "patch_last":    int(patch[-1]) if patch.size else 0,
+                    "full_avg":      round(float(full.mean()), 1),
+                    "patch_avg":     round(float(patch.mean()), 1) if patch.size else 0.0,
+                    "reduction_pct": round(float(100.0 * (1 - patch.mean() / full[-patch.size:].mean())), 1)
+                                     if patch.size else 0.0,
+                }
+            topics[topic] = stats
+        return topics
@@ -0,0 +1,156 @@
+"""
+backend/shm_ring.py — Shared-Memory Frame Ring
+===============================================
+Fixed-size ring of uint8 frames in one multiprocessing.shared_memory
+block, for passing video between processes without pickling or copying.
+
+Layout (all little-endian, 8-byte aligned):
+
+    header   int64[8]          latest frame_no, slots, height, width, channels
+    frame_no int64[slots]      per-slot sequence (-1 while being written)
+    ts       float64[slots]    capture timestamp per slot
+    data     uint8[slots, H, W, C]
+
+One writer, any number of readers. The per-slot frame number works as a
+seqlock: the writer sets it to -1, fills the slot, then publishes the
+new number; a reader accepts a slot only if the number is the one it
+expected both before and after reading. Frame numbers only grow, so a
+slot that was rewritten in between can never validate.
+
+    ring = FrameRing.create((720, 1280, 3), slots=8)       # owner
+    ring = FrameRing.attach(name)                           # other process
+    n = ring.write(frame, ts)
+    n, ts, view = ring.read(after=last, copy=False)          # zero-copy
+    ...use view...
+    ring.valid(n)                                           # not overwritten?
+"""
+
+import time
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+_HEADER_WORDS = 8
+
+
+class FrameRing:
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        buf = shm.buf
+
+        self._header = np.ndarray((_HEADER_WORDS,), dtype=np.int64, buffer=buf)
+        slots, h, w, c = (int(v) for v in self._header[1:5])
+        self.slots = slots
+        self.shape = (h, w, c)
+
+        off = _HEADER_WORDS * 8
+        self._frame_no = np.ndarray((slots,), dtype=np.int64, buffer=buf, offset=off)
+        off += slots * 8
+        self._ts = np.ndarray((slots,), dtype=np.float64, buffer=buf, offset=off)
+        off += slots * 8
+        self._data = np.ndarray((slots, h, w, c), dtype=np.uint8, buffer=buf, offset=off)
+
+        # Reader-side counters (per process)
+        self.reads = 0
+        self.retries = 0
+
+    # ── Construction ──────────────────────────────────────────────────────────
+    @classmethod
+    def create(cls, shape: Tuple[int, int, int], slots: int = 8, name: str = None) -> "FrameRing":
+        h, w, c = shape
+        size = _HEADER_WORDS * 8 + slots * 16 + slots * h * w * c
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((_HEADER_WORDS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[1:5] = (slots, h, w, c)
+        ring = cls(shm, owner=True)
+        ring._frame_no[:] = -1
+        ring._ts[:] = 0.0
+        return ring
+
+    @classmethod
+    def attach(cls, name: str) -> "FrameRing":
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    # ── Writer ────────────────────────────────────────────────────────────────
+    def begin_write(self) -> Tuple[int, np.ndarray]:
+        """Claim the next slot → (frame_no, writable view). Finish with commit()."""
+        frame_no = int(self._header[0]) + 1
+        idx = frame_no % self.slots
+        self._frame_no[idx] = -1
+        return frame_no, self._data[idx]
+
+    def commit(self, frame_no: int, ts: float):
+        idx = frame_no % self.slots
+        self._ts[idx] = ts
+        self._frame_no[idx] = frame_no
+        self._header[0] = frame_no
+
+    def write(self, frame: np.ndarray, ts: float = None) -> int:
+        frame_no, view = self.begin_write()
+        view[...] = frame
+        self.commit(frame_no, time.time() if ts is None else ts)
+        return frame_no
+
+    # ── Readers ───────────────────────────────────────────────────────────────
+    @property
+    def latest_no(self) -> int:
+        return int(self._header[0])
+
+    def valid(self, frame_no: int) -> bool:
+        """True while the slot still holds frame_no (a zero-copy view is intact)."""
+        return int(self._frame_no[frame_no % self.slots]) == frame_no
+
+    def read(self, after: int = 0, copy: bool = True,
+             out: np.ndarray = None) -> Optional[Tuple[int, float, np.ndarray]]:
+        """Newest frame with frame_no > after, or None if there is none yet.
+        With copy, the frame is copied into `out` when given (no allocation)."""
+        for _ in range(self.slots):
+            frame_no = self.latest_no
+            if frame_no <= after:
+                return None
+            idx = frame_no % self.slots
+            if int(self._frame_no[idx]) != frame_no:
+                self.retries += 1
+                continue
+            ts = float(self._ts[idx])
+            if not copy:
+                frame = self._data[idx]
+            elif out is not None:
+                frame = out
+                np.copyto(out, self._data[idx])
+            else:
+                frame = self._data[idx].copy()
+            if copy and not self.valid(frame_no):
+                self.retries += 1
+                continue
+            self.reads += 1
+            return frame_no, ts, frame
+        return None
+
+    def wait(self, after: int, timeout: float = 1.0, copy: bool = True,
+             poll: float = 0.001, out: np.ndarray = None) -> Optional[Tuple[int, float, np.ndarray]]:
+        """read(), polling until a newer frame arrives or timeout passes."""
+        deadline = time.monotonic() + timeout
+        while True:
+            item = self.read(after, copy, out)
+            if item is not None or time.monotonic() >= deadline:
+                return item
+            time.sleep(poll)
+
+    # ── Cleanup ───────────────────────────────────────────────────────────────
+    def close(self):
+        # Views must go before the mapping can be closed
+        self._header = self._frame_no = self._ts = self._data = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
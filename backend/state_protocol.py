@@ -0,0 +1,162 @@
+"""
+backend/state_protocol.py — Versioned /ws State Protocol
+=========================================================
+Protocol 2 (opt-in with /ws?proto=2[&fmt=msgpack][&topics=...]):
+
+    {"v": 2, "type": "snapshot", "topic": "metrics", "seq": 41, "fmt": "json", "state": {...}}
+    {"v": 2, "type": "patch",    "topic": "metrics", "seq": 42, "base": 41, "patch": {...}, "del": [...]}
+
+  - Per topic (see backend/publisher.py): a full snapshot on subscribe
+    (and on {"type": "resync"}), then patches against the last message
+    of that topic the client actually received. The "frame" topic is
+    sent as binary frame_protocol messages instead.
+  - Subscriptions and per-topic max rates (Hz, 0 = every change):
+        /ws?proto=2&topics=metrics:5,signals,chart:2
+        {"type": "subscribe", "topics": {"metrics": 5, "signals": 0}}
+  - "patch" holds changed keys only (nested objects recursed, lists
+    replaced whole, null is a value); "del" lists key paths that went
+    away, e.g. [["metrics", "lane_stats", "West"]].
+  - fmt=msgpack sends the same messages as binary MessagePack frames when
+    the optional `msgpack` package is installed, JSON text otherwise.
+
+Protocol 1 (plain /ws) keeps sending the full state every change, with
+legacy_state() re-adding the duplicate metric aliases older dashboards
+read (current_fps, vehicle_count, lanes).
+"""
+
+import json
+from typing import Dict, List, Optional, Tuple, Union
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+VERSION = 2
+FORMATS = ("json", "msgpack") if msgpack else ("json",)
+
+
+# ── Patches ───────────────────────────────────────────────────────────────────
+def diff(old: Dict, new: Dict, path: tuple = ()) -> Tuple[Dict, List[list]]:
+    """
+    Patch turning `old` into `new` → (changes, deletions).
+
+    changes is merge-patch shaped: changed keys only, nested dicts recursed,
+    lists and scalars replaced whole, null is a real value. deletions lists
+    key paths removed from `old` (RFC 7386 would need null for that).
+    """
+    changes, deletions = {}, []
+    for key, value in new.items():
+        if key not in old:
+            changes[key] = value
+            continue
+        prev = old[key]
+        if isinstance(value, dict) and isinstance(prev, dict):
+            sub, sub_del = diff(prev, value, path + (key,))
+            if sub:
+                changes[key] = sub
+            deletions.extend(sub_del)
+        elif value != prev or type(value) is not type(prev):
+            changes[key] = value
+    deletions.extend([*path, key] for key in old if key not in new)
+    return changes, deletions
+
+
+def apply_patch(target: Dict, changes: Dict, deletions: List[list] = ()) -> Dict:
+    """Inverse of diff() (returns a new dict, target is not modified)."""
+    out = _merge(target, changes)
+    for key_path in deletions:
+        node = out
+        for key in key_path[:-1]:
+            if not isinstance(node.get(key), dict):
+                break
+            node[key] = dict(node[key])   # Copy on the way down; target's dicts stay intact
+            node = node[key]
+        else:
+            node.pop(key_path[-1], None)
+    return out
+
+
+def _merge(target: Dict, changes: Dict) -> Dict:
+    out = dict(target)
+    for key, value in changes.items():
+        if isinstance(value, dict) and isinstance(out.get(key), dict):
+            out[key] = _merge(out[key], value)
+        else:
+            out[key] = value
+    return out
+
+
+# ── Messages ──────────────────────────────────────────────────────────────────
+def snapshot_message(seq: int, state: Dict, fmt: str = "json", topic: str = "state") -> Dict:
+    return {"v": VERSION, "type": "snapshot", "topic": topic, "seq": seq, "fmt": fmt,
+            "state": state}
+
+
+def patch_message(seq: int, base: int, changes: Dict, deletions: List[list] = (),
+                  topic: str = "state") -> Dict:
+    message = {"v": VERSION, "type": "patch", "topic": topic, "seq": seq, "base": base,
+               "patch": changes}
+    if deletions:
+        message["del"] = list(deletions)
+    return message
+
+
+def encode(message: Dict, fmt: str = "json") -> Union[str, bytes]:
+    """str for JSON (text frame), bytes for MessagePack (binary frame)."""
+    if fmt == "msgpack" and msgpack:
+        return msgpack.packb(message, use_bin_type=True)
+    return json.dumps(message, separators=(",", ":"))
+
+
+def negotiate(proto: Optional[str], fmt: Optional[str]):
+    """Query params → (protocol version, wire format)."""
+    version = VERSION if proto and proto.strip() == str(VERSION) else 1
+    wire = fmt if version == VERSION and fmt in FORMATS else "json"
+    return version, wire
+
+
+def parse_topics(spec, defaults: Dict[str, float]) -> Dict[str, float]:
+    """
+    "metrics:5,signals,chart:2" or {"metrics": 5, "signals": null} →
+    {topic: max Hz}; bare topics / null take the configured default rate.
+    Unknown topics are ignored; None / "" → every default except "frame".
+    """
+    if spec is None or spec == "":
+        return {t: r for t, r in defaults.items() if t != "frame"}
+    if isinstance(spec, str):
+        items = [part.partition(":")[::2] for part in spec.split(",") if part.strip()]
+        spec = {name.strip(): (rate or None) for name, rate in items}
+    rates = {}
+    for topic, rate in spec.items():
+        if topic not in defaults:
+            continue
+        try:
+            rates[topic] = max(0.0, float(rate)) if rate is not None else defaults[topic]
+        except (TypeError, ValueError):
+            rates[topic] = defaults[topic]
+    return rates
+
+
+# ── Protocol 1 compatibility ──────────────────────────────────────────────────
+def legacy_state(state: Dict) -> Dict:
+    """Re-add the pre-v2 metric aliases for dashboards that still read them."""
+    metrics = state.get("metrics")
+    if not metrics:
+        return state
+    lane_stats = metrics.get("lane_stats", {})
+    legacy = dict(metrics)
+    legacy["current_fps"]   = metrics.get("fps", 0.0)
+    legacy["vehicle_count"] = metrics.get("total_vehicles", 0)
+    legacy["lanes"] = {
+        name: {
+            "vehicles":   s.get("vehicle_count", 0),
+            "density":    round(s.get("density_ratio", 0.0) * 100, 1),
+            "queue":      s.get("queue_length", 0),
+            "avg_wait":   s.get("avg_wait_time", 0.0),
+            "congestion": s.get("congestion_level"),
+            "ambulance":  s.get("ambulance_present", False),
+        }
+        for name, s in lane_stats.items()
+    }
+    return {**state, "metrics": legacy}
@@ -0,0 +1,173 @@
+"""
+backend/topology.py — Camera / Approach / Junction Topology
+============================================================
+Describes what the multi-camera processor runs: N cameras, the approaches
+each camera watches, and the junctions (signal controllers) those
+approaches belong to. Loaded from JSON, or YAML when PyYAML is installed.
+
+    {
+      "cameras": [
+        {"name": "north", "source": "north.mp4"},
+        {"name": "east",  "source": "rtsp://10.0.0.7/stream"}
+      ],
+      "junctions": [
+        {"name": "main",
+         "phase_order": ["North", "East"],
+         "approaches": [
+           {"name": "North", "camera": "north"},
+           {"name": "East",  "camera": "east",
+            "polygon": [[0, 0.2], [1, 0.2], [1, 1], [0, 1]]}
+         ]}
+      ]
+    }
+
+  - Approach polygons are normalized (0–1) to their camera's frame and
+    default to the whole frame. An approach is watched by exactly one
+    camera; one camera may feed several approaches or junctions.
+  - Approach names are the lane names used everywhere downstream (lane
+    stats, signals, alerts, history), so they must be unique across the
+    whole topology.
+  - phase_order defaults to the order the approaches are listed in.
+  - Cameras are tiled into the composite in listed order on a near-square
+    grid (grid() below): 4 → 2×2, 3 → 2×2 with one empty tile, 6 → 3×2.
+"""
+
+import json
+import math
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+FULL_FRAME = [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0)]
+
+
+@dataclass
+class Camera:
+    name:   str
+    source: object            # File path, stream URL, or webcam index
+
+
+@dataclass
+class Approach:
+    name:    str
+    camera:  str
+    polygon: List[Tuple[float, float]] = field(default_factory=lambda: list(FULL_FRAME))
+
+
+@dataclass
+class Junction:
+    name:        str
+    approaches:  List[Approach]
+    phase_order: List[str] = field(default_factory=list)
+
+    @property
+    def cameras(self) -> List[str]:
+        """Cameras feeding this junction, in first-use order."""
+        return list(dict.fromkeys(a.camera for a in self.approaches))
+
+
+@dataclass
+class Topology:
+    cameras:   List[Camera]
+    junctions: List[Junction]
+
+    # ── Construction ──────────────────────────────────────────────────────────
+    @classmethod
+    def load(cls, path: str) -> "Topology":
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        if os.path.splitext(path)[1].lower() in (".yaml", ".yml"):
+            if yaml is None:
+                raise ValueError(f"{path}: YAML topologies need PyYAML (pip install pyyaml)")
+            data = yaml.safe_load(text)
+        else:
+            data = json.loads(text)
+        return cls.from_dict(data)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Topology":
+        cameras = [Camera(name=str(c["name"]), source=c.get("source", 0))
+                   for c in data.get("cameras", [])]
+        junctions = []
+        for j in data.get("junctions", []):
+            approaches = [
+                Approach(name=str(a["name"]), camera=str(a["camera"]),
+                         polygon=[tuple(map(float, p)) for p in a.get("polygon", FULL_FRAME)])
+                for a in j.get("approaches", [])
+            ]
+            order = [str(n) for n in j.get("phase_order") or [a.name for a in approaches]]
+            junctions.append(Junction(name=str(j["name"]), approaches=approaches, phase_order=order))
+        topology = cls(cameras=cameras, junctions=junctions)
+        topology.validate()
+        return topology
+
+    @classmethod
+    def four_way(cls, north, south, east, west) -> "Topology":
+        """The classic layout: one camera per approach, one junction, N → S → E → W."""
+        sources = {"north": north, "south": south, "east": east, "west": west}
+        return cls(
+            cameras=[Camera(name, src) for name, src in sources.items()],
+            junctions=[Junction("main", [Approach(name.capitalize(), name) for name in sources],
+                                ["North", "South", "East", "West"])],
+        )
+
+    def validate(self):
+        """Raise ValueError on anything the processor could not run."""
+        if not self.cameras:
+            raise ValueError("topology: at least one camera is required")
+        names = [c.name for c in self.cameras]
+        if len(set(names)) != len(names):
+            raise ValueError(f"topology: duplicate camera names in {names}")
+        if not self.junctions:
+            raise ValueError("topology: at least one junction is required")
+        seen = set()
+        for j in self.junctions:
+            if not j.approaches:
+                raise ValueError(f"topology: junction '{j.name}' has no approaches")
+            for a in j.approaches:
+                if a.camera not in names:
+                    raise ValueError(f"topology: approach '{a.name}' uses unknown camera '{a.camera}'")
+                if a.name in seen:
+                    raise ValueError(f"topology: approach name '{a.name}' is not unique")
+                if len(a.polygon) < 3:
+                    raise ValueError(f"topology: approach '{a.name}' polygon needs 3+ points")
+                seen.add(a.name)
+            if sorted(j.phase_order) != sorted(a.name for a in j.approaches):
+                raise ValueError(f"topology: junction '{j.name}' phase_order must list each "
+                                 f"approach exactly once")
+
+    # ── Layout ────────────────────────────────────────────────────────────────
+    def camera_index(self, name: str) -> int:
+        return [c.name for c in self.cameras].index(name)
+
+    def grid(self) -> Tuple[int, int]:
+        """(cols, rows) of the composite."""
+        n = len(self.cameras)
+        cols = math.ceil(math.sqrt(n))
+        return cols, math.ceil(n / cols)
+
+    def lane_polygons(self, junction: Junction) -> Dict[str, List[Tuple[float, float]]]:
+        """Approach polygons normalized to the whole composite (for LaneManager)."""
+        cols, rows = self.grid()
+        polygons = {}
+        for a in junction.approaches:
+            row, col = divmod(self.camera_index(a.camera), cols)
+            polygons[a.name] = [((col + x) / cols, (row + y) / rows) for x, y in a.polygon]
+        return polygons
+
+    def to_dict(self) -> Dict:
+        return {
+            "cameras": [{"name": c.name, "source": c.source} for c in self.cameras],
+            "junctions": [
+                {"name": j.name, "phase_order": j.phase_order,
+                 "approaches": [{"name": a.name, "camera": a.camera,
+                                 "polygon": [list(p) for p in a.polygon]} for a in j.approaches]}
+                for j in self.junctions
+            ],
+            "grid": list(self.grid()),
+        }
@@ -15,17 +15,26 @@ import base64
 import json
 import os
 import sys
-from typing import Callable, Optional, Dict, List
+from collections import deque
+from typing import Optional, Dict, List
 
 # Path resolution
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
 
-from core.detector   import Detector
+from core.inference_server import get_server
+from core.detection_log import live_recorder
+from core.perf import perf
+from core.lineage import lineage
 from core.tracker    import CentroidTracker
 from core.lane_manager  import LaneManager
 from core.traffic_analyzer import TrafficAnalyzer
 from core.signal_optimizer import SignalOptimizer
+from core.history_store import LaneHistoryStore
+from core.signal_scheduler import SignalScheduler
+from backend.frame_pool import FramePool, alloc_samples, alloc_stats
+from backend.frame_source import FrameStride
+from backend.clip_recorder import ClipRecorder
 
 
 class VideoProcessor:
@@ -45,11 +54,18 @@ class VideoProcessor:
         print(f"[VideoProcessor] Video source: {self.video_path}")
         
         # AI components
-        self.detector  = Detector()
+        self.inference = get_server()          # Shared, batched; one model per process
+        self.detector  = self.inference.detector
         self.tracker   = CentroidTracker(max_disappeared=8, max_distance=100)
         self.lane_mgr  = LaneManager(self.frame_width, self.frame_height)
         self.analyzer  = TrafficAnalyzer()
         self.optimizer = SignalOptimizer()
+        self.history   = LaneHistoryStore() if config.HISTORY_ENABLED else None
+        
+        # Phase transitions run on their own timer, not at inference rate
+        self.scheduler = SignalScheduler()
+        self.scheduler.add(self.optimizer)
+        self.scheduler.subscribe(self._on_signal_change)
         
         # State
         self.is_running = False
@@ -60,7 +76,12 @@ class VideoProcessor:
         # Concurrency & Shared AI State
         self.state_lock = threading.Lock()
         self.raw_frame: Optional[np.ndarray] = None
+        self._raw_no = 0                           # Source frame number of raw_frame
+        self._raw_ts = 0.0                         # ...and its capture time
+        self._raw_taken = 0                        # Last one inference picked up
+        self.frames_dropped = 0                    # Replaced before inference took them
         self.shared_detections: List = []
+        self.shared_source: Optional[tuple] = None   # (frame_no, capture_ts) they came from
         self.shared_tracks: List = []
         self.shared_lane_stats: Dict = {}
         
@@ -70,8 +91,27 @@ class VideoProcessor:
         self.latest_alerts:  List = []
         self.latest_signals: Dict = {}
         
-        # Callbacks (called from processing thread)
-        self._on_state: Optional[Callable] = None
+        # Published frame as one reference (frame_id, capture_ts, annotated) + JPEG cache
+        self._frame_slot: Optional[tuple] = None
+        self._encode_lock = threading.Lock()
+        self._jpeg_cache: Dict[int, tuple] = {}    # quality → (frame_id, bytes)
+        
+        # Reusable buffers: raw frames go to inference, annotated ones to the
+        # encoders, both by reference; full-frame allocations are counted
+        shape = (self.frame_height, self.frame_width, 3)
+        self._raw_pool       = FramePool(shape, name="raw")
+        self._annotated_pool = FramePool(shape, name="annotated")
+        self._decode_buf: Optional[np.ndarray] = None
+        self._frame_allocs: deque = deque(maxlen=256)
+        
+        # Source frames off both the display and inference strides are only grab()bed
+        self.stride = FrameStride()
+        
+        # Topic publisher (backend.publisher.Publisher), fed from the processing threads
+        self.publisher = None
+        self.recorder  = None    # core.detection_log recorder while running, if enabled
+        self.clips     = (ClipRecorder({"main": self.get_encoded_frame}, self.analyzer.alert_store)
+                          if config.CLIP_ENABLED else None)
     
     def _resolve_video(self, path=None) -> str:
         """Find a valid video file from config or fallbacks."""
@@ -86,13 +126,21 @@ class VideoProcessor:
         print("[VideoProcessor] WARNING: No video found. Defaulting to webcam (0).")
         return 0
     
-    def start(self, on_state: Optional[Callable] = None):
+    def start(self, publisher=None):
         """Start processing in background threads."""
-        self._on_state = on_state
+        self.publisher = publisher
         self.is_running = True
+        if self.history:
+            self.history.start()
+        self.scheduler.start()
+        if self.clips:
+            self.clips.start()
+        name = os.path.splitext(os.path.basename(str(self.video_path)))[0]
+        self.recorder = live_recorder(name, self.frame_width, self.frame_height, self.video_path)
+        perf.register_collector("processor", self._perf_samples)
         
-        self._capture_thread_obj = threading.Thread(target=self._capture_thread, daemon=True)
-        self._inference_thread_obj = threading.Thread(target=self._inference_thread, daemon=True)
+        self._capture_thread_obj = threading.Thread(target=self._capture_thread, name="capture", daemon=True)
+        self._inference_thread_obj = threading.Thread(target=self._inference_thread, name="inference", daemon=True)
         
         self._capture_thread_obj.start()
         self._inference_thread_obj.start()
@@ -105,6 +153,13 @@ class VideoProcessor:
             self._capture_thread_obj.join(timeout=3.0)
         if self._inference_thread_obj:
             self._inference_thread_obj.join(timeout=3.0)
+        if self.history:
+            self.history.stop()
+        self.scheduler.stop()
+        if self.clips:
+            self.clips.stop()
+        if self.recorder:
+            self.recorder.close()
     
     def _capture_thread(self):
         """Reads frames and annotates them asynchronously for smooth playback."""
@@ -123,48 +178,75 @@ class VideoProcessor:
               f"{int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))}x"
               f"{int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))} @ {target_fps} FPS")
         
+        allocs, pooled = 0, self._pool_allocations()
         while self.is_running:
             start_time = time.time()
-            ret, frame = cap.read()
-            if not ret:
+            with perf.timer("capture"):
+                grabbed = cap.grab()
+            if not grabbed:
                 cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
                 continue
+            display, infer = self.stride.next()
+            if not (display or infer):
+                time.sleep(max(0, frame_delay - (time.time() - start_time)))
+                continue
+            capture_ts, frame_no = start_time, self.stride.grabbed
+            trace = lineage.begin(frame_no, capture_ts)
+            with lineage.span(frame_no, "decode"):
+                ret, decoded = cap.retrieve(self._decode_buf)
+            if not ret:
+                continue
+            allocs += decoded is not self._decode_buf
+            self._decode_buf = decoded
             
-            frame = cv2.resize(frame, (self.frame_width, self.frame_height))
+            with lineage.span(frame_no, "resize"):
+                frame = cv2.resize(decoded, (self.frame_width, self.frame_height),
+                                   dst=self._raw_pool.acquire())
+            if infer:
+                with self.state_lock:
+                    if self._raw_no > self._raw_taken:
+                        self.frames_dropped += 1
+                    self.raw_frame = frame     # Never modified after this point
+                    self._raw_no   = frame_no
+                    self._raw_ts   = capture_ts
+            if not display:
+                time.sleep(max(0, frame_delay - (time.time() - start_time)))
+                continue
+            self._frame_count += 1
             
             with self.state_lock:
-                self.raw_frame = frame.copy()
                 current_detections = list(self.shared_detections)
                 current_tracks = list(self.shared_tracks)
                 current_lane_stats = dict(self.shared_lane_stats)
+                overlay_source = self.shared_source
                 
                 self.latest_metrics = self.analyzer.metrics
                 self.latest_alerts  = [a.to_dict() for a in self.analyzer.alerts[-5:]]
-                self.latest_signals = self.optimizer.get_metrics()
+                self.latest_signals = self._signal_metrics()
             
-            annotated = frame.copy()
-            self.lane_mgr.draw_lanes(annotated)
-            
-            if current_detections:
-                self.detector.draw(annotated, current_detections)
-            if current_tracks:
-                self.tracker.draw_tracks(annotated, current_tracks)
+            with lineage.span(frame_no, "draw"):
+                annotated = self._annotated_pool.acquire()
+                np.copyto(annotated, frame)
+                self.lane_mgr.draw_lanes(annotated)
                 
-            self.optimizer.draw_signal_panel(annotated, x=10, y=10)
-            self.analyzer.draw_overlay(annotated, current_lane_stats)
+                if current_detections:
+                    self.detector.draw(annotated, current_detections)
+                if current_tracks:
+                    self.tracker.draw_tracks(annotated, current_tracks)
+                    
+                self.optimizer.draw_signal_panel(annotated, x=10, y=10)
+                self.analyzer.draw_overlay(annotated, current_lane_stats)
             
             self.latest_frame = annotated
-            
-            if self._on_state:
-                try:
-                    self._on_state({
-                        "metrics": self.latest_metrics,
-                        "alerts":  self.latest_alerts,
-                        "signals": self.latest_signals,
-                        "chart":   self.analyzer.get_chart_data(),
-                    })
-                except Exception:
-                    pass
+            self._frame_slot  = (frame_no, capture_ts, annotated)
+            lineage.since("overlay_age", overlay_source, capture_ts)
+            if trace is not None and overlay_source is not None:
+                trace.attrs["overlay_from"] = overlay_source[0]
+            if self.publisher:
+                self.publisher.publish_lazy("frame", self.get_encoded_frame, binary=True)
+                self.publisher.publish("signals", self.latest_signals)   # Countdown tick
+            self._frame_allocs.append(allocs + self._pool_allocations() - pooled)
+            allocs, pooled = 0, self._pool_allocations()
             
             elapsed = time.time() - start_time
             sleep_time = max(0, frame_delay - elapsed)
@@ -175,38 +257,104 @@ class VideoProcessor:
 
     def _inference_thread(self):
         """Runs YOLO and intersection logic continuously on the latest frame."""
+        last_no = 0
         while self.is_running:
             with self.state_lock:
-                frame_to_process = self.raw_frame
+                frame_to_process, frame_no = self.raw_frame, self._raw_no
+                source = (frame_no, self._raw_ts)
+                self._raw_taken = frame_no
             
-            if frame_to_process is None:
-                time.sleep(0.01)
+            if frame_to_process is None or frame_no == last_no:
+                time.sleep(0.005)
                 continue
+            last_no = frame_no
             
             # Since AI processes as fast as it can, run pipeline continuously
-            detections = self.detector.detect(frame_to_process)
-            tracks     = self.tracker.update(detections)
-            lane_stats = self.lane_mgr.update(tracks)
+            emergency  = any(d.is_ambulance for d in self.shared_detections)
+            with lineage.span(frame_no, "inference"):
+                detections = self.inference.detect(frame_to_process, priority=emergency)
+            if self.recorder:
+                self.recorder.record(time.time(), detections)
+            with lineage.span(frame_no, "track"):
+                tracks     = self.tracker.update(detections)
+            with lineage.span(frame_no, "lane"):
+                lane_stats = self.lane_mgr.update(tracks)
+            if self.history:
+                self.history.record(lane_stats)
             
-            self.optimizer.update_phase_duration(lane_stats)
-            _ = self.optimizer.update(lane_stats)
+            self.scheduler.submit(lane_stats, source=source)
             
-            _ = self.analyzer.update(tracks, lane_stats, list(detections))
+            with lineage.span(frame_no, "analyze"):
+                self.analyzer.update(tracks, lane_stats, list(detections))
+            lineage.since("analysis", source)
+            self._publish_analysis()
             
             with self.state_lock:
                 self.shared_detections = detections
+                self.shared_source = source
                 self.shared_tracks = tracks
                 self.shared_lane_stats = lane_stats
             
             time.sleep(0.01)  # small buffer
     
-    def get_jpeg_frame(self, quality: int = None) -> Optional[bytes]:
-        """Return latest annotated frame as JPEG bytes."""
-        if self.latest_frame is None:
+    def _perf_samples(self) -> List:
+        return [("counter", "frames_dropped", {"camera": "main"}, self.frames_dropped),
+                ("counter", "frames_decoded", {"camera": "main"}, self.stride.decoded),
+                ("counter", "frames_skipped", {"camera": "main"}, self.stride.skipped),
+                *alloc_samples([self._raw_pool, self._annotated_pool], self._frame_allocs)]
+    
+    def _pool_allocations(self) -> int:
+        return self._raw_pool.allocations + self._annotated_pool.allocations
+
+    def _signal_metrics(self) -> Dict:
+        signals = self.scheduler.get_metrics()
+        signals["scheduler"] = self.scheduler.get_stats()
+        return signals
+    
+    def _on_signal_change(self, key: str, signals: Dict):
+        """Called by the scheduler thread the moment any light changes."""
+        signals["scheduler"] = self.scheduler.get_stats()
+        self.latest_signals = signals
+        if self.publisher:
+            self.publisher.publish("signals", signals)
+    
+    def _publish_analysis(self):
+        """Publish what one inference update produced (each topic once per change)."""
+        if not self.publisher:
+            return
+        self.publisher.publish("metrics", self.analyzer.metrics)
+        self.publisher.publish("alerts", [a.to_dict() for a in self.analyzer.alerts[-5:]])
+        self.publisher.publish_lazy("chart", self.analyzer.get_chart_data)
+    
+    @property
+    def frame_id(self) -> int:
+        """Id of the latest published frame (0 before the first one)."""
+        slot = self._frame_slot
+        return slot[0] if slot else 0
+
+    def get_encoded_frame(self, quality: int = None) -> Optional[tuple]:
+        """
+        Latest annotated frame as (frame_id, capture_ts, jpeg_bytes).
+        Encoded at most once per frame and quality, however many clients ask.
+        """
+        slot = self._frame_slot
+        if slot is None:
             return None
+        frame_id, capture_ts, frame = slot
         q = quality or config.STREAM_JPEG_QUALITY
-        _, buf = cv2.imencode(".jpg", self.latest_frame, [cv2.IMWRITE_JPEG_QUALITY, q])
-        return buf.tobytes()
+        with self._encode_lock:
+            cached = self._jpeg_cache.get(q)
+            if cached is None or cached[0] != frame_id:
+                with lineage.span(frame_id, "jpeg_encode"):
+                    _, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, q])
+                cached = (frame_id, buf.tobytes())
+                self._jpeg_cache[q] = cached
+        return frame_id, capture_ts, cached[1]
+    
+    def get_jpeg_frame(self, quality: int = None) -> Optional[bytes]:
+        """Return latest annotated frame as JPEG bytes."""
+        encoded = self.get_encoded_frame(quality)
+        return encoded[2] if encoded else None
     
     def get_b64_frame(self) -> Optional[str]:
         """Return latest frame as base64-encoded JPEG string."""
@@ -215,12 +363,36 @@ class VideoProcessor:
             return None
         return base64.b64encode(jpg).decode("utf-8")
     
-    def get_state(self) -> Dict:
-        """Return current full system state as serializable dict."""
-        return {
+    def get_state(self, include_frame: bool = False) -> Dict:
+        """
+        Return current system state as serializable dict. Video goes over
+        the binary /ws/video channel; include_frame adds legacy frame_b64.
+        """
+        state = {
             "metrics": self.latest_metrics,
             "alerts":  self.latest_alerts,
             "signals": self.latest_signals,
             "chart":   self.analyzer.get_chart_data(),
-            "frame_b64": self.get_b64_frame(),
+        }
+        if include_frame:
+            state["frame_b64"] = self.get_b64_frame()
+        return state
+
+    def profile_threads(self) -> Dict[str, threading.Thread]:
+        """Threads /api/debug/profile can sample, by name."""
+        return {"capture": self._capture_thread_obj, "inference": self._inference_thread_obj}
+
+    def get_pipeline_stats(self) -> Dict:
+        """Same shape as MultiProcessVideoProcessor.get_pipeline_stats()."""
+        return {
+            "mode": "threads",
+            "threads": {
+                "capture":   bool(self._capture_thread_obj and self._capture_thread_obj.is_alive()),
+                "inference": bool(self._inference_thread_obj and self._inference_thread_obj.is_alive()),
+            },
+            "frames_rendered": self._frame_count,
+            "capture": self.stride.get_stats(),
+            "inference": self.inference.get_stats(),
+            "clips": self.clips.get_stats() if self.clips else None,
+            "buffers": alloc_stats([self._raw_pool, self._annotated_pool], self._frame_allocs),
         }
@@ -1,6 +1,28 @@
 """
 backend/video_processor_4way.py — Multi-Camera Video Processing Pipeline
 ======================================================================
+MultiCameraProcessor runs any backend/topology.py layout: N cameras tiled
+into one composite, the process's shared InferenceServer, and per junction its own tracker,
+lanes, analyzer and signal optimizer (one SignalScheduler key each).
+
+  - Each camera decodes on its own FrameSource thread.
+  - Detection runs once on the composite (DETECT_ON_COMPOSITE, the
+    historical 4-way behaviour) or once per camera frame, submitted
+    together so the server batches them, with boxes mapped into composite
+    coordinates; either way junction pipelines see one coordinate space,
+    so no two cameras' boxes ever overlap. Cameras with an ambulance in
+    view use the server's priority lane.
+  - Junction trackers hand out ids from separate ranges. A camera shared
+    by several junctions is tracked by each, but only its first junction's
+    tracks are drawn and passed to incident capture, so a vehicle gets one
+    box and one id.
+  - Approach names are lane names. Every junction shares one AlertStore
+    and the history store, and the primary (first) junction's analyzer
+    and optimizer are also exposed as .analyzer / .optimizer.
+  - The metrics and signals topics carry the primary junction; with more
+    than one junction each also gets a "junctions" map.
+
+VideoProcessor4Way is the classic four feeds → one N/S/E/W junction.
 """
 
 import cv2
@@ -11,57 +33,126 @@ import base64
 import json
 import os
 import sys
-from typing import Callable, Optional, Dict, List
+from collections import deque
+from typing import Optional, Dict, List
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
-from core.detector   import Detector
+from core.detector   import Detection
+from core.inference_server import get_server
+from core.detection_log import live_recorder
+from core.perf import perf
+from core.lineage import lineage
 from core.tracker    import CentroidTracker
 from core.lane_manager  import LaneManager
 from core.traffic_analyzer import TrafficAnalyzer
 from core.signal_optimizer import SignalOptimizer
+from core.history_store import LaneHistoryStore
+from core.signal_scheduler import SignalScheduler
+from backend.frame_source import FrameSource
+from backend.frame_pool import FramePool, alloc_samples, alloc_stats
+from backend.topology import Junction, Topology
+from backend.incidents import IncidentStore, IncidentWorker
+from backend.clip_recorder import ClipRecorder
 
-LANE_POLYGONS_4WAY = {
-    "North": [(0.0, 0.0), (0.5, 0.0), (0.5, 0.5), (0.0, 0.5)],
-    "South": [(0.5, 0.0), (1.0, 0.0), (1.0, 0.5), (0.5, 0.5)],
-    "East":  [(0.0, 0.5), (0.5, 0.5), (0.5, 1.0), (0.0, 1.0)],
-    "West":  [(0.5, 0.5), (1.0, 0.5), (1.0, 1.0), (0.5, 1.0)],
-}
 
-class VideoProcessor4Way:
-    def __init__(self, v_north="north.mp4", v_south="south.mp4", v_east="east.mp4", v_west="west.mp4", frame_width=None, frame_height=None):
-        self.v_paths = [self._resolve_video(v) for v in [v_north, v_south, v_east, v_west]]
-        self.frame_width  = frame_width  or config.FRAME_WIDTH
-        self.frame_height = frame_height or config.FRAME_HEIGHT
-        
-        self.detector  = Detector()
-        self.tracker   = CentroidTracker(max_disappeared=8, max_distance=100)
-        self.lane_mgr  = LaneManager(self.frame_width, self.frame_height, polygons=LANE_POLYGONS_4WAY)
+TRACK_ID_STRIDE = 1_000_000   # Junction i's track ids start at i * stride + 1
+
+
+class JunctionPipeline:
+    """Per-junction state: tracker, lane polygons, analyzer, signal optimizer."""
+
+    def __init__(self, spec: Junction, topology: Topology, width: int, height: int,
+                 alert_store=None, index: int = 0):
+        self.name = spec.name
+        self.spec = spec
+        self.cameras = [topology.camera_index(c) for c in spec.cameras]
+        self.tracker   = CentroidTracker(max_disappeared=8, max_distance=100,
+                                         first_id=index * TRACK_ID_STRIDE + 1)
+        self.lane_mgr  = LaneManager(width, height, polygons=topology.lane_polygons(spec))
         self.analyzer  = TrafficAnalyzer()
-        self.optimizer = SignalOptimizer()
-        
+        if alert_store is not None:
+            self.analyzer.alert_store = alert_store
+        self.optimizer = SignalOptimizer(phase_order=spec.phase_order)
+
+
+class MultiCameraProcessor:
+    def __init__(self, topology: Topology, frame_width=None, frame_height=None):
+        self.topology = topology
+        self.cols, self.rows = topology.grid()
+        self.tile_w = (frame_width  or config.FRAME_WIDTH)  // self.cols
+        self.tile_h = (frame_height or config.FRAME_HEIGHT) // self.rows
+        self.frame_width  = self.tile_w * self.cols
+        self.frame_height = self.tile_h * self.rows
+        n = len(topology.cameras)
+
+        self.v_paths = [self._resolve_video(c.source) for c in topology.cameras]
+        self.sources = [FrameSource(p, (self.tile_w, self.tile_h), name=c.name)
+                        for p, c in zip(self.v_paths, topology.cameras)]
+        self.cameras = ("composite",) + tuple(c.name for c in topology.cameras)   # camera_id → view
+
+        self.inference = get_server()    # One batched model for every camera (and processor)
+        self.detector  = self.inference.detector
+        self.junctions: List[JunctionPipeline] = []
+        for spec in topology.junctions:
+            store = self.junctions[0].analyzer.alert_store if self.junctions else None
+            self.junctions.append(JunctionPipeline(spec, topology, self.frame_width, self.frame_height,
+                                                   alert_store=store, index=len(self.junctions)))
+        primary = self.junctions[0]
+        self.tracker, self.lane_mgr = primary.tracker, primary.lane_mgr
+        self.analyzer, self.optimizer = primary.analyzer, primary.optimizer
+        self._inferred_cameras = sorted({cam for j in self.junctions for cam in j.cameras})
+        self._track_owner: Dict[int, JunctionPipeline] = {}   # cam → junction whose tracks are shown
+        for j in self.junctions:
+            for cam in j.cameras:
+                self._track_owner.setdefault(cam, j)
+
+        self.history   = LaneHistoryStore() if config.HISTORY_ENABLED else None
+        self.scheduler = SignalScheduler()
+        for j in self.junctions:
+            self.scheduler.add(j.optimizer, key=j.name)
+        self.scheduler.subscribe(self._on_signal_change)
+
         self.is_running = False
         self._capture_thread_obj: Optional[threading.Thread] = None
         self._inference_thread_obj: Optional[threading.Thread] = None
-        
-        self.quadrant_mapping = [0, 1, 2, 3] # Default N, S, E, W
-        
+
+        self.tile_mapping = list(range(n))   # Tile i shows (and infers) source tile_mapping[i]
+
         self.state_lock = threading.Lock()
-        self.raw_frame: Optional[np.ndarray] = None
         self.shared_detections: List = []
         self.shared_tracks: List = []
         self.shared_lane_stats: Dict = {}
-        
+        self._camera_detections: Dict[int, List[Detection]] = {}
+        self._camera_sources: Dict[int, tuple] = {}       # cam → (trace key, capture_ts) of its detections
+        self.shared_source: Optional[tuple] = None        # Oldest of those, for the overlay
+
         self.latest_frame:   Optional[np.ndarray] = None
         self.latest_metrics: Dict = {}
         self.latest_alerts:  List = []
         self.latest_signals: Dict = {}
-        self.latest_signals: Dict = {}
-        self.incident_history: List[Dict] = []
-        self._last_incident_time: float = 0.0
-        self._on_state: Optional[Callable] = None
+        self._frame_slot: Optional[tuple] = None      # (frame_id, capture_ts, annotated)
+        self._encode_lock = threading.Lock()
+        self._jpeg_cache: Dict[tuple, tuple] = {}     # (quality, camera) → (frame_id, bytes)
+        shape = (self.frame_height, self.frame_width, 3)
+        self._annotated_pool = FramePool(shape, name="annotated")   # Composed and annotated in place
+        self._inference_pool = FramePool(shape, name="inference")
+        self._frame_allocs: deque = deque(maxlen=256)
+        self._frame_count = 0
+        self.inferred_frames = [0] * n
+        self._infer_stamps = [deque(maxlen=64) for _ in range(n)]
+        self.incident_store = IncidentStore()
+        self.incidents = IncidentWorker(self.incident_store, on_change=self._on_incidents)
+        self.clips = ClipRecorder(
+            {name: (lambda cam=cam: self.get_encoded_frame(camera=cam))
+             for cam, name in enumerate(self.cameras) if cam},
+            self.analyzer.alert_store, views_for=self._clip_views) if config.CLIP_ENABLED else None
+        self.publisher = None                         # backend.publisher.Publisher
+        self.recorder  = None                         # core.detection_log, composite coordinates
 
     def _resolve_video(self, path=None) -> str:
+        if isinstance(path, int) or (isinstance(path, str) and "://" in path):
+            return path   # Webcam index or stream URL
         candidates = [path, config.VIDEO_PATH] + config.FALLBACK_VIDEO_PATHS
         for c in candidates:
             if c is None: continue
@@ -69,193 +160,396 @@ class VideoProcessor4Way:
             if os.path.isfile(str(c)): return c
         return 0
 
-    def start(self, on_state: Optional[Callable] = None):
-        self._on_state = on_state
+    def start(self, publisher=None):
+        self.publisher = publisher
         self.is_running = True
-        self._capture_thread_obj = threading.Thread(target=self._capture_thread, daemon=True)
-        self._inference_thread_obj = threading.Thread(target=self._inference_thread, daemon=True)
+        if self.history: self.history.start()
+        self.scheduler.start()
+        self.incidents.start()
+        if self.clips: self.clips.start()
+        self.recorder = live_recorder("multicam", self.frame_width, self.frame_height,
+                                      ",".join(c.name for c in self.topology.cameras),
+                                      junctions=[{"name": j.name, "phase_order": j.spec.phase_order,
+                                                  "polygons": self.topology.lane_polygons(j.spec),
+                                                  "tiles": [self._tile_rect(cam) for cam in j.cameras]}
+                                                 for j in self.junctions])
+        for src in self.sources: src.start()
+        perf.register_collector("sources", lambda: [x for src in self.sources for x in src.perf_samples()])
+        perf.register_collector("buffers", lambda: alloc_samples([self._annotated_pool, self._inference_pool],
+                                                                 self._frame_allocs))
+        self._capture_thread_obj = threading.Thread(target=self._capture_thread, name="compositor", daemon=True)
+        self._inference_thread_obj = threading.Thread(target=self._inference_thread, name="inference", daemon=True)
         self._capture_thread_obj.start()
         self._inference_thread_obj.start()
-        print("[4-Way Processor] Started threads.")
+        print(f"[Multi-Camera Processor] {len(self.sources)} cameras "
+              f"({self.cols}×{self.rows}), {len(self.junctions)} junction(s). Started threads.")
 
     def stop(self):
         self.is_running = False
         if self._capture_thread_obj: self._capture_thread_obj.join(timeout=3.0)
         if self._inference_thread_obj: self._inference_thread_obj.join(timeout=3.0)
+        for src in self.sources: src.stop()
+        if self.history: self.history.stop()
+        self.scheduler.stop()
+        self.incidents.stop()
+        if self.clips: self.clips.stop()
+        if self.recorder: self.recorder.close()
 
-    def draw_quadrant_signals(self, frame, optimizer_signals, qw, qh):
-        positions = {"North": (20, 60), "South": (qw + 20, 60), "East": (20, qh + 40), "West": (qw + 20, qh + 40)}
+    # ── Layout ────────────────────────────────────────────────────────────────
+    def _tile_origin(self, cam: int) -> tuple:
+        row, col = divmod(cam, self.cols)
+        return col * self.tile_w, row * self.tile_h
+
+    def _tile_rect(self, cam: int) -> List[int]:
+        """[x1, y1, x2, y2) of tile `cam` in composite pixels."""
+        x, y = self._tile_origin(cam)
+        return [x, y, x + self.tile_w, y + self.tile_h]
+
+    def _tile(self, frame: np.ndarray, cam: int) -> np.ndarray:
+        x, y = self._tile_origin(cam)
+        return frame[y:y + self.tile_h, x:x + self.tile_w]
+
+    def _to_composite(self, detections: List[Detection], cam: int) -> List[Detection]:
+        """Camera-frame detections → composite coordinates of tile `cam`."""
+        dx, dy = self._tile_origin(cam)
+        return [Detection((d.x1 + dx, d.y1 + dy, d.x2 + dx, d.y2 + dy), d.label, d.confidence,
+                          d.class_id, d.is_vehicle, d.is_person, d.is_ambulance)
+                for d in detections]
+
+    def _camera_of(self, det: Detection) -> int:
+        return (min(det.cy // self.tile_h, self.rows - 1) * self.cols
+                + min(det.cx // self.tile_w, self.cols - 1))
+
+    # ── Drawing ───────────────────────────────────────────────────────────────
+    def draw_approach_signals(self, frame):
+        """A signal badge per approach in its camera's tile (stacked when shared)."""
         STATE_COLORS = {"green": (0,220,100), "yellow": (0,200,255), "red": (80,80,80)}
-        for lane_name, pos in positions.items():
-            if lane_name not in optimizer_signals: continue
-            sig = optimizer_signals[lane_name]
-            state_str = sig.state.value
-            color = STATE_COLORS.get(state_str, (80,80,80))
-            x, y = pos
-            cv2.rectangle(frame, (x-10, y-20), (x+130, y+20), (20,20,20), -1)
-            cv2.rectangle(frame, (x-10, y-20), (x+130, y+20), (80,80,80), 1)
-            cv2.circle(frame, (x+12, y), 10, color, -1)
-            time_txt = f" {sig.time_left:.0f}s" if state_str in ("green", "yellow") else ""
-            cv2.putText(frame, f"{state_str.upper()}{time_txt}", (x+30, y+6), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2, cv2.LINE_AA)
+        stacked: Dict[int, int] = {}
+        for j in self.junctions:
+            for approach in j.spec.approaches:
+                sig = j.optimizer.signals.get(approach.name)
+                if sig is None: continue
+                cam = self.topology.camera_index(approach.camera)
+                k = stacked[cam] = stacked.get(cam, -1) + 1
+                ox, oy = self._tile_origin(cam)
+                x, y = ox + 20, oy + (60 if oy == 0 else 40) + k * 44
+                state_str = sig.state.value
+                color = STATE_COLORS.get(state_str, (80,80,80))
+                label = f"{approach.name[:10]} " if len(self.junctions) > 1 or k else ""
+                time_txt = f" {sig.time_left:.0f}s" if state_str in ("green", "yellow") else ""
+                text = f"{label}{state_str.upper()}{time_txt}"
+                x2 = x + 40 + 12 * len(text) if label else x + 130
+                cv2.rectangle(frame, (x-10, y-20), (x2, y+20), (20,20,20), -1)
+                cv2.rectangle(frame, (x-10, y-20), (x2, y+20), (80,80,80), 1)
+                cv2.circle(frame, (x+12, y), 10, color, -1)
+                cv2.putText(frame, text, (x+30, y+6), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2, cv2.LINE_AA)
+
+    def _compose(self, out: np.ndarray, mark_stale: bool = False, inference: bool = False) -> tuple:
+        """
+        Copy each tile's freshest source frame into `out` → (out, frame_nos,
+        capture_ts). capture_ts is that of the oldest live tile. With
+        mark_stale, a dead or stalled source keeps its last frame, dimmed
+        and labelled STALE. inference=True composes the inference-stride
+        frames instead of the display ones.
+        """
+        with self.state_lock:
+            mapping = list(self.tile_mapping)
+        now = time.time()
+        frame_nos, stamps = [], []
+        for cam in range(self.cols * self.rows):
+            view = self._tile(out, cam)
+            if cam >= len(mapping):
+                view[...] = 0   # Unused grid cell
+                continue
+            src = self.sources[mapping[cam]]
+            item = src.latest_for_inference() if inference else src.latest()
+            frame_nos.append(item[0] if item else 0)
+            if item is not None:
+                np.copyto(view, item[2])
+            else:
+                view[...] = 0
+            # Judged from the item read above: the slot may have moved since
+            stale = item is None or now - item[1] > src.stale_after
+            if not stale:
+                stamps.append(item[1])
+            elif mark_stale:
+                view //= 3
+                age = f"{now - item[1]:.0f}s" if item else "no signal"
+                cv2.putText(view, f"{src.name.upper()} STALE ({age})", (20, self.tile_h // 2),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2, cv2.LINE_AA)
+        return out, tuple(frame_nos), (min(stamps) if stamps else now)
 
     def _capture_thread(self):
-        caps = [cv2.VideoCapture(v) for v in self.v_paths]
-        qw, qh = self.frame_width // 2, self.frame_height // 2
+        """Compositor: freshest frame per source at TARGET_FPS, never waits on a camera."""
         frame_delay = 1.0 / config.TARGET_FPS
 
         while self.is_running:
             start_time = time.time()
-            frames = []
-            for c in caps:
-                ret, f = c.read()
-                if not ret:
-                    c.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                    ret, f = c.read()
-                frames.append(cv2.resize(f, (qw, qh)))
+            self._frame_count += 1
+            pooled = self._allocations()
+            compose_t0 = time.time()
+            with perf.timer("compose"):
+                annotated, _, capture_ts = self._compose(self._annotated_pool.acquire(), mark_stale=True)
+            frame_id = self._frame_count
+            trace = lineage.begin(frame_id, capture_ts)
+            lineage.mark(frame_id, "compose", compose_t0, time.time())
 
             with self.state_lock:
-                q_map = list(self.quadrant_mapping)
-
-            mapped_frames = [frames[q_map[i]] for i in range(4)]
-            top_row = np.hstack((mapped_frames[0], mapped_frames[1]))
-            bot_row = np.hstack((mapped_frames[2], mapped_frames[3]))
-            composite = np.vstack((top_row, bot_row))
-
-            with self.state_lock:
-                self.raw_frame = composite.copy()
                 current_detections = list(self.shared_detections)
                 current_tracks = list(self.shared_tracks)
                 current_lane_stats = dict(self.shared_lane_stats)
-                self.latest_metrics = self.analyzer.metrics
+                overlay_source = self.shared_source
+                self.latest_metrics = self._metrics()
                 self.latest_alerts  = [a.to_dict() for a in self.analyzer.alerts[-5:]]
-                self.latest_signals = self.optimizer.get_metrics()
-                
-            annotated = composite.copy()
-            self.lane_mgr.draw_lanes(annotated)
-            if current_detections: self.detector.draw(annotated, current_detections)
-            if current_tracks: self.tracker.draw_tracks(annotated, current_tracks)
-            
-            self.optimizer.draw_signal_panel(annotated, x=10, y=10)
-            self.draw_quadrant_signals(annotated, self.optimizer.signals, qw, qh)
-            
+                self.latest_signals = self._signal_metrics()
+
+            with lineage.span(frame_id, "draw"):
+                for j in self.junctions: j.lane_mgr.draw_lanes(annotated)
+                if current_detections: self.detector.draw(annotated, current_detections)
+                if current_tracks: self.tracker.draw_tracks(annotated, current_tracks)
+
+                if len(self.junctions) == 1:
+                    self.optimizer.draw_signal_panel(annotated, x=10, y=10)
+                self.draw_approach_signals(annotated)
+
             self.latest_frame = annotated
-            
-            # ── Incident Detection Pipeline ──
-            now = time.time()
-            if now - self._last_incident_time > 10.0:  # 10s cooldown between captured incidents
-                detected_incidents = []
-                
-                person_count = sum(1 for t in current_tracks if t.is_person)
-                
-                # Check for critical/high alerts from the analyzer
-                critical_alerts = [a for a in self.latest_alerts if a['severity'] in ('critical', 'high')]
-                
-                if critical_alerts:
-                    for a in critical_alerts:
-                        if a.get("type") == "accident" or a.get("type") == "scene" or a.get("type") == "stall":
-                            # Use exact type field name 'accident'
-                            pass
-                        if a.get("type") == "accident" or a.get("alert_type") == "accident":
-                            detected_incidents.append({
-                                "type": "accident",
-                                "description": a["message"]
-                            })
-                            break
-                        elif "AMBULANCE" in a["message"]:
-                            detected_incidents.append({
-                                "type": "ambulance",
-                                "description": f"Ambulance detected passing through {a['lane']} lane."
-                            })
-                            break
-                
-                # Check for Crowd
-                if person_count > 12:
-                    detected_incidents.append({
-                                "type": "crowd",
-                                "description": f"Large crowd of {person_count} pedestrians crossing."
-                    })
-                
-                # Check for Suspicious Stalls
-                is_accident_running = any(idx['type'] == 'accident' for idx in detected_incidents)
-                if not is_accident_running:
-                    for lane, stats in current_lane_stats.items():
-                        if stats.max_wait_time > 120.0: # 2 minutes
-                            detected_incidents.append({
-                                "type": "parking",
-                                "description": f"Potential stalled or illegally parked vehicle in {lane} lane."
-                            })
-                            break
-                
-                if detected_incidents:
-                    _, buf = cv2.imencode(".jpg", annotated, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                    b64_frame = base64.b64encode(buf.tobytes()).decode("utf-8")
-                    with self.state_lock:
-                        for inc in detected_incidents:
-                            self.incident_history.insert(0, {
-                                "type": inc["type"],
-                                "description": inc["description"],
-                                "timestamp": now,
-                                "frame_b64": b64_frame
-                            })
-                        # Keep only the last 15 incidents in memory
-                        while len(self.incident_history) > 15:
-                            self.incident_history.pop()
-                    self._last_incident_time = now
-            # ─────────────────────────────────
-            
-            if self._on_state:
-                try:
-                    self._on_state({
-                        "metrics": self.latest_metrics,
-                        "alerts":  self.latest_alerts,
-                        "signals": self.latest_signals,
-                        "chart":   self.analyzer.get_chart_data(),
-                    })
-                except Exception: pass
-            
+            self._frame_slot  = (frame_id, capture_ts, annotated)
+            lineage.since("overlay_age", overlay_source, capture_ts)
+            if trace is not None and overlay_source is not None:
+                trace.attrs["overlay_from"] = overlay_source[0]
+            if self.publisher:
+                self.publisher.publish_lazy("frame", self.get_encoded_frame, binary=True)
+                self.publisher.publish("signals", self.latest_signals)
+            self._frame_allocs.append(self._allocations() - pooled)
+
+            self.incidents.offer(annotated, current_tracks, self.latest_alerts, current_lane_stats)
+
             elapsed = time.time() - start_time
             time.sleep(max(0, frame_delay - elapsed))
-            
-        for c in caps: c.release()
+
+    # ── Inference ─────────────────────────────────────────────────────────────
+    def _detect_composite(self, seen: Dict) -> bool:
+        """One detector call over the whole composite, split back per tile."""
+        frame_nos = tuple(src.inference_no for src in self.sources)
+        if seen.get("composite") == frame_nos or not any(frame_nos):
+            return False
+        seen["composite"] = frame_nos
+        frame, _, capture_ts = self._compose(self._inference_pool.acquire(), inference=True)
+        source = (f"composite#{'-'.join(map(str, frame_nos))}", capture_ts)
+        lineage.begin(source[0], capture_ts, cameras=list(self.cameras[1:]))
+        by_camera: Dict[int, List[Detection]] = {cam: [] for cam in self._inferred_cameras}
+        emergency = any(d.is_ambulance for dets in self._camera_detections.values() for d in dets)
+        with lineage.span(source[0], "inference"):
+            detections = self.inference.detect(frame, priority=emergency)
+        for det in detections:
+            cam = self._camera_of(det)
+            if cam in by_camera:
+                by_camera[cam].append(det)
+        self._camera_detections = by_camera
+        for cam in by_camera:
+            self._camera_sources[cam] = source
+            self._count_inference(cam)
+        return True
+
+    def _detect_cameras(self, seen: Dict) -> bool:
+        """Every camera with a new frame, submitted at once so they share a batch."""
+        with self.state_lock:
+            mapping = list(self.tile_mapping)
+        pending = {}
+        for cam in self._inferred_cameras:
+            src_idx = mapping[cam]
+            src = self.sources[src_idx]
+            if src.inference_no == 0 or seen.get(cam) == (src_idx, src.inference_no):
+                continue
+            frame_no, capture_ts, frame = src.latest_for_inference()
+            seen[cam] = (src_idx, frame_no)
+            source = (f"{src.name}#{frame_no}", capture_ts)
+            lineage.begin(source[0], capture_ts, camera=self.cameras[cam + 1])
+            emergency = any(d.is_ambulance for d in self._camera_detections.get(cam, ()))
+            pending[cam] = (source, time.time(), self.inference.submit(frame, priority=emergency))
+        for cam, (source, t0, fut) in pending.items():
+            self._camera_detections[cam] = self._to_composite(fut.result(), cam)
+            lineage.mark(source[0], "inference", t0, time.time())
+            self._camera_sources[cam] = source
+            self._count_inference(cam)
+        return bool(pending)
+
+    def _oldest_source(self, cams) -> Optional[tuple]:
+        """Source of the stalest detections among `cams` (what a decision is only as fresh as)."""
+        sources = [self._camera_sources[c] for c in cams if c in self._camera_sources]
+        return min(sources, key=lambda s: s[1]) if sources else None
+
+    def _count_inference(self, cam: int):
+        self.inferred_frames[cam] += 1
+        self._infer_stamps[cam].append(time.monotonic())
 
     def _inference_thread(self):
+        seen: Dict = {}
+        detect = self._detect_composite if config.DETECT_ON_COMPOSITE else self._detect_cameras
         while self.is_running:
-            with self.state_lock: frame_to_process = self.raw_frame
-            if frame_to_process is None: time.sleep(0.01); continue
-            
-            detections = self.detector.detect(frame_to_process)
-            tracks = self.tracker.update(detections)
-            lane_stats = self.lane_mgr.update(tracks)
-            
-            self.optimizer.update_phase_duration(lane_stats)
-            self.optimizer.update(lane_stats)
-            self.analyzer.update(tracks, lane_stats, list(detections))
-            
+            if not detect(seen):
+                time.sleep(0.005); continue
+
+            tracks, lane_stats = [], {}
+            for j in self.junctions:
+                j_detections = [d for cam in j.cameras for d in self._camera_detections.get(cam, ())]
+                j_source = self._oldest_source(j.cameras)
+                key = j_source[0] if j_source else None
+                with lineage.span(key, "track", camera=j.name):
+                    j_tracks = j.tracker.update(j_detections)
+                with lineage.span(key, "lane", camera=j.name):
+                    j_stats  = j.lane_mgr.update(j_tracks)
+                self.scheduler.submit(j_stats, key=j.name, source=j_source)
+                with lineage.span(key, "analyze", camera=j.name):
+                    j.analyzer.update(j_tracks, j_stats, j_detections)
+                lineage.since("analysis", j_source)
+                tracks.extend(t for t in j_tracks if self._track_owner.get(self._camera_of(t)) is j)
+                lane_stats.update(j_stats)
+            if self.history: self.history.record(lane_stats)
+            detections = [d for dets in self._camera_detections.values() for d in dets]
+            if self.recorder: self.recorder.record(time.time(), detections)
+
+            if self.publisher:
+                self.publisher.publish("metrics", self._metrics())
+                self.publisher.publish("alerts", [a.to_dict() for a in self.analyzer.alerts[-5:]])
+                self.publisher.publish_lazy("chart", self._chart_data)
+
             with self.state_lock:
                 self.shared_detections, self.shared_tracks, self.shared_lane_stats = detections, tracks, lane_stats
+                self.shared_source = self._oldest_source(self._inferred_cameras)
             time.sleep(0.01)
 
+    # ── State ─────────────────────────────────────────────────────────────────
+    def _metrics(self) -> Dict:
+        metrics = self.analyzer.metrics
+        if len(self.junctions) > 1:
+            metrics = {**metrics, "junctions": {j.name: j.analyzer.metrics for j in self.junctions}}
+        return metrics
+
+    def _chart_data(self) -> Dict:
+        chart = {}
+        for j in reversed(self.junctions):   # Primary last: its labels win
+            chart.update(j.analyzer.get_chart_data())
+        return chart
+
+    def _signal_metrics(self) -> Dict:
+        signals = self.scheduler.get_metrics(self.junctions[0].name)
+        signals["scheduler"] = self.scheduler.get_stats()
+        if len(self.junctions) > 1:
+            signals["junctions"] = {j.name: self.scheduler.get_metrics(j.name) for j in self.junctions}
+        return signals
+
+    def _clip_views(self, alert) -> List[str]:
+        """Cameras behind the alert's approach; every camera if it names none."""
+        cams = [a.camera for j in self.topology.junctions for a in j.approaches if a.name == alert.lane]
+        return cams or list(self.cameras[1:])
+
+    def _on_incidents(self, recent: List[Dict]):
+        """Incident worker thread: a snapshot was written."""
+        if self.publisher: self.publisher.publish("incidents", recent)
+
+    def _on_signal_change(self, key: str, signals: Dict):
+        self.latest_signals = self._signal_metrics()
+        if self.publisher: self.publisher.publish("signals", self.latest_signals)
+
+    @property
+    def frame_id(self) -> int:
+        slot = self._frame_slot
+        return slot[0] if slot else 0
+
+    def get_encoded_frame(self, quality: int = None, camera: int = 0) -> Optional[tuple]:
+        """
+        (frame_id, capture_ts, jpeg_bytes) for the composite (camera 0) or one
+        tile (1–N, see .cameras), encoded once per frame, quality and view.
+        """
+        slot = self._frame_slot
+        if slot is None: return None
+        frame_id, capture_ts, frame = slot
+        q = quality or config.STREAM_JPEG_QUALITY
+        key = (q, camera)
+        with self._encode_lock:
+            cached = self._jpeg_cache.get(key)
+            if cached is None or cached[0] != frame_id:
+                view = self._tile(frame, camera - 1) if camera else frame
+                with lineage.span(frame_id, "jpeg_encode", camera=self.cameras[camera]):
+                    _, buf = cv2.imencode(".jpg", view, [cv2.IMWRITE_JPEG_QUALITY, q])
+                cached = self._jpeg_cache[key] = (frame_id, buf.tobytes())
+        return frame_id, capture_ts, cached[1]
+
     def get_jpeg_frame(self, quality: int = None) -> Optional[bytes]:
-        if self.latest_frame is None: return None
-        _, buf = cv2.imencode(".jpg", self.latest_frame, [cv2.IMWRITE_JPEG_QUALITY, quality or config.STREAM_JPEG_QUALITY])
-        return buf.tobytes()
-        
+        encoded = self.get_encoded_frame(quality)
+        return encoded[2] if encoded else None
+
     def get_b64_frame(self) -> str:
         jpg = self.get_jpeg_frame()
         return base64.b64encode(jpg).decode("utf-8") if jpg else None
 
-    def get_state(self) -> Dict:
-        return {
+    def get_state(self, include_frame: bool = False) -> Dict:
+        state = {
             "metrics": self.latest_metrics, "alerts": self.latest_alerts,
-            "signals": self.latest_signals, "chart": self.analyzer.get_chart_data(),
-            "frame_b64": self.get_b64_frame(),
+            "signals": self.latest_signals, "chart": self._chart_data(),
         }
+        if include_frame: state["frame_b64"] = self.get_b64_frame()
+        return state
+
+    def profile_threads(self) -> Dict[str, threading.Thread]:
+        """Threads /api/debug/profile can sample: compositor (alias capture), inference, decoders."""
+        threads = {"capture": self._capture_thread_obj, "compositor": self._capture_thread_obj,
+                   "inference": self._inference_thread_obj}
+        threads.update({f"decode-{src.name}": src._thread for src in self.sources})
+        return threads
 
-    def get_incident_history(self) -> List[Dict]:
+    def get_pipeline_stats(self) -> Dict:
         with self.state_lock:
-            return list(self.incident_history)
+            mapping = list(self.tile_mapping)
+        cameras = []
+        for cam, name in enumerate(self.cameras[1:]):
+            stamps = self._infer_stamps[cam]
+            fps = (len(stamps) - 1) / max(stamps[-1] - stamps[0], 1e-6) if len(stamps) > 1 else 0.0
+            cameras.append({
+                "name":          name,
+                "source":        self.sources[mapping[cam]].name,
+                "inferred":      self.inferred_frames[cam],
+                "inference_fps": round(fps, 1),
+            })
+        return {
+            "mode": "threads",
+            "threads": {
+                "compositor": bool(self._capture_thread_obj and self._capture_thread_obj.is_alive()),
+                "inference":  bool(self._inference_thread_obj and self._inference_thread_obj.is_alive()),
+            },
+            "detect": "composite" if config.DETECT_ON_COMPOSITE else "per_camera",
+            "frames_rendered": self.frame_id,
+            "cameras": cameras,
+            "inference": self.inference.get_stats(),
+            "incidents": self.incidents.get_stats(),
+            "clips": self.clips.get_stats() if self.clips else None,
+            "sources": [src.get_stats() for src in self.sources],
+            "buffers": alloc_stats([self._annotated_pool, self._inference_pool], self._frame_allocs),
+        }
 
-    def set_quadrant_mapping(self, mapping: List[int]):
-        if len(mapping) == 4:
-            with self.state_lock:
-                self.quadrant_mapping = mapping
+    def _allocations(self) -> int:
+        """Full-frame allocations so far across sources and pools."""
+        return (self._annotated_pool.allocations + self._inference_pool.allocations
+                + sum(src.allocations for src in self.sources))
+
+    def get_incident_history(self, since: int = 0, limit: int = None) -> List[Dict]:
+        """Incident metadata newer than `since`, newest first (images via incident_store.path)."""
+        return self.incident_store.since(since, limit or config.INCIDENT_RECENT)
+
+    def set_tile_mapping(self, mapping: List[int]) -> bool:
+        """Show/infer source mapping[i] in tile i (a permutation of 0..N-1)."""
+        if sorted(mapping) != list(range(len(self.sources))):
+            return False
+        with self.state_lock:
+            self.tile_mapping = list(mapping)
+        return True
+
+    set_quadrant_mapping = set_tile_mapping
+
+
+class VideoProcessor4Way(MultiCameraProcessor):
+    """The classic layout: four feeds, one North/South/East/West junction."""
+
+    def __init__(self, v_north="north.mp4", v_south="south.mp4", v_east="east.mp4", v_west="west.mp4", frame_width=None, frame_height=None):
+        super().__init__(Topology.four_way(v_north, v_south, v_east, v_west), frame_width, frame_height)
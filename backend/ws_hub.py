@@ -0,0 +1,284 @@
+"""
+backend/ws_hub.py — Per-Client Topic Fan-Out with Backpressure
+===============================================================
+WebSocket side of backend/publisher.py. Shared by main.py and main_4way.py.
+
+  - Every WebSocket gets a ClientChannel with one LATEST-only slot per
+    subscribed topic. A slow consumer overwrites its slot (counted as a
+    drop) instead of accumulating a backlog, so one client on a bad link
+    never delays the others.
+  - Each topic is sent at most at the client's rate for it (Hz, 0 = on
+    every change); see state_protocol.parse_topics().
+  - Protocol 2 clients get per-topic snapshot + patches (JSON or
+    MessagePack); the "frame" topic goes out as binary frame_protocol
+    messages. A patch is always computed against what THAT client last
+    received, so dropped intermediate versions never corrupt its view.
+  - Protocol 1 clients get the combined legacy state (metrics, alerts,
+    signals, chart) as one JSON message per change.
+  - Per-client counters: sent, dropped, bytes, lag (publish → send complete).
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Dict, Optional, Set, Union
+
+import numpy as np
+from fastapi import WebSocket
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from backend import state_protocol as sp
+from backend.frame_protocol import pack_frame
+from backend.publisher import Publisher, TopicEntry
+from core.perf import perf
+from core.lineage import lineage
+
+LEGACY_TOPICS = ("metrics", "alerts", "signals", "chart")
+
+
+class ClientChannel:
+    """Per-topic latest-only outbound slots, rates and stats for one WebSocket."""
+
+    def __init__(self, ws: WebSocket, client_id: int, proto: int = 1, fmt: str = "json",
+                 rates: Dict[str, float] = None):
+        self.ws = ws
+        self.client_id = client_id
+        self.proto = proto
+        self.fmt = fmt
+        self.rates: Dict[str, float] = dict(rates or {})
+        self.peer = f"{ws.client.host}:{ws.client.port}" if ws.client else "?"
+        self.connected_at = time.time()
+
+        self._pending: Dict[str, TopicEntry] = {}
+        self._next_due: Dict[str, float] = {}
+        self._held: Dict[str, tuple] = {}          # topic → (version, value) the client holds
+        self._event = asyncio.Event()
+
+        self.sent = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+        self._lag_ms: deque = deque(maxlen=256)
+
+    def set_rates(self, rates: Dict[str, float]):
+        """Replace the subscription; topics no longer wanted are forgotten."""
+        for topic in set(self.rates) - set(rates):
+            self._pending.pop(topic, None)
+            self._held.pop(topic, None)
+            self._next_due.pop(topic, None)
+        self.rates = dict(rates)
+        self._event.set()
+
+    def wants(self, topic: str, version: int) -> bool:
+        held = self._held.get(topic)
+        return topic in self.rates and (held is None or held[0] < version)
+
+    def offer(self, entry: TopicEntry):
+        """Event-loop side: replace whatever is pending for the topic."""
+        if entry.topic not in self.rates:
+            return
+        if entry.topic in self._pending:
+            self.dropped += 1
+            perf.count("ws_dropped", topic=entry.topic)
+        self._pending[entry.topic] = entry
+        self._event.set()
+
+    def resync(self, entry: Optional[TopicEntry]):
+        """Next message for the topic is a full snapshot."""
+        if entry is None:
+            return
+        self._held.pop(entry.topic, None)
+        self.offer(entry)
+
+    def _payload(self, entry: TopicEntry) -> Union[str, bytes, None]:
+        if entry.binary:
+            encoded = entry.value
+            if encoded is None:
+                return None
+            frame_id, capture_ts, jpg = encoded
+            return pack_frame(frame_id, capture_ts, jpg)
+        if self.proto == 1:
+            return entry.legacy()
+        held = self._held.get(entry.topic)
+        if held is None:
+            return entry.encoded("snapshot", self.fmt)
+        # Shared patch when the client is one version behind, else its own
+        return entry.encoded("patch", self.fmt, held[0], held[1])
+
+    async def run(self):
+        """Send due messages until the socket fails."""
+        while True:
+            now = time.monotonic()
+            due = [t for t in self._pending if self._next_due.get(t, 0.0) <= now]
+            if not due:
+                waits = [self._next_due[t] - now for t in self._pending]
+                self._event.clear()
+                try:
+                    await asyncio.wait_for(self._event.wait(), min(waits) if waits else None)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            for topic in due:
+                entry = self._pending.pop(topic, None)
+                if entry is None:
+                    continue
+                if not entry.resolved:
+                    await asyncio.to_thread(lambda: entry.value)   # Lazy build off the loop
+                payload = self._payload(entry)
+                if payload is None:
+                    continue
+                t0 = time.time()
+                if isinstance(payload, bytes):
+                    await self.ws.send_bytes(payload)
+                else:
+                    await self.ws.send_text(payload)
+                t1 = time.time()
+                perf.observe("ws_send", t1 - t0, camera=topic)
+                if entry.binary:   # (frame_id, capture_ts, jpeg)
+                    frame_id, capture_ts, _ = entry.value
+                    lineage.mark(frame_id, "ws_send", t0, t1, client=self.client_id)
+                    lineage.latency("glass_to_glass", t1 - capture_ts)
+                if not entry.binary:
+                    self._held[topic] = (entry.version, entry.value)
+                rate = self.rates.get(topic, 0.0)
+                self._next_due[topic] = time.monotonic() + (1.0 / rate if rate > 0 else 0.0)
+                self.sent += 1
+                self.bytes_sent += len(payload)
+                self._lag_ms.append((time.monotonic() - entry.published) * 1000.0)
+
+    def get_stats(self) -> Dict:
+        lag = np.asarray(self._lag_ms, dtype=float)
+        return {
+            "id":           self.client_id,
+            "peer":         self.peer,
+            "proto":        self.proto,
+            "fmt":          self.fmt,
+            "topics":       self.rates,
+            "connected_s":  round(time.time() - self.connected_at, 1),
+            "sent":         self.sent,
+            "dropped":      self.dropped,
+            "bytes_sent":   self.bytes_sent,
+            "lag_ms": {
+                "last": round(float(lag[-1]), 2) if lag.size else 0.0,
+                "p50":  round(float(np.percentile(lag, 50)), 2) if lag.size else 0.0,
+                "p99":  round(float(np.percentile(lag, 99)), 2) if lag.size else 0.0,
+            },
+        }
+
+
+class StateHub:
+    """
+    WebSocket fan-out of a Publisher.
+
+    Usage:
+        pub = Publisher(); hub = StateHub(pub)
+        pub.bind(asyncio.get_running_loop())                       # at startup
+        processor.start(publisher=pub)
+        await hub.serve(ws, proto=2, topics="metrics:5,signals")    # in /ws
+    """
+
+    def __init__(self, publisher: Publisher):
+        self.publisher = publisher
+        self._channels: Dict[int, ClientChannel] = {}
+        self._next_id = 0
+        self._legacy: Optional[TopicEntry] = None
+        self._legacy_version = 0
+        publisher.subscribe(self._on_publish)
+        perf.register_collector("ws", lambda: [("gauge", "ws_clients", {}, len(self._channels))])
+
+    # ── Fan-out (event loop) ──────────────────────────────────────────────────
+    def _on_publish(self, topics: Set[str]):
+        channels = list(self._channels.values())
+        for topic in topics:
+            entry = self.publisher.latest(topic)
+            for ch in channels:
+                if ch.proto == 2 and ch.wants(topic, entry.version):
+                    ch.offer(entry)
+
+        if topics & set(LEGACY_TOPICS):
+            self._legacy = None
+            legacy_clients = [ch for ch in channels if ch.proto == 1]
+            legacy = self._legacy_entry() if legacy_clients else None
+            if legacy is not None:
+                for ch in legacy_clients:
+                    ch.offer(legacy)
+
+    def _legacy_entry(self) -> Optional[TopicEntry]:
+        """Combined protocol-1 state, built at most once per change."""
+        if self._legacy is None:
+            parts = {t: self.publisher.latest(t) for t in LEGACY_TOPICS}
+            if parts["metrics"] is None:
+                return None
+            self._legacy_version += 1
+            self._legacy = TopicEntry(
+                "state", self._legacy_version,
+                build=lambda: {t: (e.value if e else {}) for t, e in parts.items()})
+        return self._legacy
+
+    # ── Consumer side (event loop) ────────────────────────────────────────────
+    async def serve(self, ws: WebSocket, proto: int = 1, fmt: str = "json", topics=None):
+        """Run one client until it disconnects. The socket must be accepted."""
+        self._next_id += 1
+        rates = {"state": 0.0} if proto == 1 else sp.parse_topics(topics, config.PUBLISH_RATES)
+        ch = ClientChannel(ws, self._next_id, proto, fmt, rates)
+        self._channels[ch.client_id] = ch
+        self._offer_latest(ch, rates)
+
+        sender = asyncio.create_task(ch.run())
+        try:
+            while True:
+                receiver = asyncio.create_task(ws.receive())
+                done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+                if sender in done:
+                    receiver.cancel()
+                    break
+                message = receiver.result()
+                if message.get("type") == "websocket.disconnect":
+                    break
+                self._on_client_message(ch, message.get("text"))
+        except Exception:
+            pass
+        finally:
+            sender.cancel()
+            self._channels.pop(ch.client_id, None)
+
+    def _offer_latest(self, ch: ClientChannel, topics):
+        for topic in topics:
+            entry = self._legacy_entry() if topic == "state" else self.publisher.latest(topic)
+            if entry is not None:
+                ch.offer(entry)
+
+    def _on_client_message(self, ch: ClientChannel, text: Optional[str]):
+        try:
+            msg = json.loads(text) if text else {}
+        except ValueError:
+            return
+        if not isinstance(msg, dict):
+            return
+        if ch.proto == 1:
+            if msg.get("type") == "resync":
+                ch.resync(self._legacy_entry())
+        elif msg.get("type") == "subscribe":
+            rates = sp.parse_topics(msg.get("topics") or {}, config.PUBLISH_RATES)
+            added = set(rates) - set(ch.rates)
+            ch.set_rates(rates)
+            self._offer_latest(ch, added)
+        elif msg.get("type") == "resync":
+            wanted = [msg["topic"]] if msg.get("topic") else list(ch.rates)
+            for topic in wanted:
+                if topic in ch.rates:
+                    ch.resync(self.publisher.latest(topic))
+
+    # ── Stats ─────────────────────────────────────────────────────────────────
+    @property
+    def client_count(self) -> int:
+        return len(self._channels)
+
+    def get_stats(self) -> Dict:
+        return {
+            "topics":  self.publisher.get_stats(),
+            "clients": [ch.get_stats() for ch in list(self._channels.values())],
+        }
@@ -0,0 +1,187 @@
+"""
+benchmarks/bench_pipeline.py — Post-Inference Stage Benchmarks
+==============================================================
+Times each stage after the detector, and the whole post-inference
+pipeline, on seeded synthetic scenes (benchmarks/synthetic.py) at several
+object counts:
+
+  tracker.update             CentroidTracker.update(detections)
+  lane_manager.update        LaneManager.update(tracks)
+  analyzer.check_accidents   TrafficAnalyzer._check_accidents(...)
+  analyzer.build_metrics     TrafficAnalyzer._build_metrics(...)
+  analyzer.update            TrafficAnalyzer.update(...)
+  lane_manager.draw_lanes    LaneManager.draw_lanes(frame)
+  get_state                  VideoProcessor.get_state() + JSON encoding
+  pipeline                   tracker → lanes → optimizer → analyzer, one frame
+
+Time runs on a SimulatedClock at TARGET_FPS, so waits and alert logic see
+the same history every run. Results are JSON; --baseline compares medians
+against a stored run and flags stages slower than --tolerance.
+
+Usage:
+    python -m benchmarks.bench_pipeline --sizes 10,100,1000 --json out.json
+    python -m benchmarks.bench_pipeline --baseline benchmarks/baselines/pipeline.json
+    python -m benchmarks.bench_pipeline --save-baseline benchmarks/baselines/pipeline.json
+"""
+
+import argparse
+import json
+import platform
+import time
+from typing import Callable, Dict, List
+import numpy as np
+import sys, os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from core import clock
+from core.lane_manager import LaneManager
+from core.signal_optimizer import SignalOptimizer
+from core.tracker import CentroidTracker
+from core.traffic_analyzer import TrafficAnalyzer
+from benchmarks.synthetic import PATTERNS, SyntheticScene
+
+STAGES = ["tracker.update", "lane_manager.update", "analyzer.check_accidents",
+          "analyzer.build_metrics", "analyzer.update", "lane_manager.draw_lanes",
+          "get_state", "pipeline"]
+
+
+def _time(fn: Callable[[], object], reps: int, budget: float) -> Dict:
+    """Per-call times of fn (at least 3 calls, up to reps or budget seconds)."""
+    samples = []
+    start = time.perf_counter()
+    while len(samples) < reps and (len(samples) < 3 or time.perf_counter() - start < budget):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    us = np.asarray(samples) * 1e6
+    return {"calls": len(samples), "median_us": round(float(np.median(us)), 1),
+            "p90_us": round(float(np.percentile(us, 90)), 1), "mean_us": round(float(us.mean()), 1)}
+
+
+def bench(n: int, pattern: str = "mixed", lanes: str = "default", reps: int = 200,
+          warmup: int = 60, budget: float = 1.0, seed: int = 0) -> List[Dict]:
+    from backend.video_processor import VideoProcessor
+
+    scene = SyntheticScene(n, lanes=lanes, pattern=pattern, seed=seed)
+    frames = [scene.step() for _ in range(warmup + 2 * reps)]
+    feed = iter(frames)
+    dt = 1.0 / config.TARGET_FPS
+    sim = clock.SimulatedClock(0.0)
+    results = []
+
+    with clock.use_clock(sim):
+        tracker   = CentroidTracker(max_disappeared=8, max_distance=100)
+        lane_mgr  = LaneManager(scene.width, scene.height, polygons=scene.polygons)
+        analyzer  = TrafficAnalyzer()
+        optimizer = SignalOptimizer()
+        state = {}
+
+        def pipeline_step():
+            sim.advance(dt)
+            dets = next(feed)
+            tracks = tracker.update(dets)
+            stats = lane_mgr.update(tracks)
+            optimizer.update_phase_duration(stats)
+            optimizer.update(stats)
+            analyzer.update(tracks, stats, dets)
+            state.update(dets=dets, tracks=tracks, stats=stats)
+
+        for _ in range(warmup):
+            pipeline_step()
+        dets, tracks, stats = state["dets"], state["tracks"], state["stats"]
+
+        def tracker_step():
+            sim.advance(dt)
+            tracker.update(next(feed))
+
+        proc = VideoProcessor.__new__(VideoProcessor)   # Only the state get_state() reads
+        proc.analyzer = analyzer
+        proc.latest_metrics = analyzer.metrics
+        proc.latest_alerts  = [a.to_dict() for a in analyzer.alerts[-5:]]
+        proc.latest_signals = optimizer.get_metrics()
+        canvas = np.zeros((scene.height, scene.width, 3), np.uint8)
+
+        stages = {
+            "tracker.update":           tracker_step,
+            "lane_manager.update":      lambda: lane_mgr.update(tracks),
+            "analyzer.check_accidents": lambda: analyzer._check_accidents(tracks, dets, stats),
+            "analyzer.build_metrics":   lambda: analyzer._build_metrics(tracks, stats, dets),
+            "analyzer.update":          lambda: analyzer.update(tracks, stats, dets),
+            "lane_manager.draw_lanes":  lambda: lane_mgr.draw_lanes(canvas),
+            "get_state":                lambda: json.dumps(proc.get_state(), default=str),
+            "pipeline":                 pipeline_step,
+        }
+        for name in STAGES:
+            r = _time(stages[name], reps, budget)
+            results.append({"stage": name, "objects": n, **r})
+    return results
+
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float) -> List[Dict]:
+    """Annotate results with ratio to baseline; returns the regressions."""
+    base = {(r["stage"], r["objects"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        b = base.get((r["stage"], r["objects"]))
+        if not b or not b["median_us"]:
+            continue
+        r["baseline_us"] = b["median_us"]
+        r["ratio"] = round(r["median_us"] / b["median_us"], 3)
+        if r["ratio"] > 1.0 + tolerance:
+            regressions.append(r)
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark the post-inference pipeline stages")
+    ap.add_argument("--sizes", default="10,100,1000", help="Object counts per frame")
+    ap.add_argument("--pattern", default="mixed", choices=PATTERNS)
+    ap.add_argument("--lanes", default="default", help="default | 4way | lanesN")
+    ap.add_argument("--reps", type=int, default=200, help="Max calls per stage")
+    ap.add_argument("--budget", type=float, default=1.0, help="Max seconds per stage")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", help="Write results to this file")
+    ap.add_argument("--baseline", help="Compare against this results file")
+    ap.add_argument("--save-baseline", help="Write results as the new baseline here")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    args = ap.parse_args(argv)
+
+    results = []
+    for n in args.sizes.split(","):
+        results += bench(int(n), args.pattern, args.lanes, args.reps, budget=args.budget, seed=args.seed)
+    report = {
+        "meta": {
+            "python": platform.python_version(), "numpy": np.__version__,
+            "machine": platform.machine(), "platform": platform.platform(),
+            "pattern": args.pattern, "lanes": args.lanes, "seed": args.seed,
+            "created": time.time(),
+        },
+        "results": results,
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        report["regressions"] = [(r["stage"], r["objects"]) for r in regressions]
+
+    print(f"{'stage':<26} {'N':>5} {'median µs':>11} {'p90 µs':>10} {'calls':>6} {'vs base':>8}")
+    for r in results:
+        ratio = f"{r['ratio']:.2f}x" if "ratio" in r else "-"
+        flag = "  SLOWER" if r in regressions else ""
+        print(f"{r['stage']:<26} {r['objects']:>5} {r['median_us']:>11} {r['p90_us']:>10} "
+              f"{r['calls']:>6} {ratio:>8}{flag}")
+
+    for path in filter(None, (args.json, args.save_baseline)):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+    if regressions:
+        print(f"[bench] {len(regressions)} stage(s) slower than baseline by more than "
+              f"{args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+benchmarks/bench_signal_bank.py — SignalControllerBank vs SignalOptimizer
+=========================================================================
+Times one control step for a corridor of N intersections, either as N
+SignalOptimizer objects or as a single vectorized SignalControllerBank.
+
+Usage:
+    python -m benchmarks.bench_signal_bank --sizes 10,100,1000 --steps 200
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+import sys, os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core import clock
+from core.lane_manager import LaneStats
+from core.signal_bank import SignalControllerBank
+from core.signal_optimizer import SignalOptimizer
+
+
+def _random_stats(rng, n: int):
+    """N dicts of lane → LaneStats with random load and rare ambulances."""
+    out = []
+    for _ in range(n):
+        d = {}
+        for name in SignalOptimizer.PHASE_ORDER:
+            d[name] = LaneStats(
+                name=name,
+                vehicle_count=int(rng.integers(0, 30)),
+                density_ratio=float(rng.random()),
+                avg_wait_time=float(rng.random() * 30),
+                queue_length=int(rng.integers(0, 10)),
+                ambulance_present=bool(rng.random() < 0.001),
+            )
+        out.append(d)
+    return out
+
+
+def bench(n: int, steps: int, dt: float = 0.1, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    frames = [_random_stats(rng, n) for _ in range(min(steps, 20))]
+
+    # ── N independent Python state machines ─────────────────────────────────
+    sim = clock.SimulatedClock(0.0)
+    with clock.use_clock(sim):
+        opts = [SignalOptimizer() for _ in range(n)]
+        t0 = time.perf_counter()
+        for k in range(steps):
+            stats = frames[k % len(frames)]
+            for opt, s in zip(opts, stats):
+                opt.update_phase_duration(s)
+                opt.update(s)
+            sim.advance(dt)
+        objects_s = (time.perf_counter() - t0) / steps
+
+    # ── One vectorized bank (inputs pre-converted, as a batched feed would be) ──
+    sim = clock.SimulatedClock(0.0)
+    with clock.use_clock(sim):
+        bank = SignalControllerBank(n)
+        arrays = [bank.arrays_from_lane_stats(s) for s in frames]
+        t0 = time.perf_counter()
+        for k in range(steps):
+            bank.step(*arrays[k % len(arrays)])
+            sim.advance(dt)
+        bank_s = (time.perf_counter() - t0) / steps
+
+    return {
+        "intersections": n,
+        "optimizer_objects_us": round(objects_s * 1e6, 1),
+        "bank_us":              round(bank_s * 1e6, 1),
+        "speedup":              round(objects_s / max(bank_s, 1e-12), 1),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark SignalControllerBank")
+    ap.add_argument("--sizes", default="10,100,1000")
+    ap.add_argument("--steps", type=int, default=200)
+    ap.add_argument("--json", help="Write results to this file")
+    args = ap.parse_args(argv)
+
+    results = [bench(int(n), args.steps) for n in args.sizes.split(",")]
+    print(f"{'N':>6} {'objects (µs/step)':>18} {'bank (µs/step)':>15} {'speedup':>8}")
+    for r in results:
+        print(f"{r['intersections']:>6} {r['optimizer_objects_us']:>18} {r['bank_us']:>15} {r['speedup']:>7}x")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
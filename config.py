@@ -24,8 +24,18 @@ MODEL_NAME = "yolov8n.pt"  # Will auto-download if not present
 FRAME_WIDTH  = 1280
 FRAME_HEIGHT = 720
 TARGET_FPS   = 30
-PROCESS_EVERY_N_FRAMES = 2      # Skip every other frame for speed
+DISPLAY_EVERY_N_FRAMES = 1      # Source frames decoded for display (others are grab()bed, not decoded)
+PROCESS_EVERY_N_FRAMES = 2      # Source frames handed to inference (every other one)
 CONFIDENCE_THRESHOLD   = 0.30  # Detection confidence minimum
+PIPELINE_PROCESSES     = False  # Capture / inference in worker processes (backend/mp_pipeline.py)
+SHM_RING_SLOTS         = 8      # Shared-memory frame ring depth for PIPELINE_PROCESSES
+SOURCE_STALE_SECONDS   = 2.0    # 4-way: a camera with no new frame for this long is shown stale
+SOURCE_REOPEN_INTERVAL = 2.0    # 4-way: seconds between reopen attempts on a failed camera
+DETECT_ON_COMPOSITE    = True   # Multi-camera: one detector call on the composite (False → one per camera)
+
+# ─── Inference Server (core/inference_server.py) ─────────────────────────────
+INFERENCE_MAX_BATCH    = 8      # Frames per model call, across all cameras
+INFERENCE_MAX_WAIT_MS  = 4.0    # Longest a frame waits for its batch to fill
 
 # ─── COCO Class IDs (YOLOv8 default) ─────────────────────────────────────────
 VEHICLE_CLASSES = {
@@ -66,6 +76,7 @@ MAX_GREEN_TIME     = 45   # Cap to prevent starvation on other lanes
 MIN_GREEN_TIME     = 5    # Minimum even if queue is empty
 MAX_WAIT_TIME      = 60   # Force green if a lane has waited this long (fairness)
 YELLOW_DURATION    = 3    # Yellow light duration in seconds
+WAIT_SKETCH_WINDOW = 300  # Seconds covered by per-lane wait percentiles (P50/P90/P99)
 
 # ─── Emergency / Accident ────────────────────────────────────────────────────
 AMBULANCE_OVERRIDE      = True   # Enable emergency preemption
@@ -73,6 +84,53 @@ ACCIDENT_STOP_THRESHOLD = 4.0   # Seconds a vehicle is stopped before flagged
 ACCIDENT_OVERLAP_IOU    = 0.15  # IoU threshold to flag collision (lower = more sensitive)
 COLLISION_CONFIRM_TIME  = 5.0   # Seconds both vehicles must stay stopped after collision to confirm accident
 
+# ─── Traffic History (on-disk) ──────────────────────────────────────────────
+HISTORY_ENABLED   = True
+HISTORY_DB_PATH   = os.path.join(BASE_DIR, "data", "lane_history.sqlite3")
+HISTORY_RETENTION = {       # bucket size (s) → seconds kept
+    1:    2 * 86400,        # 1 s raw buckets for 2 days
+    60:   60 * 86400,       # 1 min rollups for 60 days
+    3600: 730 * 86400,      # 1 h rollups for 2 years
+}
+
+# ─── Detection Log (core/detection_log.py) ──────────────────────────────────
+DETECTION_LOG_DIR = None    # Directory to record every inference frame's detections to (None = off)
+
+# ─── Performance Instrumentation (core/perf.py) ─────────────────────────────
+PERF_ENABLED = True         # Stage latency histograms for /api/perf and /metrics
+
+# ─── Incidents (backend/incidents.py) ───────────────────────────────────────
+INCIDENT_DIR           = os.path.join(BASE_DIR, "data", "incidents")
+INCIDENT_KEEP          = 200    # Snapshots kept on disk (oldest deleted first)
+INCIDENT_RECENT        = 15     # Incidents pushed on the "incidents" topic / returned by default
+INCIDENT_EVAL_INTERVAL = 0.5    # Seconds between rule checks (background worker)
+INCIDENT_COOLDOWN      = 10.0   # Seconds between captured incidents
+INCIDENT_CROWD_SIZE    = 12     # More pedestrians than this → "crowd"
+INCIDENT_STALL_SECONDS = 120.0  # Lane max wait above this → "parking"
+INCIDENT_JPEG_QUALITY  = 85
+INCIDENT_THUMB_WIDTH   = 320
+
+# ─── Incident Clips (backend/clip_recorder.py) ──────────────────────────────
+CLIP_ENABLED      = True
+CLIP_DIR          = os.path.join(BASE_DIR, "data", "clips")
+CLIP_TRIGGERS     = ("accident", "ambulance")   # Alert types that start a clip
+CLIP_PRE_SECONDS  = 10.0    # Pre-roll kept per camera view
+CLIP_POST_SECONDS = 10.0    # Recorded after the (last) triggering alert
+CLIP_MAX_SECONDS  = 60.0    # Cap on one clip when alerts keep extending it
+CLIP_FPS          = 15      # Frames per second sampled into the rings
+CLIP_RING_BYTES   = 16 * 1024 * 1024   # Per view; bounds memory, and so the pre-roll on busy scenes
+
+# ─── Frame Lineage (core/lineage.py) ────────────────────────────────────────
+LINEAGE_ENABLED    = True
+LINEAGE_MAX_TRACES = 900    # Recent per-frame traces kept for /api/lineage and trace export
+LINEAGE_WINDOW     = 1024   # Samples per latency percentile window
+
+# ─── Debug Profiler (backend/profiler.py) ───────────────────────────────────
+DEBUG_TOKEN          = os.environ.get("TRAFFIC_DEBUG_TOKEN")   # /api/debug/* disabled when unset
+PROFILE_MAX_SECONDS  = 30.0   # Longest profile one request may run
+PROFILE_INTERVAL_MS  = 5.0    # Starting sample interval
+PROFILE_MAX_OVERHEAD = 0.02   # Max fraction of wall time spent sampling (interval backs off)
+
 # ─── Backend Server ───────────────────────────────────────────────────────────
 HOST = "0.0.0.0"
 PORT = 8000
@@ -80,4 +138,8 @@ OPEN_BROWSER_ON_START = True
 
 # ─── Dashboard ────────────────────────────────────────────────────────────────
 DASHBOARD_TITLE = "AI Traffic De-Congestion System"
-STREAM_JPEG_QUALITY = 75  # JPEG compression quality for streaming (1–100)
\ No newline at end of file
+STREAM_JPEG_QUALITY = 75  # JPEG compression quality for streaming (1–100)
+MJPEG_MAX_FPS = 15        # Per-client cap for /api/stream.mjpg
+PUBLISH_RATES = {         # Default per-client max rate per /ws topic (Hz, 0 = every change)
+    "frame": 30, "metrics": 10, "signals": 0, "alerts": 0, "chart": 2, "incidents": 0,
+}
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+core/alert_store.py — Indexed Alert Store
+==========================================
+Holds active alerts for the analyzer and serves them to clients.
+
+  - Monotonic alert ids → clients resume from a cursor
+  - (type, lane) index   → O(1) dedupe instead of scanning the list
+  - Expiry min-heap      → alerts drop out in time order, no per-tick rebuild
+  - Bounded id-ordered log for cursor reads (SSE stream)
+"""
+
+import heapq
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+import sys, os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class AlertStore:
+    """
+    Thread-safe alert store written by the inference thread and read by
+    the capture thread and API handlers.
+
+    Alerts are any objects with `alert_type`, `lane`, `timestamp` and a
+    writable `alert_id` attribute (see core.traffic_analyzer.Alert).
+    """
+
+    def __init__(self, expiry: float = 30.0, max_active: int = 20, log_size: int = 500):
+        self.expiry     = expiry
+        self.max_active = max_active
+
+        self._lock    = threading.Lock()
+        self._next_id = 1
+
+        # Active alerts in id order: alert_id → Alert
+        self._active: "OrderedDict[int, object]" = OrderedDict()
+        # Expiry heap of (expires_at, alert_id)
+        self._heap: List[Tuple[float, int]] = []
+        # Latest alert per (type, lane) and per type, for dedupe
+        self._latest_by_key:  Dict[Tuple[str, Optional[str]], object] = {}
+        self._latest_by_type: Dict[str, object] = {}
+        # Recent alerts in id order (ids are contiguous) for cursor reads
+        self._log: deque = deque(maxlen=log_size)
+
+    # ── Writes ────────────────────────────────────────────────────────────────
+    def add(self, alert) -> int:
+        """Assign an id to the alert, index it and return the id."""
+        with self._lock:
+            alert_id = self._next_id
+            self._next_id += 1
+            alert.alert_id = alert_id
+
+            self._active[alert_id] = alert
+            heapq.heappush(self._heap, (alert.timestamp + self.expiry, alert_id))
+            self._latest_by_key[(alert.alert_type, alert.lane)] = alert
+            self._latest_by_type[alert.alert_type] = alert
+            self._log.append(alert)
+
+            while len(self._active) > self.max_active:
+                self._active.popitem(last=False)
+            return alert_id
+
+    def expire(self, now: float) -> int:
+        """Drop alerts whose expiry time has passed. Returns number removed."""
+        removed = 0
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, alert_id = heapq.heappop(self._heap)
+                if self._active.pop(alert_id, None) is not None:
+                    removed += 1
+        return removed
+
+    # ── Reads ─────────────────────────────────────────────────────────────────
+    def has_recent(self, alert_type: str, now: float, window: float,
+                   lane: Optional[str] = None, any_lane: bool = False) -> bool:
+        """True if an alert of this type (and lane) was raised within `window` seconds."""
+        if any_lane:
+            alert = self._latest_by_type.get(alert_type)
+        else:
+            alert = self._latest_by_key.get((alert_type, lane))
+        return alert is not None and now - alert.timestamp < window
+
+    def active(self) -> List:
+        """Active alerts, oldest first."""
+        with self._lock:
+            return list(self._active.values())
+
+    def since(self, cursor: int, limit: int = 100) -> List:
+        """Alerts with id > cursor still held in the log, oldest first."""
+        with self._lock:
+            if not self._log or cursor >= self._next_id - 1:
+                return []
+            first_id = self._log[0].alert_id
+            start = max(0, cursor - first_id + 1)
+            return [self._log[i] for i in range(start, min(len(self._log), start + limit))]
+
+    @property
+    def last_id(self) -> int:
+        """Id of the most recently added alert (0 if none)."""
+        return self._next_id - 1
+
+    def __len__(self) -> int:
+        return len(self._active)
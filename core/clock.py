@@ -0,0 +1,57 @@
+"""
+core/clock.py — Pipeline Time Source
+=====================================
+Single place the core modules read "now" from. Live pipelines use wall
+time; offline tools (simulator, replay, batch analysis) swap in a
+SimulatedClock so timing logic runs faster than real time.
+
+Usage:
+    from core import clock
+    t = clock.now()
+
+    sim = clock.SimulatedClock(start=0.0)
+    with clock.use_clock(sim):
+        ...            # everything calling clock.now() sees sim time
+        sim.advance(0.1)
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+_now: Callable[[], float] = time.time
+
+
+def now() -> float:
+    """Current pipeline time in seconds."""
+    return _now()
+
+
+@contextmanager
+def use_clock(fn: Callable[[], float]):
+    """Temporarily replace the process-wide time source (not thread-local)."""
+    global _now
+    prev = _now
+    _now = fn
+    try:
+        yield fn
+    finally:
+        _now = prev
+
+
+class SimulatedClock:
+    """Manually advanced clock for offline runs."""
+
+    def __init__(self, start: float = 0.0):
+        self.t = float(start)
+
+    def __call__(self) -> float:
+        return self.t
+
+    def advance(self, dt: float) -> float:
+        self.t += dt
+        return self.t
+
+    def set(self, t: float) -> float:
+        self.t = float(t)
+        return self.t
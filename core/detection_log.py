@@ -0,0 +1,291 @@
+"""
+core/detection_log.py — Detection Record / Replay
+==================================================
+Logs every frame's detections to a compact append-only binary file and
+replays them into the tracking / lane / analyzer / signal pipeline with
+no model and no video, as fast as Python runs.
+
+Tuning tracker parameters, accident heuristics or signal timing then
+costs a replay (seconds for a day of footage) instead of a YOLO pass.
+
+File layout (little endian):
+    b"DETLOG\\0\\1", u32 n, n bytes of JSON header (width, height, source, ...)
+    optionally "junctions": [{"name", "polygons", "phase_order", "tiles"}],
+    the lane geometry and camera tiles the log was recorded against, which
+    replay() uses by default
+    records, each starting with a u8 kind:
+      1  label   u8 index, u8 n, n bytes utf-8 label name
+      2  frame   f64 t, u16 n, n × DET_DTYPE (14 bytes per detection)
+
+A truncated last record (crash mid-write) is ignored on read, and a
+recorder reopening an existing log appends to it.
+
+    with DetectionRecorder("logs/north.detlog", 1280, 720, source="north.mp4") as rec:
+        rec.record(t, detector.detect(frame))
+
+    for t, detections in DetectionLog("logs/north.detlog"):
+        ...
+    summary = replay("logs/north.detlog", out_dir="results/")
+    summary = replay("logs/multicam.detlog", junction="main")   # One junction of a composite log
+
+CLI:
+    python -m core.detection_log info logs/*.detlog
+    python -m core.detection_log replay logs/*.detlog --out results/ [--junction NAME]
+"""
+
+import argparse
+import json
+import struct
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import sys, os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from core.detector import Detection
+
+MAGIC = b"DETLOG\x00\x01"
+KIND_LABEL, KIND_FRAME = 1, 2
+FLAG_VEHICLE, FLAG_PERSON, FLAG_AMBULANCE = 1, 2, 4
+
+DET_DTYPE = np.dtype([
+    ("box",      "<i2", 4),
+    ("conf",     "<f2"),
+    ("class_id", "<i2"),
+    ("label",    "u1"),
+    ("flags",    "u1"),
+])
+_U32, _LABEL, _FRAME = struct.Struct("<I"), struct.Struct("<BB"), struct.Struct("<dH")
+
+
+class DetectionRecorder:
+    def __init__(self, path: str, width: int, height: int, source: str = None,
+                 junctions: List[Dict] = None, flush_every: int = 30):
+        self.path = path
+        self.flush_every = flush_every
+        self.frames = 0
+        self.detections = 0
+        self._labels: Dict[str, int] = {}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if os.path.isfile(path) and os.path.getsize(path) > 0:
+            log = DetectionLog(path)        # Appending: keep its label table
+            self.header = log.header
+            for _ in log.frames(): pass
+            self._labels = {name: i for i, name in enumerate(log.labels)}
+            self._f = open(path, "r+b")
+            self._f.seek(log.valid_bytes)   # Drop a torn tail record
+            self._f.truncate()
+        else:
+            self.header = {"version": 1, "width": width, "height": height,
+                           "source": str(source) if source is not None else None,
+                           "created": time.time()}
+            if junctions:
+                self.header["junctions"] = junctions
+            self._f = open(path, "wb")
+            blob = json.dumps(self.header).encode("utf-8")
+            self._f.write(MAGIC + _U32.pack(len(blob)) + blob)
+
+    def _label(self, name: str) -> int:
+        idx = self._labels.get(name)
+        if idx is None:
+            if len(self._labels) >= 256:
+                raise ValueError(f"{self.path}: more than 256 distinct labels")
+            idx = self._labels[name] = len(self._labels)
+            raw = name.encode("utf-8")[:255]
+            self._f.write(bytes([KIND_LABEL]) + _LABEL.pack(idx, len(raw)) + raw)
+        return idx
+
+    def record(self, t: float, detections: List[Detection]):
+        """Append one frame's detections at time t (seconds)."""
+        rows = np.zeros(len(detections), DET_DTYPE)
+        for i, d in enumerate(detections):
+            rows[i] = ((d.x1, d.y1, d.x2, d.y2), d.confidence, d.class_id, self._label(d.label),
+                       FLAG_VEHICLE * d.is_vehicle | FLAG_PERSON * d.is_person
+                       | FLAG_AMBULANCE * d.is_ambulance)
+        self._f.write(bytes([KIND_FRAME]) + _FRAME.pack(t, len(rows)) + rows.tobytes())
+        self.frames += 1
+        self.detections += len(rows)
+        if self.frames % self.flush_every == 0:
+            self._f.flush()
+
+    def close(self):
+        if not self._f.closed:
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DetectionLog:
+    """Reader: iterate (t, List[Detection]) per recorded frame."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            head = f.read(len(MAGIC) + _U32.size)
+            if len(head) < len(MAGIC) + _U32.size or head[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path}: not a detection log")
+            n = _U32.unpack_from(head, len(MAGIC))[0]
+            self.header: Dict = json.loads(f.read(n).decode("utf-8"))
+        self._data_start = len(MAGIC) + _U32.size + n
+        self.labels: List[str] = []
+        self.valid_bytes = self._data_start   # End of the last complete record read
+
+    @property
+    def width(self) -> int:
+        return self.header["width"]
+
+    @property
+    def height(self) -> int:
+        return self.header["height"]
+
+    def junction(self, name: str = None) -> Optional[Dict]:
+        """Recorded geometry of junction `name` (default: the first), None if not recorded."""
+        junctions = self.header.get("junctions") or []
+        if name is None:
+            return junctions[0] if junctions else None
+        for j in junctions:
+            if j["name"] == name:
+                return j
+        raise ValueError(f"{self.path}: no junction '{name}' "
+                         f"(recorded: {', '.join(j['name'] for j in junctions) or 'none'})")
+
+    def frames(self) -> Iterator[Tuple[float, np.ndarray]]:
+        """Raw (t, DET_DTYPE rows) per frame; labels index self.labels."""
+        with open(self.path, "rb") as f:
+            buf = memoryview(f.read())
+        pos, end = self._data_start, len(buf)
+        self.labels = []
+        while pos < end:
+            kind = buf[pos]
+            if kind == KIND_LABEL:
+                if pos + 1 + _LABEL.size > end: break
+                idx, n = _LABEL.unpack_from(buf, pos + 1)
+                stop = pos + 1 + _LABEL.size + n
+                if stop > end: break
+                name = bytes(buf[pos + 1 + _LABEL.size:stop]).decode("utf-8")
+                self.labels[idx:idx + 1] = [name]
+            elif kind == KIND_FRAME:
+                if pos + 1 + _FRAME.size > end: break
+                t, n = _FRAME.unpack_from(buf, pos + 1)
+                start = pos + 1 + _FRAME.size
+                stop = start + n * DET_DTYPE.itemsize
+                if stop > end: break
+                self.valid_bytes = stop
+                yield t, np.frombuffer(buf[start:stop], DET_DTYPE)
+            else:
+                raise ValueError(f"{self.path}: corrupt record kind {kind} at byte {pos}")
+            self.valid_bytes = pos = stop
+
+    def __iter__(self) -> Iterator[Tuple[float, List[Detection]]]:
+        for t, rows in self.frames():
+            labels = self.labels
+            yield t, [
+                Detection(tuple(int(v) for v in r["box"]), labels[r["label"]], float(r["conf"]),
+                          int(r["class_id"]), bool(r["flags"] & FLAG_VEHICLE),
+                          bool(r["flags"] & FLAG_PERSON), bool(r["flags"] & FLAG_AMBULANCE))
+                for r in rows
+            ]
+
+    def info(self) -> Dict:
+        frames = dets = 0
+        first = last = None
+        for t, rows in self.frames():
+            frames += 1
+            dets += len(rows)
+            first = t if first is None else first
+            last = t
+        return {**self.header, "path": self.path, "frames": frames, "detections": dets,
+                "seconds": round(last - first, 1) if frames else 0.0, "labels": self.labels}
+
+
+def live_recorder(name: str, width: int, height: int, source=None,
+                  junctions: List[Dict] = None) -> Optional[DetectionRecorder]:
+    """A recorder under config.DETECTION_LOG_DIR for a live pipeline, or None when off."""
+    if not config.DETECTION_LOG_DIR:
+        return None
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(config.DETECTION_LOG_DIR, f"{stamp}-{name}.detlog")
+    print(f"[DetectionLog] Recording detections to {path}")
+    return DetectionRecorder(path, width, height, source=source, junctions=junctions)
+
+
+def _in_tiles(det: Detection, tiles: List[List[int]]) -> bool:
+    return any(x1 <= det.cx < x2 and y1 <= det.cy < y2 for x1, y1, x2, y2 in tiles)
+
+
+def replay(path: str, out_dir: str = None, polygons: Dict = None,
+           phase_order: List[str] = None, junction: str = None) -> Dict:
+    """
+    Feed a log through core/offline.py's pipeline on its recorded time.
+    Lane polygons and phase order default to the recorded junction's (the
+    first one unless `junction` names another), else to config's. With a
+    recorded junction, only detections centred in its camera tiles are fed,
+    as the live junction only saw those.
+    Writes <out_dir>/<name>.npz when out_dir is given; returns the summary.
+    """
+    from core.offline import OfflineAnalysis
+
+    log = DetectionLog(path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    recorded = log.junction(junction)
+    tiles = None
+    if recorded is not None:
+        tiles = recorded.get("tiles")
+        if polygons is None:
+            polygons = {lane: [tuple(p) for p in poly] for lane, poly in recorded["polygons"].items()}
+        if phase_order is None:
+            phase_order = recorded.get("phase_order")
+        if junction is not None:
+            name = f"{name}-{junction}"
+    frames = iter(log)
+    if tiles:
+        frames = ((t, [d for d in dets if _in_tiles(d, tiles)]) for t, dets in frames)
+    first = next(frames, None)
+    run = OfflineAnalysis(log.width, log.height, polygons=polygons, phase_order=phase_order,
+                          start=first[0] if first else 0.0, name=name)
+    wall0 = time.perf_counter()
+    with run.running():
+        if first:
+            run.step(*first)
+        for t, detections in frames:
+            run.step(t, detections)
+    wall = time.perf_counter() - wall0
+
+    summary = run.summary()
+    summary.update({
+        "source":       path,
+        "junction":     recorded["name"] if recorded else None,
+        "wall_seconds": round(wall, 2),
+        "frames_per_s": round(run.frames / wall, 1) if wall else 0.0,
+        "speedup":      round(summary["video_seconds"] / wall, 1) if wall else 0.0,
+    })
+    if out_dir:
+        summary["output"] = run.save(os.path.join(out_dir, f"{name}.npz"))
+    return summary
+
+
+def main():
+    p = argparse.ArgumentParser(description="Detection log tools")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("info").add_argument("logs", nargs="+")
+    rp = sub.add_parser("replay")
+    rp.add_argument("logs", nargs="+")
+    rp.add_argument("--out", type=str, default=None, help="Write <log>.npz columns here")
+    rp.add_argument("--junction", type=str, default=None,
+                    help="Recorded junction whose lanes to replay (default: the first)")
+    args = p.parse_args()
+
+    for path in args.logs:
+        result = (DetectionLog(path).info() if args.cmd == "info"
+                  else replay(path, args.out, junction=args.junction))
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,14 @@
 core/detector.py — YOLOv8 Object Detection Engine
 ===================================================
 Handles vehicle, pedestrian, and ambulance detection.
+
+ultralytics is imported when a Detector is built, so Detection and
+Detector.draw work without it (replay, rendering processes).
 """
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
+import time
 from typing import List, Dict, Tuple, Optional
 import sys
 import os
@@ -14,6 +17,7 @@ import os
 # Add parent to path for config import
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
+from core.perf import perf
 
 
 class Detection:
@@ -72,6 +76,8 @@ class Detector:
         model_name = model_name or config.MODEL_NAME
         conf       = conf       or config.CONFIDENCE_THRESHOLD
         
+        from ultralytics import YOLO
+        
         print(f"[Detector] Loading model: {model_name}")
         self.model = YOLO(model_name)
         self.conf  = conf
@@ -87,17 +93,30 @@ class Detector:
         Run detection on a single BGR frame.
         Returns a list of Detection objects.
         """
-        results = self.model(frame, conf=self.conf, verbose=False)
-        detections: List[Detection] = []
-        
+        return self.detect_batch([frame])[0]
+    
+    def detect_batch(self, frames: List[np.ndarray]) -> List[List[Detection]]:
+        """
+        Run detection on several BGR frames in one model call (any sizes).
+        Returns one list of Detection objects per frame, in order.
+        """
+        if not frames:
+            return []
+        with perf.timer("detect"):
+            results = self.model(list(frames), conf=self.conf, verbose=False)
         if not results:
-            return detections
+            return [[] for _ in frames]
+        return [self._parse(r, frame) for r, frame in zip(results, frames)]
+    
+    def _parse(self, r, frame: np.ndarray) -> List[Detection]:
+        """One ultralytics result → Detection objects for its frame."""
+        detections: List[Detection] = []
         
-        r = results[0]
         if r.boxes is None:
             return detections
         
         h, w = frame.shape[:2]
+        heuristic_s = 0.0
         
         for box in r.boxes:
             cls_id = int(box.cls[0])
@@ -127,6 +146,7 @@ class Detector:
                 is_truck_bus_size = label in ["truck", "bus"] or box_area > (frame_area * 0.05)
                 
                 if is_truck_bus_size:
+                    heur_t0 = time.perf_counter()
                     # Crop the bounding box from the frame
                     crop = frame[y1:y2, x1:x2]
                     if crop.size > 0:
@@ -157,6 +177,7 @@ class Detector:
                         if white_ratio > 0.15 and (red_ratio > 0.002 or blue_ratio > 0.002):
                             is_ambulance = True
                             label = "ambulance"
+                    heuristic_s += time.perf_counter() - heur_t0
                         
             # ──────────────────────────────────────────────
             
@@ -175,13 +196,15 @@ class Detector:
             )
             detections.append(det)
         
+        perf.observe("ambulance_heuristic", heuristic_s)
         return detections
     
-    def draw(self, frame: np.ndarray, detections: List[Detection],
+    @classmethod
+    def draw(cls, frame: np.ndarray, detections: List[Detection],
              show_labels: bool = True) -> np.ndarray:
-        """Draw bounding boxes and labels on frame (in-place)."""
+        """Draw bounding boxes and labels on frame (in-place). Needs no model."""
         for det in detections:
-            color = self.COLORS.get(det.label, self.COLORS["default"])
+            color = cls.COLORS.get(det.label, cls.COLORS["default"])
             
             # Thicker box for ambulance
             thickness = 4 if det.is_ambulance else 2
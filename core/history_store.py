@@ -0,0 +1,259 @@
+"""
+core/history_store.py — Persistent Lane Metrics History
+========================================================
+Stores per-lane counts, densities, queues and waits on disk so planners
+can query weeks of history (the in-memory count_history only holds 60s).
+
+Design:
+  - record() only snapshots LaneStats into a bounded queue — it never
+    touches disk, so the inference thread is never blocked.
+  - A background writer thread aggregates samples into 1 s / 1 min / 1 h
+    buckets and upserts them into SQLite (WAL mode) about once a second.
+  - Each resolution has its own retention; old buckets are pruned.
+  - query() reads from the requested (or best-fitting) rollup using its
+    own connection, so API reads never contend with the writer.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lane_metrics (
+    resolution   INTEGER NOT NULL,
+    lane         TEXT    NOT NULL,
+    bucket       INTEGER NOT NULL,
+    samples      INTEGER NOT NULL,
+    vehicles_sum REAL    NOT NULL,
+    vehicles_max REAL    NOT NULL,
+    density_sum  REAL    NOT NULL,
+    queue_sum    REAL    NOT NULL,
+    queue_max    REAL    NOT NULL,
+    wait_sum     REAL    NOT NULL,
+    wait_max     REAL    NOT NULL,
+    PRIMARY KEY (resolution, lane, bucket)
+) WITHOUT ROWID
+"""
+
+_UPSERT = """
+INSERT INTO lane_metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(resolution, lane, bucket) DO UPDATE SET
+    samples      = samples      + excluded.samples,
+    vehicles_sum = vehicles_sum + excluded.vehicles_sum,
+    vehicles_max = MAX(vehicles_max, excluded.vehicles_max),
+    density_sum  = density_sum  + excluded.density_sum,
+    queue_sum    = queue_sum    + excluded.queue_sum,
+    queue_max    = MAX(queue_max, excluded.queue_max),
+    wait_sum     = wait_sum     + excluded.wait_sum,
+    wait_max     = MAX(wait_max, excluded.wait_max)
+"""
+
+
+class LaneHistoryStore:
+    """
+    Background-written, on-disk time series of LaneStats with rollups.
+
+    Usage:
+        store = LaneHistoryStore()
+        store.start()
+        store.record(lane_stats)          # from the inference thread
+        store.query("North", t0, t1, "1m")
+    """
+
+    RESOLUTIONS = {"1s": 1, "1m": 60, "1h": 3600}
+    MAX_POINTS  = 2000      # "auto" resolution picks the finest rollup under this
+
+    def __init__(self, db_path: str = None, retention: Dict[int, float] = None,
+                 flush_interval: float = 1.0, max_queue: int = 10000):
+        self.db_path        = db_path or config.HISTORY_DB_PATH
+        self.retention      = retention or config.HISTORY_RETENTION
+        self.flush_interval = flush_interval
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._last_prune = 0.0
+
+        # Counters
+        self.samples_recorded = 0
+        self.samples_dropped  = 0
+        self.rows_written     = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute(_SCHEMA)
+        conn.commit()
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._writer_thread, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=5.0)
+
+    # ── Producer side (inference thread) ──────────────────────────────────────
+    def record(self, lane_stats: Dict, ts: float = None) -> bool:
+        """
+        Snapshot lane stats for the writer. Never blocks; returns False and
+        counts a drop if the writer has fallen behind.
+        """
+        ts = ts if ts is not None else time.time()
+        sample = (ts, [
+            (name, s.vehicle_count, s.density_ratio, s.queue_length, s.avg_wait_time, s.max_wait_time)
+            for name, s in lane_stats.items()
+        ])
+        try:
+            self._queue.put_nowait(sample)
+            self.samples_recorded += 1
+            return True
+        except queue.Full:
+            self.samples_dropped += 1
+            return False
+
+    # ── Writer thread ─────────────────────────────────────────────────────────
+    def _writer_thread(self):
+        conn = self._connect()
+        pending: Dict[Tuple[int, str, int], List[float]] = {}
+        next_flush = time.time() + self.flush_interval
+
+        while self._running or not self._queue.empty():
+            timeout = max(0.0, next_flush - time.time())
+            try:
+                ts, lanes = self._queue.get(timeout=timeout)
+                self._accumulate(pending, ts, lanes)
+            except queue.Empty:
+                pass
+
+            if time.time() >= next_flush or not self._running:
+                if pending:
+                    self._flush(conn, pending)
+                    pending = {}
+                self._maybe_prune(conn)
+                next_flush = time.time() + self.flush_interval
+
+        conn.close()
+
+    def _accumulate(self, pending: Dict, ts: float, lanes: List[Tuple]):
+        # Aggregate layout: samples, vehicles_sum, vehicles_max, density_sum,
+        #                   queue_sum, queue_max, wait_sum, wait_max
+        for res in self.RESOLUTIONS.values():
+            bucket = int(ts // res) * res
+            for name, vehicles, density, queue_len, avg_wait, max_wait in lanes:
+                agg = pending.get((res, name, bucket))
+                if agg is None:
+                    pending[(res, name, bucket)] = [
+                        1, vehicles, vehicles, density,
+                        queue_len, queue_len, avg_wait, max_wait,
+                    ]
+                    continue
+                agg[0] += 1
+                agg[1] += vehicles
+                agg[2]  = max(agg[2], vehicles)
+                agg[3] += density
+                agg[4] += queue_len
+                agg[5]  = max(agg[5], queue_len)
+                agg[6] += avg_wait
+                agg[7]  = max(agg[7], max_wait)
+
+    def _flush(self, conn: sqlite3.Connection, pending: Dict):
+        rows = [(res, lane, bucket, *agg) for (res, lane, bucket), agg in pending.items()]
+        try:
+            with conn:
+                conn.executemany(_UPSERT, rows)
+            self.rows_written += len(rows)
+        except sqlite3.Error as e:
+            print(f"[LaneHistoryStore] Write failed: {e}")
+
+    def _maybe_prune(self, conn: sqlite3.Connection):
+        now = time.time()
+        if now - self._last_prune < 60.0:
+            return
+        self._last_prune = now
+        try:
+            with conn:
+                for res, keep in self.retention.items():
+                    conn.execute(
+                        "DELETE FROM lane_metrics WHERE resolution = ? AND bucket < ?",
+                        (int(res), int(now - keep)),
+                    )
+        except sqlite3.Error as e:
+            print(f"[LaneHistoryStore] Prune failed: {e}")
+
+    # ── Queries (API threads) ─────────────────────────────────────────────────
+    def pick_resolution(self, start: float, end: float, resolution: str = "auto") -> int:
+        """Map '1s'/'1m'/'1h'/'auto' to a bucket size in seconds."""
+        if resolution in self.RESOLUTIONS:
+            return self.RESOLUTIONS[resolution]
+        span = max(0.0, end - start)
+        age  = time.time() - start
+        for res in sorted(self.RESOLUTIONS.values()):
+            if span / res <= self.MAX_POINTS and age <= self.retention.get(res, float("inf")):
+                return res
+        return max(self.RESOLUTIONS.values())
+
+    def query(self, lane: Optional[str], start: float, end: float,
+              resolution: str = "auto") -> Dict:
+        """Return averaged/maxed buckets between start and end (unix seconds)."""
+        if resolution not in self.RESOLUTIONS and resolution != "auto":
+            raise ValueError(f"resolution must be one of {list(self.RESOLUTIONS)} or 'auto'")
+        res = self.pick_resolution(start, end, resolution)
+
+        sql = ("SELECT lane, bucket, samples, vehicles_sum, vehicles_max, density_sum, "
+               "queue_sum, queue_max, wait_sum, wait_max FROM lane_metrics "
+               "WHERE resolution = ? AND bucket >= ? AND bucket <= ?")
+        params: list = [res, int(start // res) * res, int(end)]
+        if lane:
+            sql += " AND lane = ?"
+            params.append(lane)
+        sql += " ORDER BY bucket, lane"
+
+        conn = sqlite3.connect(self.db_path, timeout=5.0)
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+        points = []
+        for name, bucket, n, v_sum, v_max, d_sum, q_sum, q_max, w_sum, w_max in rows:
+            points.append({
+                "lane":         name,
+                "time":         bucket,
+                "samples":      n,
+                "vehicles":     round(v_sum / n, 2),
+                "vehicles_max": v_max,
+                "density":      round(d_sum / n, 4),
+                "queue":        round(q_sum / n, 2),
+                "queue_max":    q_max,
+                "avg_wait":     round(w_sum / n, 1),
+                "max_wait":     round(w_max, 1),
+            })
+        return {"lane": lane, "from": start, "to": end, "resolution": res, "points": points}
+
+    def get_stats(self) -> Dict:
+        return {
+            "samples_recorded": self.samples_recorded,
+            "samples_dropped":  self.samples_dropped,
+            "rows_written":     self.rows_written,
+            "queue_depth":      self._queue.qsize(),
+        }
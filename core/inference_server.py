@@ -0,0 +1,220 @@
+"""
+core/inference_server.py — Shared Dynamic-Batching Inference Service
+====================================================================
+One Detector (model weights loaded once) serving every camera pipeline in
+the process.
+
+  - Pipelines submit() a frame and get a concurrent.futures.Future that
+    resolves to its List[Detection].
+  - A worker thread groups queued frames into one model call: up to
+    `max_batch` frames, waiting at most `max_wait_ms` after the oldest one
+    arrived, so N cameras cost about one forward pass instead of N.
+  - Two lanes: frames from emergency-flagged cameras (ambulance in view)
+    go first and dispatch at once, without waiting for the batch to fill.
+  - Batch sizes and queue waits are kept as histograms (get_stats()).
+
+Submitted frames are read after submit() returns, so callers must not
+modify them until the future resolves (pooled buffers are safe: the queue
+holds a reference).
+
+    server = get_server()
+    fut = server.submit(frame, priority=ambulance_seen)
+    detections = fut.result()
+"""
+
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+import numpy as np
+import sys, os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from core.detector import Detection, Detector
+from core.perf import perf
+
+WAIT_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class InferenceServer:
+    """
+    Usage:
+        server = InferenceServer()            # or get_server() for the shared one
+        fut = server.submit(frame)            # Future → List[Detection]
+        dets = server.detect(frame)           # blocking convenience
+    """
+
+    def __init__(self, detector: Detector = None, max_batch: int = None,
+                 max_wait_ms: float = None, wait_window: int = 1024):
+        self.detector = detector or Detector()
+        self.max_batch = max_batch or config.INFERENCE_MAX_BATCH
+        self.max_wait = (config.INFERENCE_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000.0
+
+        self._cond = threading.Condition()
+        self._lanes = (deque(), deque())      # (priority, normal) of (enqueued_mono, frame, future)
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        # Metrics
+        self.batches = 0
+        self.frames = 0
+        self.priority_frames = 0
+        self.errors = 0
+        self._batch_sizes: Counter = Counter()
+        self._wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._wait_ms: deque = deque(maxlen=wait_window)
+        self._busy_s = 0.0
+        self._started_at = time.monotonic()
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._started_at = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name="inference-server", daemon=True)
+            self._thread.start()
+        perf.register_collector("inference", self._perf_samples)
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=3.0)
+
+    # ── Clients ───────────────────────────────────────────────────────────────
+    def submit(self, frame: np.ndarray, priority: bool = False) -> Future:
+        """Queue one BGR frame; the Future resolves to its detections."""
+        if not self._running:
+            self.start()
+        fut: Future = Future()
+        with self._cond:
+            self._lanes[0 if priority else 1].append((time.monotonic(), frame, fut))
+            self.priority_frames += bool(priority)
+            self._cond.notify()
+        return fut
+
+    def detect(self, frame: np.ndarray, priority: bool = False,
+               timeout: float = None) -> List[Detection]:
+        return self.submit(frame, priority).result(timeout)
+
+    # ── Worker ────────────────────────────────────────────────────────────────
+    def _take_batch(self) -> List[tuple]:
+        """Block until a batch is due, then pop it (priority lane first)."""
+        urgent, normal = self._lanes
+        with self._cond:
+            while self._running and not (urgent or normal):
+                self._cond.wait()
+            if not self._running:
+                return []
+            # Priority frames go now; otherwise wait for more until full or due
+            deadline = (urgent or normal)[0][0] + self.max_wait
+            while (self._running and not urgent
+                   and len(normal) < self.max_batch and time.monotonic() < deadline):
+                self._cond.wait(deadline - time.monotonic())
+            batch = []
+            for lane in (urgent, normal):
+                while lane and len(batch) < self.max_batch:
+                    batch.append(lane.popleft())
+            return batch
+
+    def _run(self):
+        while self._running:
+            batch = self._take_batch()
+            if not batch:
+                continue
+            batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            now = time.monotonic()
+            for enqueued, _, _ in batch:
+                self._record_wait((now - enqueued) * 1000.0)
+
+            t0 = time.monotonic()
+            try:
+                results = self.detector.detect_batch([frame for _, frame, _ in batch])
+            except Exception as e:
+                self.errors += 1
+                for _, _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            self._busy_s += time.monotonic() - t0
+            self.batches += 1
+            self.frames += len(batch)
+            self._batch_sizes[len(batch)] += 1
+            for (_, _, fut), detections in zip(batch, results):
+                fut.set_result(detections)
+
+        with self._cond:   # Fail anything still queued at shutdown
+            pending = [item for lane in self._lanes for item in lane]
+            for lane in self._lanes:
+                lane.clear()
+        for _, _, fut in pending:
+            if fut.set_running_or_notify_cancel():
+                fut.set_exception(RuntimeError("inference server stopped"))
+
+    def _record_wait(self, ms: float):
+        self._wait_ms.append(ms)
+        perf.observe("inference_queue", ms / 1000.0)
+        for i, edge in enumerate(WAIT_BUCKETS_MS):
+            if ms <= edge:
+                self._wait_buckets[i] += 1
+                return
+        self._wait_buckets[-1] += 1
+
+    # ── Stats ─────────────────────────────────────────────────────────────────
+    def _perf_samples(self) -> List:
+        with self._cond:
+            queued = [len(lane) for lane in self._lanes]
+        return [("gauge", "inference_queue_depth", {"lane": "priority"}, queued[0]),
+                ("gauge", "inference_queue_depth", {"lane": "normal"}, queued[1]),
+                ("counter", "inference_frames", {}, self.frames),
+                ("counter", "inference_batches", {}, self.batches),
+                ("counter", "inference_errors", {}, self.errors)]
+
+    def get_stats(self) -> Dict:
+        waits = np.asarray(self._wait_ms, dtype=float)
+        elapsed = max(time.monotonic() - self._started_at, 1e-6)
+        with self._cond:
+            queued = [len(lane) for lane in self._lanes]
+        return {
+            "running":          self._running,
+            "max_batch":        self.max_batch,
+            "max_wait_ms":      round(self.max_wait * 1000.0, 3),
+            "batches":          self.batches,
+            "frames":           self.frames,
+            "priority_frames":  self.priority_frames,
+            "errors":           self.errors,
+            "queued":           {"priority": queued[0], "normal": queued[1]},
+            "mean_batch":       round(self.frames / self.batches, 2) if self.batches else 0.0,
+            "detections_per_s": round(self.frames / elapsed, 1),
+            "utilization":      round(min(self._busy_s / elapsed, 1.0), 3),
+            "batch_size_hist":  {str(k): v for k, v in sorted(self._batch_sizes.items())},
+            "queue_wait_ms": {
+                "samples": int(waits.size),
+                "p50":     round(float(np.percentile(waits, 50)), 3) if waits.size else 0.0,
+                "p99":     round(float(np.percentile(waits, 99)), 3) if waits.size else 0.0,
+                "max":     round(float(waits.max()), 3) if waits.size else 0.0,
+                "hist": dict(zip([f"<={b}" for b in WAIT_BUCKETS_MS] + [f">{WAIT_BUCKETS_MS[-1]}"],
+                                 self._wait_buckets)),
+            },
+        }
+
+
+# ── Process-wide shared server ────────────────────────────────────────────────
+_server: Optional[InferenceServer] = None
+_server_lock = threading.Lock()
+
+
+def get_server() -> InferenceServer:
+    """The process's shared InferenceServer (model loaded on first use)."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = InferenceServer()
+        return _server
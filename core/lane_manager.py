@@ -16,6 +16,8 @@ import sys, os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
+from core import clock
+from core.wait_sketch import RollingWaitSketch
 
 
 @dataclass
@@ -37,6 +39,13 @@ class LaneStats:
     queue_length:   int   = 0       # Number of stopped vehicles
     flow_per_min:   float = 0.0     # Throughput
     
+    # Completed-wait distribution (rolling window sketch) + current queue tail
+    wait_p50:       float = 0.0
+    wait_p90:       float = 0.0
+    wait_p99:       float = 0.0
+    waits_completed: int  = 0       # Lifetime count of completed waits
+    queue_wait_p90: float = 0.0     # P90 wait of vehicles stopped right now
+    
     @property
     def congestion_level(self) -> str:
         if self.vehicle_count == 0:
@@ -103,9 +112,18 @@ class LaneManager:
             name: LaneStats(name=name) for name in self.lane_names
         }
         
+        # Streaming wait-time quantiles (constant memory per lane)
+        self.wait_sketches: Dict[str, RollingWaitSketch] = {
+            name: RollingWaitSketch(window=config.WAIT_SKETCH_WINDOW)
+            for name in self.lane_names
+        }
+        
         # Throughput tracking
         self._flow_counter: Dict[str, int]  = {n: 0 for n in self.lane_names}
         self._flow_timer:   Dict[str, float] = {n: 0.0 for n in self.lane_names}
+        
+        # Scratch buffer for the translucent lane fill (reused across frames)
+        self._overlay: Optional[np.ndarray] = None
     
     def assign_lane(self, cx: int, cy: int) -> Optional[str]:
         """
@@ -129,8 +147,6 @@ class LaneManager:
         Returns:
             Dict of lane_name → LaneStats
         """
-        import time
-        
         # Reset stats
         lane_vehicles:  Dict[str, List] = {n: [] for n in self.lane_names}
         lane_persons:   Dict[str, int]  = {n: 0  for n in self.lane_names}
@@ -138,11 +154,22 @@ class LaneManager:
         lane_stopped:   Dict[str, int]  = {n: 0  for n in self.lane_names}
         lane_wait:      Dict[str, List[float]] = {n: [] for n in self.lane_names}
         lane_bbox_area: Dict[str, float] = {n: 0.0 for n in self.lane_names}
+        lane_queue_wait: Dict[str, List[float]] = {n: [] for n in self.lane_names}
+        now = clock.now()
         
         for track in tracks:
+            prev_lane = track.lane
             lane = self.assign_lane(track.cx, track.cy)
             track.lane = lane  # Write back
             
+            # Feed completed stop→go waits into the lane they happened in
+            if track.completed_waits:
+                wait_lane = lane or prev_lane
+                if track.is_vehicle and wait_lane in self.wait_sketches:
+                    for waited in track.completed_waits:
+                        self.wait_sketches[wait_lane].add(waited, now)
+                track.completed_waits.clear()
+            
             if lane is None:
                 continue
             
@@ -158,6 +185,7 @@ class LaneManager:
                 
                 if track.is_stopped:
                     lane_stopped[lane] += 1
+                    lane_queue_wait[lane].append(track.wait_time)
                 lane_wait[lane].append(track.wait_time)
                 
                 if track.is_ambulance:
@@ -179,12 +207,21 @@ class LaneManager:
             s.avg_wait_time     = sum(waits) / len(waits) if waits else 0.0
             s.max_wait_time     = max(waits) if waits else 0.0
             s.queue_length      = lane_stopped[name]
+            
+            sketch = self.wait_sketches[name]
+            s.wait_p50, s.wait_p90, s.wait_p99 = sketch.quantiles((0.5, 0.9, 0.99), now)
+            s.waits_completed   = sketch.lifetime.count
+            queued = sorted(lane_queue_wait[name])
+            s.queue_wait_p90    = queued[int(0.9 * (len(queued) - 1))] if queued else 0.0
         
         return self.stats
     
     def draw_lanes(self, frame: np.ndarray, show_labels: bool = True) -> np.ndarray:
         """Draw lane polygon overlays on the frame."""
-        overlay = frame.copy()
+        overlay = self._overlay
+        if overlay is None or overlay.shape != frame.shape:
+            overlay = self._overlay = np.empty_like(frame)
+        np.copyto(overlay, frame)
         
         for name, poly in self.lane_polys.items():
             color = self.LANE_COLORS.get(name, (200, 200, 200))
@@ -0,0 +1,179 @@
+"""
+core/lineage.py — Frame Lineage Tracing
+=======================================
+Every decoded source frame gets a trace keyed by its frame id and
+capture timestamp. Each stage that touches the frame, or something derived
+from it, adds a span: decode, resize, inference, track, lane, analyze,
+optimize, draw, encode, ws_send. Derived outputs carry their source
+(frame_id, capture_ts) pair, so a displayed frame's overlays and a signal
+decision can be traced back to the capture they came from.
+
+Latencies (wall seconds, percentiles over a rolling window):
+  glass_to_glass  capture → frame bytes handed to a WebSocket client
+  overlay_age     capture of the frame drawn vs capture of the frame its
+                  detections came from (how stale the boxes are)
+  analysis        capture → analyzer finished with the frame
+  decision        capture → signal scheduler acting on its lane stats
+
+span() also feeds the matching core.perf histogram, so a stage is timed
+once for both. chrome_trace() exports recent traces in Chrome trace-event
+format (chrome://tracing, Perfetto): one row per thread, one async track
+per frame.
+
+    from core.lineage import lineage
+    lineage.begin(frame_no, capture_ts)
+    with lineage.span(frame_no, "decode"):
+        ...
+    lineage.latency("overlay_age", shown_ts - source_ts)
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Hashable, List, Optional, Tuple
+import numpy as np
+import sys, os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from core.perf import perf
+
+Source = Tuple[Hashable, float]   # (frame_id, capture_ts)
+
+LATENCIES = ("glass_to_glass", "overlay_age", "analysis", "decision")
+
+
+class FrameTrace:
+    __slots__ = ("key", "capture_ts", "spans", "attrs")
+
+    def __init__(self, key: Hashable, capture_ts: float, attrs: Dict):
+        self.key = key
+        self.capture_ts = capture_ts
+        self.spans: List[tuple] = []     # (stage, thread_id, start, end, args)
+        self.attrs = attrs
+
+    def to_dict(self) -> Dict:
+        ms = lambda t: round((t - self.capture_ts) * 1000.0, 3)
+        return {
+            "frame_id":   self.key,
+            "capture_ts": self.capture_ts,
+            **self.attrs,
+            "spans": [{"stage": s, "start_ms": ms(t0), "end_ms": ms(t1), **(args or {})}
+                      for s, _, t0, t1, args in self.spans],
+        }
+
+
+class _Span:
+    __slots__ = ("trace", "stage", "camera", "t0")
+
+    def __init__(self, trace: Optional[FrameTrace], stage: str, camera: str):
+        self.trace, self.stage, self.camera = trace, stage, camera
+
+    def __enter__(self):
+        self.t0 = time.time()
+        return self
+
+    def __exit__(self, *exc):
+        t1 = time.time()
+        perf.observe(self.stage, t1 - self.t0, self.camera)
+        if self.trace is not None:
+            self.trace.spans.append((self.stage, threading.get_ident(), self.t0, t1, None))
+
+
+class FrameLineage:
+    def __init__(self, max_traces: int = None, window: int = None, enabled: bool = None):
+        self.enabled = config.LINEAGE_ENABLED if enabled is None else enabled
+        self.max_traces = max_traces or config.LINEAGE_MAX_TRACES
+        self._lock = threading.Lock()
+        self._traces: "OrderedDict[Hashable, FrameTrace]" = OrderedDict()
+        self._latency: Dict[str, deque] = {name: deque(maxlen=window or config.LINEAGE_WINDOW)
+                                           for name in LATENCIES}
+        self._threads: Dict[int, str] = {}
+
+    # ── Recording ─────────────────────────────────────────────────────────────
+    def begin(self, key: Hashable, capture_ts: float, **attrs) -> Optional[FrameTrace]:
+        if not self.enabled:
+            return None
+        trace = FrameTrace(key, capture_ts, attrs)
+        with self._lock:
+            self._traces[key] = trace
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+        return trace
+
+    def get(self, key: Hashable) -> Optional[FrameTrace]:
+        return self._traces.get(key)
+
+    def span(self, key: Hashable, stage: str, camera: str = "") -> _Span:
+        """Time one stage for frame `key` (perf histogram + span on its trace)."""
+        trace = self._traces.get(key) if self.enabled else None
+        if trace is not None:
+            self._name_thread()
+        return _Span(trace, stage, camera)
+
+    def mark(self, key: Hashable, stage: str, start: float, end: float, **args):
+        """Add an already-timed span (e.g. a send that finished on the event loop)."""
+        trace = self._traces.get(key) if self.enabled else None
+        if trace is not None:
+            self._name_thread()
+            trace.spans.append((stage, threading.get_ident(), start, end, args or None))
+
+    def latency(self, name: str, seconds: float):
+        if self.enabled and seconds >= 0:
+            self._latency[name].append(seconds)
+
+    def since(self, name: str, source: Optional[Source], now: float = None):
+        """Record `name` latency from a source's capture time to now."""
+        if source is not None:
+            self.latency(name, (now or time.time()) - source[1])
+
+    def _name_thread(self):
+        ident = threading.get_ident()
+        if ident not in self._threads:
+            self._threads[ident] = threading.current_thread().name
+
+    # ── Export ────────────────────────────────────────────────────────────────
+    def recent(self, n: int = 20) -> List[Dict]:
+        with self._lock:
+            traces = list(self._traces.values())[-n:]
+        return [t.to_dict() for t in reversed(traces)]
+
+    def get_stats(self) -> Dict:
+        out = {}
+        for name, values in self._latency.items():
+            arr = np.asarray(values, dtype=float) * 1000.0
+            out[name] = {
+                "samples": int(arr.size),
+                "p50_ms":  round(float(np.percentile(arr, 50)), 2) if arr.size else 0.0,
+                "p90_ms":  round(float(np.percentile(arr, 90)), 2) if arr.size else 0.0,
+                "p99_ms":  round(float(np.percentile(arr, 99)), 2) if arr.size else 0.0,
+                "max_ms":  round(float(arr.max()), 2) if arr.size else 0.0,
+            }
+        return {"enabled": self.enabled, "traces": len(self._traces), "latency": out}
+
+    def chrome_trace(self, last: int = None) -> Dict:
+        """Recent traces as Chrome trace-event JSON ({"traceEvents": [...]})."""
+        with self._lock:
+            traces = list(self._traces.values())
+        if last:
+            traces = traces[-last:]
+        us = lambda t: round(t * 1e6, 1)
+        events = [{"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+                  for tid, name in list(self._threads.items())]
+        for t in traces:
+            if not t.spans:
+                continue
+            fid = str(t.key)
+            end = max(s[3] for s in t.spans)
+            events.append({"name": f"frame {fid}", "cat": "frame", "ph": "b", "id": fid,
+                           "pid": 1, "tid": 0, "ts": us(t.capture_ts), "args": t.attrs})
+            events.append({"name": f"frame {fid}", "cat": "frame", "ph": "e", "id": fid,
+                           "pid": 1, "tid": 0, "ts": us(end)})
+            for stage, tid, t0, t1, args in t.spans:
+                events.append({"name": stage, "cat": "stage", "ph": "X", "pid": 1, "tid": tid,
+                               "ts": us(t0), "dur": us(t1 - t0),
+                               "args": {"frame_id": fid, **(args or {})}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+lineage = FrameLineage()
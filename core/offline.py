@@ -0,0 +1,189 @@
+"""
+core/offline.py — Headless Analysis Pipeline
+=============================================
+Tracker → LaneManager → TrafficAnalyzer → SignalOptimizer on video time,
+fed with per-frame detections from anywhere (Detector batches in
+analyze.py, recorded logs, ...). Nothing is drawn and nothing sleeps.
+
+  - Time comes from a SimulatedClock set to each frame's video timestamp,
+    so waits, alert cooldowns and signal phases behave as if the footage
+    ran in real time however fast it is processed.
+  - Every frame's tracks, lane stats, signal states and new alerts are
+    kept as columns and written with save() to one compressed .npz.
+  - summary() condenses a run into a JSON-able report.
+
+    run = OfflineAnalysis(1280, 720)
+    with run.running():
+        for t, detections in feed:
+            run.step(t, detections)
+    run.save("out/north.npz")
+
+Columns (np.load(path)):
+    frame_t                       [F]      video time of each frame
+    track_frame, track_id, track_label, track_lane, track_box [T, 4],
+    track_speed, track_stopped    [T]      one row per track per frame
+    lane_vehicles, lane_persons, lane_queue, lane_density,
+    lane_avg_wait, lane_max_wait  [F, L]
+    signal_state, signal_time_left [F, L]  state as index into signal_states
+    alert_frame, alert_t, alert_type, alert_severity, alert_lane, alert_message
+    lanes, labels, signal_states  name tables (lane/label -1 = none)
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import sys, os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core import clock
+from core.lane_manager import LaneManager
+from core.signal_optimizer import SignalOptimizer, SignalState
+from core.tracker import CentroidTracker
+from core.traffic_analyzer import TrafficAnalyzer
+
+SIGNAL_STATES = [s.value for s in SignalState]
+
+
+class OfflineAnalysis:
+    def __init__(self, frame_width: int, frame_height: int,
+                 polygons: Dict = None, phase_order: Sequence[str] = None,
+                 start: float = 0.0, name: str = ""):
+        self.name = name
+        self.clock = clock.SimulatedClock(start)   # Video time of the first frame
+        with clock.use_clock(self.clock):
+            self.tracker   = CentroidTracker(max_disappeared=8, max_distance=100)
+            self.lane_mgr  = LaneManager(frame_width, frame_height, polygons=polygons)
+            self.analyzer  = TrafficAnalyzer()
+            self.optimizer = SignalOptimizer(phase_order=phase_order)
+        self.lanes  = list(self.lane_mgr.lane_names)
+        self.labels: List[str] = []
+        self._label_idx: Dict[str, int] = {}
+
+        self.frames = 0
+        self._t: List[float] = []
+        self._tracks: List[tuple] = []     # (frame, id, label, lane, x1, y1, x2, y2, speed, stopped)
+        self._lanes:  List[List[tuple]] = []
+        self._signals: List[List[tuple]] = []
+        self._alerts: List[tuple] = []
+        self._unique_tracks = set()
+
+    @contextmanager
+    def running(self):
+        """Route clock.now() to this run's video time (process-wide)."""
+        with clock.use_clock(self.clock):
+            yield self
+
+    # ── Feed ──────────────────────────────────────────────────────────────────
+    def step(self, t: float, detections: List) -> Dict:
+        """One frame at video time t (call inside running())."""
+        self.clock.set(t)
+        tracks     = self.tracker.update(detections)
+        lane_stats = self.lane_mgr.update(tracks)
+        self.optimizer.update_phase_duration(lane_stats)
+        self.optimizer.update(lane_stats)
+        new_alerts = self.analyzer.update(tracks, lane_stats, list(detections))
+        self._record(t, tracks, lane_stats, new_alerts)
+        self.frames += 1
+        return lane_stats
+
+    def _label(self, label: str) -> int:
+        idx = self._label_idx.get(label)
+        if idx is None:
+            idx = self._label_idx[label] = len(self.labels)
+            self.labels.append(label)
+        return idx
+
+    def _lane(self, lane: Optional[str]) -> int:
+        return self.lanes.index(lane) if lane in self.lanes else -1
+
+    def _record(self, t: float, tracks, lane_stats: Dict, new_alerts):
+        f = self.frames
+        self._t.append(t)
+        for tr in tracks:
+            self._unique_tracks.add(tr.track_id)
+            self._tracks.append((f, tr.track_id, self._label(tr.label), self._lane(tr.lane),
+                                 tr.x1, tr.y1, tr.x2, tr.y2, tr.speed_px, tr.is_stopped))
+        empty = (0, 0, 0, 0.0, 0.0, 0.0)
+        row = []
+        for name in self.lanes:
+            s = lane_stats.get(name)
+            row.append((s.vehicle_count, s.person_count, s.queue_length, s.density_ratio,
+                        s.avg_wait_time, s.max_wait_time) if s else empty)
+        self._lanes.append(row)
+        signals = self.optimizer.signals
+        self._signals.append([
+            (SIGNAL_STATES.index(signals[n].state.value), signals[n].time_left) if n in signals else (0, 0.0)
+            for n in self.lanes
+        ])
+        for a in new_alerts:
+            self._alerts.append((f, a.timestamp, a.alert_type, a.severity, self._lane(a.lane), a.message))
+
+    # ── Output ────────────────────────────────────────────────────────────────
+    def columns(self) -> Dict[str, np.ndarray]:
+        L = len(self.lanes)
+        tr = self._tracks
+        lanes = np.asarray(self._lanes, dtype=np.float32).reshape(-1, L, 6)
+        sig = np.asarray(self._signals, dtype=np.float32).reshape(-1, L, 2)
+        al = self._alerts
+        return {
+            "frame_t":          np.asarray(self._t, dtype=np.float64),
+            "track_frame":      np.asarray([r[0] for r in tr], dtype=np.int32),
+            "track_id":         np.asarray([r[1] for r in tr], dtype=np.int32),
+            "track_label":      np.asarray([r[2] for r in tr], dtype=np.int16),
+            "track_lane":       np.asarray([r[3] for r in tr], dtype=np.int8),
+            "track_box":        np.asarray([r[4:8] for r in tr], dtype=np.int16).reshape(-1, 4),
+            "track_speed":      np.asarray([r[8] for r in tr], dtype=np.float32),
+            "track_stopped":    np.asarray([r[9] for r in tr], dtype=bool),
+            "lane_vehicles":    lanes[:, :, 0].astype(np.int16),
+            "lane_persons":     lanes[:, :, 1].astype(np.int16),
+            "lane_queue":       lanes[:, :, 2].astype(np.int16),
+            "lane_density":     lanes[:, :, 3],
+            "lane_avg_wait":    lanes[:, :, 4],
+            "lane_max_wait":    lanes[:, :, 5],
+            "signal_state":     sig[:, :, 0].astype(np.int8),
+            "signal_time_left": sig[:, :, 1],
+            "alert_frame":      np.asarray([a[0] for a in al], dtype=np.int32),
+            "alert_t":          np.asarray([a[1] for a in al], dtype=np.float64),
+            "alert_type":       np.asarray([a[2] for a in al], dtype=str),
+            "alert_severity":   np.asarray([a[3] for a in al], dtype=str),
+            "alert_lane":       np.asarray([a[4] for a in al], dtype=np.int8),
+            "alert_message":    np.asarray([a[5] for a in al], dtype=str),
+            "lanes":            np.asarray(self.lanes, dtype=str),
+            "labels":           np.asarray(self.labels, dtype=str),
+            "signal_states":    np.asarray(SIGNAL_STATES, dtype=str),
+        }
+
+    def save(self, path: str) -> str:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(path, **self.columns())
+        return path
+
+    def summary(self) -> Dict:
+        """Per-run report: traffic per lane, signal green share, alerts."""
+        t = np.asarray(self._t)
+        duration = float(t[-1] - t[0]) if t.size > 1 else 0.0
+        L = len(self.lanes)
+        lanes = np.asarray(self._lanes, dtype=float).reshape(-1, L, 6)
+        states = np.asarray(self._signals, dtype=float).reshape(-1, L, 2)[:, :, 0]
+        green = SIGNAL_STATES.index(SignalState.GREEN.value)
+        per_lane = {}
+        for i, name in enumerate(self.lanes):
+            col = lanes[:, i]
+            per_lane[name] = {
+                "avg_vehicles": round(float(col[:, 0].mean()), 2) if col.size else 0.0,
+                "max_vehicles": int(col[:, 0].max()) if col.size else 0,
+                "max_queue":    int(col[:, 2].max()) if col.size else 0,
+                "avg_wait_s":   round(float(col[:, 4].mean()), 1) if col.size else 0.0,
+                "max_wait_s":   round(float(col[:, 5].max()), 1) if col.size else 0.0,
+                "green_share":  round(float((states[:, i] == green).mean()), 3) if states.size else 0.0,
+            }
+        return {
+            "name":           self.name,
+            "frames":         self.frames,
+            "video_seconds":  round(duration, 1),
+            "unique_tracks":  len(self._unique_tracks),
+            "signal_cycles":  self.optimizer.total_cycles,
+            "alerts":         dict(Counter(a[2] for a in self._alerts)),
+            "lanes":          per_lane,
+        }
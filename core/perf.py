@@ -0,0 +1,196 @@
+"""
+core/perf.py — Pipeline Stage Instrumentation
+=============================================
+Process-wide latency histograms per stage and camera, counters, and
+scrape-time collectors (queue depths, drop counters), exposed as JSON
+(/api/perf) and Prometheus text (/metrics).
+
+  - Histograms have fixed log-spaced buckets (100 µs … 5 s), so an
+    observation is one bisect and two increments, with no allocation.
+    Percentiles are interpolated within buckets.
+  - Each stage/camera histogram is written by one thread in practice
+    (the one running that stage), so no lock is taken on the hot path.
+  - Collectors are callables run only on scrape; they read the counters
+    the components already keep (FrameSource drops, inference queues,
+    WebSocket drops) instead of mirroring them.
+  - PERF_ENABLED = False turns timer() into a shared no-op.
+
+    from core.perf import perf
+    with perf.timer("track", camera="north"):
+        tracks = tracker.update(detections)
+    perf.observe("detect", seconds)
+    perf.count("frames_dropped", camera="north")
+    perf.register_collector("sources", lambda: [("counter", "frames_dropped", {"camera": "n"}, 3)])
+"""
+
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+import sys, os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+           0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)                          # Seconds
+PREFIX = "traffic"
+
+Sample = Tuple[str, str, Dict[str, str], float]   # (counter|gauge, name, labels, value)
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "n")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)   # Last is +Inf
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.n += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimated q-quantile in seconds (linear within the bucket)."""
+        if not self.n:
+            return 0.0
+        rank, seen = q * self.n, 0
+        for i, c in enumerate(self.counts):
+            if c and seen + c >= rank:
+                lo = BUCKETS[i - 1] if i else 0.0
+                hi = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return lo + (hi - lo) * (rank - seen) / c
+            seen += c
+        return BUCKETS[-1]
+
+    def to_dict(self) -> Dict:
+        ms = lambda s: round(s * 1000.0, 3)
+        return {
+            "count":   self.n,
+            "mean_ms": ms(self.total / self.n) if self.n else 0.0,
+            "p50_ms":  ms(self.quantile(0.50)),
+            "p90_ms":  ms(self.quantile(0.90)),
+            "p99_ms":  ms(self.quantile(0.99)),
+            "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], self.counts)),
+        }
+
+
+class _Timer:
+    __slots__ = ("hist", "t0")
+
+    def __init__(self, hist: Histogram):
+        self.hist = hist
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.t0)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL = _NullTimer()
+
+
+class PerfRegistry:
+    def __init__(self, enabled: bool = None):
+        self.enabled = config.PERF_ENABLED if enabled is None else enabled
+        self._lock = threading.Lock()      # Only for creating series
+        self._hists: Dict[Tuple[str, str], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[Sample]]] = {}
+
+    # ── Recording ─────────────────────────────────────────────────────────────
+    def histogram(self, stage: str, camera: str = "") -> Histogram:
+        key = (stage, camera)
+        hist = self._hists.get(key)
+        if hist is None:
+            with self._lock:
+                hist = self._hists.setdefault(key, Histogram())
+        return hist
+
+    def timer(self, stage: str, camera: str = ""):
+        """Context manager timing one run of `stage`."""
+        if not self.enabled:
+            return _NULL
+        return _Timer(self.histogram(stage, camera))
+
+    def observe(self, stage: str, seconds: float, camera: str = ""):
+        if self.enabled:
+            self.histogram(stage, camera).observe(seconds)
+
+    def count(self, name: str, n: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def register_collector(self, key: str, fn: Callable[[], Iterable[Sample]]):
+        """fn() → samples, run on every scrape; re-registering a key replaces it."""
+        with self._lock:
+            self._collectors[key] = fn
+
+    def unregister_collector(self, key: str):
+        with self._lock:
+            self._collectors.pop(key, None)
+
+    # ── Export ────────────────────────────────────────────────────────────────
+    def _samples(self) -> List[Sample]:
+        with self._lock:
+            samples = [("counter", name, dict(labels), v) for (name, labels), v in self._counters.items()]
+            collectors = list(self._collectors.items())
+        for key, fn in collectors:
+            try:
+                samples.extend(fn())
+            except Exception as e:
+                print(f"[Perf] Collector '{key}' failed: {e}")
+        return samples
+
+    def snapshot(self) -> Dict:
+        stages: Dict[str, Dict] = {}
+        for (stage, camera), hist in sorted(self._hists.items()):
+            stages.setdefault(stage, {})[camera or "all"] = hist.to_dict()
+        counters, gauges = {}, {}
+        for kind, name, labels, value in self._samples():
+            label = ",".join(f"{k}={v}" for k, v in sorted(labels.items())) or "all"
+            (counters if kind == "counter" else gauges).setdefault(name, {})[label] = value
+        return {"enabled": self.enabled, "stages": stages, "counters": counters, "gauges": gauges}
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = [f"# HELP {PREFIX}_stage_seconds Pipeline stage latency.",
+                 f"# TYPE {PREFIX}_stage_seconds histogram"]
+        for (stage, camera), hist in sorted(self._hists.items()):
+            labels = f'stage="{_esc(stage)}",camera="{_esc(camera)}"'
+            cumulative = 0
+            for bound, c in zip(list(BUCKETS) + ["+Inf"], hist.counts):
+                cumulative += c
+                lines.append(f'{PREFIX}_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{PREFIX}_stage_seconds_sum{{{labels}}} {hist.total:.9f}")
+            lines.append(f"{PREFIX}_stage_seconds_count{{{labels}}} {hist.n}")
+
+        typed = set()
+        for kind, name, labels, value in sorted(self._samples(), key=lambda s: (s[1], s[0])):
+            metric = f"{PREFIX}_{name}_total" if kind == "counter" else f"{PREFIX}_{name}"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} {kind}")
+            label_str = ",".join(f'{k}="{_esc(str(v))}"' for k, v in sorted(labels.items()))
+            lines.append(f"{metric}{{{label_str}}} {value}" if label_str else f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _esc(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+perf = PerfRegistry()
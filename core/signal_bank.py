@@ -0,0 +1,211 @@
+"""
+core/signal_bank.py — Vectorized Signal Controller Bank
+========================================================
+Runs N intersections' signal state machines as NumPy arrays so a whole
+corridor advances in one vectorized step instead of N Python objects.
+
+Semantics match SignalOptimizer.update_phase_duration() followed by
+SignalOptimizer.update() for every intersection:
+  - adaptive green = min(60, max(10, 2 × N)), 60 with an ambulance
+  - GREEN → YELLOW (YELLOW_DURATION) → next phase
+  - next phase = longest-waiting lane past MAX_WAIT_TIME, else highest
+    priority score among the other lanes
+  - ambulance preemption (30 s emergency window, 5 s release)
+
+get_metrics(i) returns the same dict as SignalOptimizer.get_metrics().
+"""
+
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+import sys, os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from core import clock
+from core.signal_optimizer import SignalOptimizer, SignalState
+
+RED, YELLOW, GREEN = 0, 1, 2
+_STATE_NAMES = {RED: SignalState.RED.value, YELLOW: SignalState.YELLOW.value,
+                GREEN: SignalState.GREEN.value}
+
+
+class SignalControllerBank:
+    """
+    N intersections × L approaches of adaptive signal control in arrays.
+
+    Usage:
+        bank = SignalControllerBank(n=100)
+        counts, priority, ambulance = bank.arrays_from_lane_stats(list_of_lane_stats)
+        bank.step(counts, priority, ambulance)
+        bank.get_metrics(7)
+    """
+
+    PHASE_ORDER = list(SignalOptimizer.PHASE_ORDER)
+    EMERGENCY_WINDOW  = 30.0
+    EMERGENCY_RELEASE = 5.0
+
+    def __init__(self, n: int, phase_order: Sequence[str] = None):
+        self.phase_order = list(phase_order or self.PHASE_ORDER)
+        self.n = n
+        L = len(self.phase_order)
+        now = clock.now()
+
+        self.state      = np.full((n, L), RED, dtype=np.int8)
+        self.time_left  = np.zeros((n, L))
+        self.last_green = np.full((n, L), now)
+
+        self.phase_idx      = np.zeros(n, dtype=np.int64)
+        self.phase_start    = np.full(n, now)
+        self.phase_duration = np.full(n, float(config.MIN_GREEN_TIME))
+        self.in_yellow      = np.zeros(n, dtype=bool)
+        self.yellow_start   = np.zeros(n)
+
+        self.emergency_active = np.zeros(n, dtype=bool)
+        self.emergency_lane   = np.full(n, -1, dtype=np.int64)
+        self.emergency_start  = np.zeros(n)
+
+        self.total_cycles = np.zeros(n, dtype=np.int64)
+        self._rows  = np.arange(n)
+        self._lanes = np.arange(L)
+
+        self._activate(np.ones(n, dtype=bool), now)
+
+    # ── Inputs ────────────────────────────────────────────────────────────────
+    def arrays_from_lane_stats(self, lane_stats_list: List[Dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Convert N dicts of lane_name → LaneStats into (counts, priority, ambulance)."""
+        L = len(self.phase_order)
+        counts    = np.zeros((self.n, L))
+        priority  = np.zeros((self.n, L))
+        ambulance = np.zeros((self.n, L), dtype=bool)
+        for i, stats in enumerate(lane_stats_list):
+            for j, name in enumerate(self.phase_order):
+                s = stats.get(name)
+                if s is None:
+                    continue
+                counts[i, j]    = getattr(s, "vehicle_count", 0)
+                priority[i, j]  = getattr(s, "priority_score", 0)
+                ambulance[i, j] = getattr(s, "ambulance_present", False)
+        return counts, priority, ambulance
+
+    # ── State machine ─────────────────────────────────────────────────────────
+    def _activate(self, mask: np.ndarray, now: float):
+        """SignalOptimizer._activate_phase for every row in mask."""
+        rows = self._rows[mask]
+        self.state[rows] = RED
+        self.time_left[rows] = 0.0
+        lanes = self.phase_idx[rows]
+        self.state[rows, lanes] = GREEN
+        self.last_green[rows, lanes] = now
+        self.phase_start[rows] = now
+        self.phase_duration[rows] = config.BASE_GREEN_TIME
+
+    def step(self, vehicle_count: np.ndarray, priority: np.ndarray,
+             ambulance: np.ndarray, now: float = None) -> np.ndarray:
+        """
+        Advance all intersections one tick. Inputs are (N, L) arrays in
+        phase_order. Returns the (N, L) state array (0 red, 1 yellow, 2 green).
+        """
+        now = clock.now() if now is None else now
+        rows, cur = self._rows, self.phase_idx
+        ambulance = np.asarray(ambulance, dtype=bool)
+
+        # ── update_phase_duration ───────────────────────────────────────────
+        cur_count = vehicle_count[rows, cur]
+        self.phase_duration = np.where(ambulance[rows, cur], 60.0,
+                                       np.minimum(60.0, np.maximum(10.0, 2.0 * cur_count)))
+        elapsed = now - self.phase_start
+
+        # ── Emergency override ──────────────────────────────────────────────
+        has_amb = ambulance.any(axis=1)
+        target  = ambulance.argmax(axis=1)
+        if config.AMBULANCE_OVERRIDE:
+            trigger = has_amb & (~self.emergency_active | (self.emergency_lane != target))
+        else:
+            trigger = np.zeros(self.n, dtype=bool)
+        release = (self.emergency_active & ~trigger & ~has_amb
+                   & (now - self.emergency_start > self.EMERGENCY_RELEASE))
+
+        if trigger.any():
+            t_rows = rows[trigger]
+            t_lane = target[trigger]
+            self.emergency_active[t_rows] = True
+            self.emergency_lane[t_rows]   = t_lane
+            self.emergency_start[t_rows]  = now
+            self.state[t_rows] = RED
+            self.time_left[t_rows] = 0.0
+            self.state[t_rows, t_lane] = GREEN
+            self.time_left[t_rows, t_lane] = self.EMERGENCY_WINDOW
+            self.last_green[t_rows, t_lane] = now
+
+        if release.any():
+            self.emergency_active[release] = False
+            self.emergency_lane[release] = -1
+            self._activate(release, now)
+
+        normal = ~self.emergency_active
+        yellow_rows = normal & self.in_yellow
+        green_rows  = normal & ~self.in_yellow
+
+        # ── Yellow phase ────────────────────────────────────────────────────
+        if yellow_rows.any():
+            y = rows[yellow_rows]
+            y_elapsed = now - self.yellow_start[y]
+            self.time_left[y, cur[y]] = config.YELLOW_DURATION - y_elapsed
+            done = y[y_elapsed >= config.YELLOW_DURATION]
+            if done.size:
+                self.in_yellow[done] = False
+                self.state[done, cur[done]] = RED
+                self._advance(done, priority, now)
+
+        # ── Active green phase ──────────────────────────────────────────────
+        if green_rows.any():
+            g = rows[green_rows]
+            self.time_left[g, cur[g]] = np.maximum(0.0, self.phase_duration[g] - elapsed[g])
+            to_y = g[elapsed[g] >= self.phase_duration[g]]
+            if to_y.size:
+                self.in_yellow[to_y] = True
+                self.yellow_start[to_y] = now
+                self.state[to_y, cur[to_y]] = YELLOW
+                self.time_left[to_y, cur[to_y]] = config.YELLOW_DURATION
+
+        return self.state
+
+    def _advance(self, rows: np.ndarray, priority: np.ndarray, now: float):
+        """SignalOptimizer._advance_phase for the given rows."""
+        is_current = self._lanes[None, :] == self.phase_idx[rows, None]
+
+        waits = now - self.last_green[rows]
+        overdue = (waits > config.MAX_WAIT_TIME) & ~is_current
+        fair = overdue.any(axis=1)
+        fair_pick = np.where(overdue, waits, -np.inf).argmax(axis=1)
+
+        score = np.where(is_current, -np.inf, priority[rows])
+        prio_pick = score.argmax(axis=1)
+
+        self.phase_idx[rows] = np.where(fair, fair_pick, prio_pick)
+        mask = np.zeros(self.n, dtype=bool)
+        mask[rows] = True
+        self._activate(mask, now)
+        self.total_cycles[rows] += 1
+
+    # ── Outputs ───────────────────────────────────────────────────────────────
+    def current_lane(self, i: int) -> str:
+        return self.phase_order[int(self.phase_idx[i])]
+
+    def get_metrics(self, i: int) -> Dict:
+        """Same shape as SignalOptimizer.get_metrics() for intersection i."""
+        em_lane = int(self.emergency_lane[i])
+        return {
+            "signals": {
+                name: {
+                    "state":      _STATE_NAMES[int(self.state[i, j])],
+                    "time_left":  round(float(self.time_left[i, j]), 1),
+                    "last_green": float(self.last_green[i, j]),
+                }
+                for j, name in enumerate(self.phase_order)
+            },
+            "current_lane":     self.current_lane(i),
+            "total_cycles":     int(self.total_cycles[i]),
+            "emergency_active": bool(self.emergency_active[i]),
+            "emergency_lane":   self.phase_order[em_lane] if em_lane >= 0 else None,
+        }
@@ -5,13 +5,13 @@ Implements adaptive signal timing with:
   - Weighted rule-based timing (base + per-vehicle seconds)
   - Fairness enforcement (no lane waits > threshold)
   - Emergency vehicle preemption
-  - 4-phase cycle: North → South → East → West
+  - Phase cycle over the junction's approaches (default North → South →
+    East → West; see phase_order)
 
 State machine:
   GREEN (active) → YELLOW (transitioning) → RED → wait for next turn
 """
 
-import time
 from dataclasses import dataclass, field
 from typing import Dict, Optional, List, Tuple
 from enum import Enum
@@ -19,6 +19,7 @@ import sys, os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
+from core import clock
 
 
 class SignalState(str, Enum):
@@ -56,15 +57,17 @@ class SignalOptimizer:
     
     PHASE_ORDER = ["North", "South", "East", "West"]
     
-    def __init__(self):
-        now = time.time()
+    def __init__(self, phase_order: List[str] = None):
+        if phase_order:
+            self.PHASE_ORDER = list(phase_order)   # Per-junction approaches (T, roundabout, ...)
+        now = clock.now()
         self.signals: Dict[str, LaneSignal] = {
             name: LaneSignal(name=name, last_green=now) for name in self.PHASE_ORDER
         }
         
         # Current phase
         self._phase_idx     = 0
-        self._phase_start   = time.time()
+        self._phase_start   = clock.now()
         self._phase_duration = config.MIN_GREEN_TIME    # Will be updated
         self._in_yellow     = False
         self._yellow_start  = 0.0
@@ -76,7 +79,7 @@ class SignalOptimizer:
         
         # Metrics
         self.total_cycles    = 0
-        self.last_update     = time.time()
+        self.last_update     = clock.now()
         self.phase_history:  List[Dict] = []   # For analytics
         
         # Initialize first green
@@ -118,7 +121,7 @@ class SignalOptimizer:
         Returns:
             Dict[lane_name → SignalState] for all lanes
         """
-        now = time.time()
+        now = clock.now()
         elapsed = now - self._phase_start
         
         # ── Emergency Override ──────────────────────────────────────────────
@@ -133,7 +136,7 @@ class SignalOptimizer:
                 self._trigger_emergency(target)
         elif self.emergency_active:
             # Emergency over if ambulance gone for 5+ seconds
-            if time.time() - self.emergency_start > 5.0 and not ambulance_lanes:
+            if clock.now() - self.emergency_start > 5.0 and not ambulance_lanes:
                 self._clear_emergency()
         
         if self.emergency_active:
@@ -166,10 +169,22 @@ class SignalOptimizer:
         
         return self._get_signal_states()
     
+    def next_deadline(self) -> float:
+        """
+        Clock time (clock.now()) of the next planned transition given the
+        current phase duration: green→yellow, yellow→next phase, or the
+        earliest emergency release. Used by SignalScheduler.
+        """
+        if self.emergency_active:
+            return self.emergency_start + 5.0
+        if self._in_yellow:
+            return self._yellow_start + config.YELLOW_DURATION
+        return self._phase_start + self._phase_duration
+    
     def _advance_phase(self, lane_stats: Dict):
         """Choose the next phase, respecting fairness and priority."""
         # ── Fairness check ───────────────────────────────────────────────────
-        now = time.time()
+        now = clock.now()
         fairness_candidate = None
         longest_wait = 0.0
         
@@ -187,7 +202,7 @@ class SignalOptimizer:
             self._phase_idx = self.PHASE_ORDER.index(next_lane)
         else:
             # Priority-based selection: pick highest score from remaining
-            remaining = [n for n in self.PHASE_ORDER if n != self.current_lane]
+            remaining = [n for n in self.PHASE_ORDER if n != self.current_lane] or [self.current_lane]
             
             def priority(name):
                 s = lane_stats.get(name)
@@ -213,15 +228,15 @@ class SignalOptimizer:
         
         # Activate chosen lane
         self.signals[lane].state      = SignalState.GREEN
-        self.signals[lane].last_green = time.time()
-        self._phase_start             = time.time()
+        self.signals[lane].last_green = clock.now()
+        self._phase_start             = clock.now()
         
         # Default duration until update() sets it properly
         self._phase_duration = config.BASE_GREEN_TIME
         
         # Log phase change
         self.phase_history.append({
-            "lane": lane, "time": time.time(), "duration": self._phase_duration
+            "lane": lane, "time": clock.now(), "duration": self._phase_duration
         })
         if len(self.phase_history) > 100:
             self.phase_history.pop(0)
@@ -236,7 +251,7 @@ class SignalOptimizer:
         """Immediately switch to emergency lane (green)."""
         self.emergency_active = True
         self.emergency_lane   = lane
-        self.emergency_start  = time.time()
+        self.emergency_start  = clock.now()
         
         # Set all red, emergency lane green
         for name, sig in self.signals.items():
@@ -245,7 +260,7 @@ class SignalOptimizer:
         
         self.signals[lane].state      = SignalState.GREEN
         self.signals[lane].time_left  = 30.0  # 30 second emergency window
-        self.signals[lane].last_green = time.time()
+        self.signals[lane].last_green = clock.now()
     
     def _clear_emergency(self):
         """Resume normal operation after emergency."""
@@ -0,0 +1,223 @@
+"""
+core/signal_scheduler.py — Event-Driven Signal Phase Scheduler
+===============================================================
+Fires SignalOptimizer phase transitions on time, independent of the
+inference rate.
+
+Before: SignalOptimizer.update() ran only when the inference thread got
+a frame through YOLO, so green→yellow→red lagged by up to one inference
+cycle and froze entirely if inference stalled.
+
+Now:
+  - The inference thread only submit()s the latest LaneStats snapshot.
+  - A scheduler thread keeps a deadline min-heap on the monotonic clock
+    (one entry per optimizer, re-armed after every step) and wakes
+    exactly at the next planned transition, on a new snapshot (e.g.
+    ambulance preemption), or at a slow refresh tick for countdowns.
+  - Subscribers are called as soon as any light changes state.
+  - Transition jitter (actual fire time − planned deadline) is recorded.
+"""
+
+import copy
+import heapq
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+import sys, os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core import clock
+from core.lineage import lineage
+
+
+class SignalScheduler:
+    """
+    Drives one or more SignalOptimizers from a dedicated timer thread.
+
+    Usage:
+        sched = SignalScheduler()
+        sched.add(optimizer)                  # key defaults to "default"
+        sched.subscribe(lambda key, metrics: ...)
+        sched.start()
+        sched.submit(lane_stats)              # from the inference thread
+    """
+
+    DEFAULT_KEY = "default"
+
+    def __init__(self, refresh_interval: float = 0.25, jitter_window: int = 512):
+        self.refresh_interval = refresh_interval
+
+        self._cond = threading.Condition()
+        self._optimizers: Dict[str, object] = {}
+        self._snapshots:  Dict[str, Dict] = {}
+        self._dirty:      set = set()
+        self._sources:    Dict[str, tuple] = {}                 # key → (frame_id, capture_ts) of snapshot
+        self._fresh:      set = set()                           # Snapshots not stepped yet
+        self._generation: Dict[str, int] = {}
+        self._armed:      Dict[str, float] = {}                 # key → armed clock deadline
+        self._fired:      Dict[str, float] = {}                 # key → clock deadline last fired
+        self._heap: List[Tuple[float, int, str, int]] = []   # (mono deadline, seq, key, gen)
+        self._seq = 0
+
+        self._subscribers: List[Callable[[str, Dict], None]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        # Metrics
+        self._jitter_ms: deque = deque(maxlen=jitter_window)
+        self.transitions = 0
+        self.steps = 0
+
+    # ── Registration ──────────────────────────────────────────────────────────
+    def add(self, optimizer, key: str = None) -> str:
+        key = key or self.DEFAULT_KEY
+        with self._cond:
+            self._optimizers[key] = optimizer
+            self._snapshots[key]  = {}
+            self._generation[key] = 0
+            self._arm(key)
+            self._cond.notify()
+        return key
+
+    def subscribe(self, callback: Callable[[str, Dict], None]):
+        """callback(key, optimizer.get_metrics()) on every signal state change."""
+        self._subscribers.append(callback)
+
+    # ── Producer side ─────────────────────────────────────────────────────────
+    def submit(self, lane_stats: Dict, key: str = None, source: tuple = None):
+        """
+        Hand over the latest LaneStats; the scheduler re-evaluates immediately.
+        source = (frame_id, capture_ts) of the frame they came from (core.lineage).
+        """
+        key = key or self.DEFAULT_KEY
+        snapshot = {name: copy.copy(s) for name, s in lane_stats.items()}
+        with self._cond:
+            self._snapshots[key] = snapshot
+            if source is not None:
+                self._sources[key] = source
+                self._fresh.add(key)
+            self._dirty.add(key)
+            self._cond.notify()
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="signal-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+
+    # ── Scheduler thread ──────────────────────────────────────────────────────
+    def _arm(self, key: str):
+        """(Re)schedule the next deadline for `key`; stale heap entries are skipped."""
+        deadline = self._optimizers[key].next_deadline()
+        if self._armed.get(key) == deadline:
+            return
+        self._armed[key] = deadline
+        self._generation[key] += 1
+        remaining = deadline - clock.now()
+        if remaining <= 0 and self._fired.get(key) == deadline:
+            return   # Already fired; waiting on a snapshot (e.g. emergency active), refresh covers it
+        self._seq += 1
+        heapq.heappush(self._heap, (time.monotonic() + max(0.0, remaining), self._seq, key,
+                                    self._generation[key]))
+
+    def _run(self):
+        next_refresh = time.monotonic() + self.refresh_interval
+        while True:
+            changed: List[str] = []
+            with self._cond:
+                if not self._running:
+                    return
+                now = time.monotonic()
+
+                # Timer deadlines first so their jitter is attributed correctly
+                due: List[Tuple[str, Optional[float]]] = []
+                while self._heap and self._heap[0][0] <= now:
+                    deadline, _, key, gen = heapq.heappop(self._heap)
+                    if gen == self._generation.get(key):
+                        self._fired[key] = self._armed.pop(key, None)
+                        due.append((key, deadline))
+                due.extend((k, None) for k in self._dirty)
+                self._dirty.clear()
+                if now >= next_refresh:
+                    due.extend((k, None) for k in self._optimizers)
+                    next_refresh = now + self.refresh_interval
+
+                stepped = set()
+                for key, planned in due:
+                    if key in stepped and planned is None:
+                        continue
+                    stepped.add(key)
+                    if self._step(key, planned):
+                        changed.append(key)
+                    self._arm(key)
+
+                if not changed:
+                    wake = next_refresh
+                    if self._heap:
+                        wake = min(wake, self._heap[0][0])
+                    self._cond.wait(timeout=max(0.0, wake - time.monotonic()))
+                    continue
+
+                payloads = [(k, self._optimizers[k].get_metrics()) for k in changed]
+
+            # Notify outside the lock so slow subscribers never delay timing
+            for key, metrics in payloads:
+                for cb in self._subscribers:
+                    try:
+                        cb(key, metrics)
+                    except Exception as e:
+                        print(f"[SignalScheduler] Subscriber error: {e}")
+
+    def _step(self, key: str, planned: Optional[float]) -> bool:
+        """Advance one optimizer. Returns True if any light changed state."""
+        opt = self._optimizers[key]
+        stats = self._snapshots.get(key) or {}
+        before = {name: sig.state for name, sig in opt.signals.items()}
+        source = self._sources.get(key) if key in self._fresh else None
+        self._fresh.discard(key)
+
+        with lineage.span(source[0] if source else None, "optimize", camera=key):
+            if stats:
+                opt.update_phase_duration(stats)
+            opt.update(stats)
+        lineage.since("decision", source)
+        self.steps += 1
+
+        after = {name: sig.state for name, sig in opt.signals.items()}
+        if after == before:
+            return False
+        self.transitions += 1
+        if planned is not None:
+            self._jitter_ms.append((time.monotonic() - planned) * 1000.0)
+        return True
+
+    # ── Reads ─────────────────────────────────────────────────────────────────
+    def get_metrics(self, key: str = None) -> Dict:
+        """Optimizer metrics read under the scheduler lock (consistent snapshot)."""
+        with self._cond:
+            return self._optimizers[key or self.DEFAULT_KEY].get_metrics()
+
+    def get_stats(self) -> Dict:
+        jit = np.asarray(self._jitter_ms, dtype=float)
+        return {
+            "transitions": self.transitions,
+            "steps":       self.steps,
+            "jitter_ms": {
+                "samples": int(jit.size),
+                "mean":    round(float(jit.mean()), 3) if jit.size else 0.0,
+                "p50":     round(float(np.percentile(jit, 50)), 3) if jit.size else 0.0,
+                "p99":     round(float(np.percentile(jit, 99)), 3) if jit.size else 0.0,
+                "max":     round(float(jit.max()), 3) if jit.size else 0.0,
+            },
+        }
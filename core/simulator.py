@@ -0,0 +1,360 @@
+"""
+core/simulator.py — Offline Signal-Policy Simulator
+====================================================
+Tunes signal timing without watching live video.
+
+Two engines share the same arrival traces (per-lane vehicles per step):
+
+  1. simulate_optimizer() — replays arrivals through the real
+     SignalOptimizer state machine on a SimulatedClock. Exact behaviour
+     of the production controller, one policy at a time.
+
+  2. simulate_policies()  — NumPy-vectorized queue model that mirrors the
+     optimizer's rules (green = clamp(per_vehicle × N), fairness after
+     fairness_wait, priority-score next phase, fixed yellow) for thousands of
+     parameter combinations in one pass.
+
+Queue model: point queues per lane, FIFO, discharging at `sat_flow`
+vehicles/second while green. Waits are exact per vehicle (cumulative
+arrival/departure curves), so avg delay, max wait and throughput are
+comparable between both engines.
+
+CLI:
+    python -m core.simulator --duration 3600 --rates 0.2,0.1,0.15,0.05 \\
+        --grid "per_vehicle=1,2,3;fairness_wait=30,60,90;base_green=5,10" --validate
+"""
+
+import argparse
+import csv
+import json
+import time
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import sys, os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from core import clock
+from core.lane_manager import LaneStats
+from core.signal_optimizer import SignalOptimizer, SignalState
+
+LANES = list(SignalOptimizer.PHASE_ORDER)
+
+# Defaults mirror SignalOptimizer.compute_green_time and LaneStats.priority_score
+DEFAULT_POLICY = {
+    "base_green":  10.0,                 # green = max(base_green, per_vehicle × N) …
+    "per_vehicle": 2.0,
+    "max_green":   60.0,                 # … capped at max_green
+    "fairness_wait": float(config.MAX_WAIT_TIME),  # force a lane green after this long
+    "w_count":     2.0,                  # priority = w_count×N + w_queue×Q + w_wait×avg_wait
+    "w_queue":     3.0,
+    "w_wait":      0.5,
+}
+
+
+# ─── Arrival traces ───────────────────────────────────────────────────────────
+def poisson_arrivals(rates: Sequence[float], duration: float, dt: float = 1.0,
+                     seed: int = 0) -> np.ndarray:
+    """Synthetic arrivals: shape (steps, lanes), rates in vehicles/second per lane."""
+    steps = int(duration / dt)
+    rng = np.random.default_rng(seed)
+    return rng.poisson(np.asarray(rates, dtype=float) * dt, size=(steps, len(rates)))
+
+
+def load_trace(path: str, dt: float = 1.0, lanes: Sequence[str] = LANES) -> np.ndarray:
+    """
+    Load a recorded CSV trace with columns `time,lane,arrivals` (or
+    `time,lane,queue`, from which arrivals are taken as queue increases).
+    Times are seconds; they are re-based to the first row and binned by dt.
+    """
+    rows = []
+    with open(path, newline="") as f:
+        for r in csv.DictReader(f):
+            rows.append(r)
+    if not rows:
+        return np.zeros((0, len(lanes)), dtype=np.int64)
+
+    t0 = min(float(r["time"]) for r in rows)
+    t1 = max(float(r["time"]) for r in rows)
+    steps = int((t1 - t0) / dt) + 1
+    out = np.zeros((steps, len(lanes)), dtype=np.int64)
+    lane_idx = {name: i for i, name in enumerate(lanes)}
+
+    if "arrivals" in rows[0]:
+        for r in rows:
+            if r["lane"] in lane_idx:
+                out[int((float(r["time"]) - t0) / dt), lane_idx[r["lane"]]] += int(float(r["arrivals"]))
+    else:
+        queue = np.zeros((steps, len(lanes)))
+        for r in rows:
+            if r["lane"] in lane_idx:
+                queue[int((float(r["time"]) - t0) / dt), lane_idx[r["lane"]]] = float(r["queue"])
+        out[1:] = np.maximum(0, np.diff(queue, axis=0)).round().astype(np.int64)
+    return out
+
+
+def _arrival_tables(arrivals: np.ndarray, dt: float):
+    """Per-lane arrival time of the k-th vehicle and prefix sums of those times."""
+    steps, n_lanes = arrivals.shape
+    totals = arrivals.sum(axis=0)
+    width = int(totals.max()) + 1
+    arr_time = np.full((n_lanes, width), np.inf)
+    prefix   = np.zeros((n_lanes, width + 1))
+    for l in range(n_lanes):
+        times = np.repeat(np.arange(steps) * dt, arrivals[:, l])
+        arr_time[l, :len(times)] = times
+        prefix[l, 1:len(times) + 1] = np.cumsum(times)
+        prefix[l, len(times) + 1:] = prefix[l, len(times)]
+    return arr_time, prefix
+
+
+# ─── Engine 1: real SignalOptimizer ──────────────────────────────────────────
+def simulate_optimizer(arrivals: np.ndarray, dt: float = 1.0, sat_flow: float = 0.5,
+                       optimizer: Optional[SignalOptimizer] = None) -> Dict:
+    """Replay arrivals through the production SignalOptimizer on simulated time."""
+    sim = clock.SimulatedClock(start=0.0)
+    queues: List[List[float]] = [[] for _ in LANES]   # arrival times per lane (FIFO)
+    credit = 0.0
+    delay = 0.0
+    max_wait = 0.0
+    departed = 0
+
+    with clock.use_clock(sim):
+        opt = optimizer or SignalOptimizer()
+        stats = {name: LaneStats(name=name) for name in LANES}
+
+        for step in range(arrivals.shape[0]):
+            now = sim()
+            for l, n in enumerate(arrivals[step]):
+                queues[l].extend([now] * int(n))
+
+            for l, name in enumerate(LANES):
+                q = queues[l]
+                s = stats[name]
+                s.vehicle_count = len(q)
+                s.queue_length  = len(q)
+                s.avg_wait_time = (now - sum(q) / len(q)) if q else 0.0
+                s.max_wait_time = (now - q[0]) if q else 0.0
+
+            opt.update_phase_duration(stats)
+            opt.update(stats)
+
+            green = [l for l, name in enumerate(LANES) if opt.signals[name].state == SignalState.GREEN]
+            if green:
+                q = queues[green[0]]
+                credit += sat_flow * dt
+                n_dep = min(len(q), int(credit))
+                credit -= n_dep
+                del q[:n_dep]
+                departed += n_dep
+                if not q:
+                    credit = 0.0
+            else:
+                credit = 0.0
+
+            for q in queues:
+                if q:
+                    delay += len(q) * dt
+                    max_wait = max(max_wait, now - q[0])
+            sim.advance(dt)
+
+    total = int(arrivals.sum())
+    duration = arrivals.shape[0] * dt
+    return {
+        "policy":        "SignalOptimizer",
+        "avg_delay":     round(delay / max(total, 1), 2),
+        "max_wait":      round(max_wait, 1),
+        "throughput_h":  round(departed * 3600.0 / max(duration, dt), 1),
+        "residual_queue": int(sum(len(q) for q in queues)),
+        "cycles":        opt.total_cycles,
+    }
+
+
+# ─── Engine 2: vectorized policy sweep ───────────────────────────────────────
+def param_grid(**values: Sequence[float]) -> Dict[str, np.ndarray]:
+    """Cartesian product of parameter values; unspecified params use DEFAULT_POLICY."""
+    keys = list(DEFAULT_POLICY)
+    axes = [np.asarray(values.get(k, [DEFAULT_POLICY[k]]), dtype=float) for k in keys]
+    mesh = np.meshgrid(*axes, indexing="ij")
+    return {k: m.ravel() for k, m in zip(keys, mesh)}
+
+
+def simulate_policies(arrivals: np.ndarray, params: Dict[str, np.ndarray],
+                      dt: float = 1.0, sat_flow: float = 0.5,
+                      yellow: float = None) -> Dict[str, np.ndarray]:
+    """
+    Evaluate P policies (arrays of length P in `params`) against the same
+    arrivals. Returns arrays of avg_delay, max_wait, throughput_h, residual_queue.
+    """
+    yellow = float(config.YELLOW_DURATION if yellow is None else yellow)
+    steps, n_lanes = arrivals.shape
+    P = len(next(iter(params.values())))
+    p = {k: np.broadcast_to(np.asarray(params.get(k, DEFAULT_POLICY[k]), dtype=float), (P,))
+         for k in DEFAULT_POLICY}
+
+    arr_time, prefix = _arrival_tables(arrivals, dt)
+    lane_ix = np.arange(n_lanes)
+    rows    = np.arange(P)
+
+    cum_arr    = np.zeros(n_lanes, dtype=np.int64)
+    departed   = np.zeros((P, n_lanes), dtype=np.int64)
+    green      = np.zeros(P, dtype=np.int64)            # PHASE_ORDER[0] starts green
+    in_yellow  = np.zeros(P, dtype=bool)
+    phase_t0   = np.zeros(P)
+    yellow_t0  = np.zeros(P)
+    last_green = np.zeros((P, n_lanes))
+    credit     = np.zeros(P)
+    delay      = np.zeros(P)
+    max_wait   = np.zeros(P)
+
+    for step in range(steps):
+        now = step * dt
+        cum_arr += arrivals[step]
+        queue = cum_arr[None, :] - departed                       # (P, L)
+
+        # ── Yellow → next phase (fairness, else priority) ───────────────────
+        to_next = in_yellow & (now - yellow_t0 >= yellow)
+        if to_next.any():
+            idx = np.nonzero(to_next)[0]
+            q = queue[idx]
+            queued_sum = prefix[lane_ix, cum_arr][None, :] - prefix[lane_ix[None, :], departed[idx]]
+            avg_wait = np.where(q > 0, now - queued_sum / np.maximum(q, 1), 0.0)
+            score = (p["w_count"][idx, None] * q + p["w_queue"][idx, None] * q
+                     + p["w_wait"][idx, None] * avg_wait)
+            is_current = lane_ix[None, :] == green[idx, None]
+            score[is_current] = -np.inf
+
+            since_green = now - last_green[idx]
+            overdue = (since_green > p["fairness_wait"][idx, None]) & ~is_current
+            fair_wait = np.where(overdue, since_green, -np.inf)
+            nxt = np.where(overdue.any(axis=1), fair_wait.argmax(axis=1), score.argmax(axis=1))
+
+            green[idx] = nxt
+            last_green[idx, nxt] = now
+            phase_t0[idx] = now
+            in_yellow[idx] = False
+
+        # ── Green → yellow once the adaptive duration has elapsed ───────────
+        duration = np.minimum(p["max_green"],
+                              np.maximum(p["base_green"], p["per_vehicle"] * queue[rows, green]))
+        to_yellow = ~in_yellow & ~to_next & (now - phase_t0 >= duration)
+        in_yellow |= to_yellow
+        yellow_t0 = np.where(to_yellow, now, yellow_t0)
+
+        # ── Discharge the green approach ────────────────────────────────────
+        active = ~in_yellow
+        q_green = queue[rows, green]
+        credit = np.where(active, credit + sat_flow * dt, 0.0)
+        n_dep = np.where(active, np.minimum(q_green, np.floor(credit)), 0).astype(np.int64)
+        head = departed[rows, green]
+        departed[rows, green] += n_dep
+        queue[rows, green] -= n_dep
+        credit -= n_dep
+        credit[queue[rows, green] == 0] = 0.0
+
+        # A head vehicle's wait peaks on the last step it was still queued,
+        # so only departing heads (and the final residual queue) can set max_wait.
+        head_wait = np.where(n_dep > 0, (now - dt) - arr_time[green, head], 0.0)
+        np.maximum(max_wait, head_wait, out=max_wait)
+
+        delay += queue.sum(axis=1) * dt
+
+    now = (steps - 1) * dt
+    residual = cum_arr[None, :] - departed
+    final_waits = np.where(residual > 0, now - arr_time[lane_ix[None, :], departed], 0.0)
+    np.maximum(max_wait, final_waits.max(axis=1), out=max_wait)
+
+    total = max(int(arrivals.sum()), 1)
+    return {
+        "avg_delay":      delay / total,
+        "max_wait":       max_wait,
+        "throughput_h":   departed.sum(axis=1) * 3600.0 / max(steps * dt, dt),
+        "residual_queue": residual.sum(axis=1),
+    }
+
+
+def rank_policies(params: Dict[str, np.ndarray], results: Dict[str, np.ndarray],
+                  top: int = 10, max_wait_limit: float = None) -> List[Dict]:
+    """Best policies by average delay, optionally filtered by a max-wait bound."""
+    order = np.argsort(results["avg_delay"], kind="stable")
+    if max_wait_limit is not None:
+        order = [i for i in order if results["max_wait"][i] <= max_wait_limit]
+    out = []
+    for i in list(order)[:top]:
+        row = {k: float(v[i]) for k, v in params.items()}
+        row.update({
+            "avg_delay":      round(float(results["avg_delay"][i]), 2),
+            "max_wait":       round(float(results["max_wait"][i]), 1),
+            "throughput_h":   round(float(results["throughput_h"][i]), 1),
+            "residual_queue": int(results["residual_queue"][i]),
+        })
+        out.append(row)
+    return out
+
+
+# ─── CLI ──────────────────────────────────────────────────────────────────────
+def _parse_grid(text: str) -> Dict[str, List[float]]:
+    grid = {}
+    for part in filter(None, (p.strip() for p in text.split(";"))):
+        key, vals = part.split("=", 1)
+        if key.strip() not in DEFAULT_POLICY:
+            raise SystemExit(f"Unknown parameter '{key}'. Choose from {list(DEFAULT_POLICY)}")
+        grid[key.strip()] = [float(v) for v in vals.split(",")]
+    return grid
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Offline signal-policy simulator")
+    ap.add_argument("--trace", help="CSV trace (time,lane,arrivals|queue); default synthetic Poisson")
+    ap.add_argument("--rates", default="0.15,0.10,0.12,0.05",
+                    help="Poisson arrival rates per lane (veh/s) in PHASE_ORDER")
+    ap.add_argument("--duration", type=float, default=3600.0)
+    ap.add_argument("--dt", type=float, default=1.0)
+    ap.add_argument("--sat-flow", type=float, default=0.5, help="Discharge rate while green (veh/s)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--grid", default="per_vehicle=1,1.5,2,2.5,3;base_green=5,10,15;"
+                                      "max_green=30,45,60;fairness_wait=30,60,90")
+    ap.add_argument("--max-wait-limit", type=float, default=None)
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--validate", action="store_true",
+                    help="Also replay the real SignalOptimizer for comparison")
+    ap.add_argument("--json", help="Write ranked results to this file")
+    args = ap.parse_args(argv)
+
+    if args.trace:
+        arrivals = load_trace(args.trace, args.dt)
+    else:
+        rates = [float(r) for r in args.rates.split(",")]
+        arrivals = poisson_arrivals(rates, args.duration, args.dt, args.seed)
+
+    params = param_grid(**_parse_grid(args.grid))
+    n_policies = len(params["base_green"])
+
+    t0 = time.perf_counter()
+    results = simulate_policies(arrivals, params, args.dt, args.sat_flow)
+    elapsed = time.perf_counter() - t0
+    print(f"[Simulator] {n_policies} policies × {arrivals.shape[0]} steps "
+          f"in {elapsed:.2f}s ({n_policies / max(elapsed, 1e-9):.0f} policies/s)")
+
+    ranked = rank_policies(params, results, args.top, args.max_wait_limit)
+    for row in ranked:
+        print("  " + "  ".join(f"{k}={v}" for k, v in row.items()))
+
+    report = {"policies": ranked}
+    if args.validate:
+        real = simulate_optimizer(arrivals, args.dt, args.sat_flow)
+        model = simulate_policies(arrivals, param_grid(), args.dt, args.sat_flow)
+        report["validation"] = {
+            "real":  real,
+            "model": {k: round(float(v[0]), 2) for k, v in model.items()},
+        }
+        print(f"[Simulator] Real optimizer:   {real}")
+        print(f"[Simulator] Vectorized model: {report['validation']['model']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,10 +11,10 @@ Trade-off: Less robust than DeepSORT but zero additional dependencies.
 import numpy as np
 from typing import List, Dict, Tuple, Optional
 from dataclasses import dataclass, field
-import time
 import sys, os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core import clock
 
 
 @dataclass
@@ -33,8 +33,8 @@ class Track:
     is_ambulance: bool
     
     # Temporal data
-    created_at:      float = field(default_factory=time.time)
-    last_seen:       float = field(default_factory=time.time)
+    created_at:      float = field(default_factory=clock.now)
+    last_seen:       float = field(default_factory=clock.now)
     frames_tracked:  int   = 0
     frames_missing:  int   = 0
     
@@ -50,6 +50,7 @@ class Track:
     wait_start:   Optional[float] = None
     total_wait:   float = 0.0
     is_stopped:   bool = False
+    completed_waits: List[float] = field(default_factory=list)  # Drained by LaneManager
     
     @property
     def w(self):
@@ -66,13 +67,13 @@ class Track:
     @property
     def age(self) -> float:
         """Seconds since this track was first seen."""
-        return time.time() - self.created_at
+        return clock.now() - self.created_at
     
     @property
     def wait_time(self) -> float:
         """Current wait time in seconds (time stopped)."""
         if self.wait_start is not None:
-            return time.time() - self.wait_start + self.total_wait
+            return clock.now() - self.wait_start + self.total_wait
         return self.total_wait
     
     def update_motion(self):
@@ -86,12 +87,14 @@ class Track:
         if self.speed_px < STOP_THRESHOLD:
             if not self.is_stopped:
                 self.is_stopped = True
-                self.wait_start = time.time()
+                self.wait_start = clock.now()
         else:
             if self.is_stopped:
                 self.is_stopped = False
                 if self.wait_start:
-                    self.total_wait += time.time() - self.wait_start
+                    waited = clock.now() - self.wait_start
+                    self.total_wait += waited
+                    self.completed_waits.append(waited)
                     self.wait_start = None
 
 
@@ -102,16 +105,17 @@ class CentroidTracker:
     Maintains active tracks and removes stale ones.
     """
     
-    def __init__(self, max_disappeared: int = 10, max_distance: int = 80):
+    def __init__(self, max_disappeared: int = 10, max_distance: int = 80, first_id: int = 1):
         """
         Args:
             max_disappeared: Frames before a track is removed.
             max_distance: Maximum centroid distance for matching (pixels).
+            first_id: First track id (separate ranges keep several trackers' ids distinct).
         """
         self.max_disappeared = max_disappeared
         self.max_distance    = max_distance
         
-        self._next_id = 1
+        self._next_id = first_id
         self.tracks: Dict[int, Track] = {}   # track_id → Track
     
     def update(self, detections) -> List[Track]:
@@ -183,7 +187,7 @@ class CentroidTracker:
             track.x2, track.y2 = det.x2, det.y2
             track.label        = det.label
             track.is_ambulance = det.is_ambulance
-            track.last_seen    = time.time()
+            track.last_seen    = clock.now()
             track.frames_tracked += 1
             track.frames_missing  = 0
             
@@ -13,6 +13,8 @@ import sys, os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
+from core import clock
+from core.alert_store import AlertStore
 
 
 @dataclass
@@ -22,15 +24,17 @@ class Alert:
     message:     str
     lane:        Optional[str] = None
     severity:    str = "low"  # "low", "medium", "high", "critical"
-    timestamp:   float = field(default_factory=time.time)
+    timestamp:   float = field(default_factory=clock.now)
     acknowledged: bool = False
+    alert_id:    int = 0      # Assigned by AlertStore
     
     @property
     def age(self) -> float:
-        return time.time() - self.timestamp
+        return clock.now() - self.timestamp
     
     def to_dict(self) -> Dict:
         return {
+            "id": self.alert_id,
             "type": self.alert_type,
             "message": self.message,
             "lane": self.lane,
@@ -55,9 +59,10 @@ class TrafficAnalyzer:
     
     MAX_ALERTS = 20
     ALERT_EXPIRY = 30.0  # Seconds before auto-clearing alerts
+    CONGESTION_REALERT = 15.0  # Seconds before re-alerting congestion per lane
     
     def __init__(self):
-        self.alerts:    List[Alert] = []
+        self.alert_store = AlertStore(expiry=self.ALERT_EXPIRY, max_active=self.MAX_ALERTS)
         self.metrics:   Dict = {}
         
         # History for charts
@@ -70,7 +75,7 @@ class TrafficAnalyzer:
         self._accident_cooldown: float = 0.0           # Prevent duplicate alerts
         
         # Session stats
-        self.session_start    = time.time()
+        self.session_start    = clock.now()
         self.total_detected   = 0
         self.total_accidents  = 0
         self.total_emergency  = 0
@@ -80,6 +85,11 @@ class TrafficAnalyzer:
         self._fps_start      = time.time()
         self.current_fps     = 0.0
     
+    @property
+    def alerts(self) -> List[Alert]:
+        """Active (non-expired) alerts, oldest first."""
+        return self.alert_store.active()
+    
     def update(self, tracks, lane_stats: Dict, detections) -> List[Alert]:
         """
         Main analysis tick.
@@ -93,31 +103,36 @@ class TrafficAnalyzer:
             New alerts generated this tick.
         """
         new_alerts: List[Alert] = []
-        now = time.time()
+        now = clock.now()
         
-        # ── FPS tracking ─────────────────────────────────────────────────────
+        # ── FPS tracking (processing rate, so wall time) ─────────────────────
         self._fps_frames += 1
-        fps_elapsed = now - self._fps_start
+        wall = time.time()
+        fps_elapsed = wall - self._fps_start
         if fps_elapsed >= 1.0:
             self.current_fps  = self._fps_frames / fps_elapsed
             self._fps_frames  = 0
-            self._fps_start   = now
+            self._fps_start   = wall
         
         # ── Total detection count ─────────────────────────────────────────────
         vehicle_tracks = [t for t in tracks if t.is_vehicle]
         self.total_detected = max(self.total_detected, len(vehicle_tracks))
         
+        # ── Expire old alerts ─────────────────────────────────────────────────
+        store = self.alert_store
+        store.expire(now)
+        
         # ── Ambulance alerts ─────────────────────────────────────────────────
         for track in tracks:
             if track.is_ambulance:
-                if not any(a.alert_type == "ambulance" for a in self.alerts
-                           if a.age < self.ALERT_EXPIRY):
+                if not store.has_recent("ambulance", now, self.ALERT_EXPIRY, any_lane=True):
                     alert = Alert(
                         alert_type="ambulance",
                         message=f"🚑 AMBULANCE detected in {track.lane or 'unknown'} lane!",
                         lane=track.lane,
                         severity="critical"
                     )
+                    store.add(alert)
                     new_alerts.append(alert)
                     self.total_emergency += 1
         
@@ -125,26 +140,22 @@ class TrafficAnalyzer:
         if now > self._accident_cooldown:
             acc_alert = self._check_accidents(tracks, detections, lane_stats)
             if acc_alert:
+                store.add(acc_alert)
                 new_alerts.append(acc_alert)
                 self._accident_cooldown = now + 10.0  # 10s cooldown
         
         # ── Heavy congestion alert ────────────────────────────────────────────
         for lane_name, stats in lane_stats.items():
             if stats.vehicle_count > 10:
-                if not any(a.alert_type == "congestion" and a.lane == lane_name
-                           for a in self.alerts if a.age < 15.0):
-                    new_alerts.append(Alert(
+                if not store.has_recent("congestion", now, self.CONGESTION_REALERT, lane=lane_name):
+                    alert = Alert(
                         alert_type="congestion",
                         message=f"Heavy congestion in {lane_name} lane ({stats.vehicle_count} vehicles)",
                         lane=lane_name,
                         severity="medium"
-                    ))
-        
-        # ── Maintain alert list ───────────────────────────────────────────────
-        self.alerts = [a for a in self.alerts if a.age < self.ALERT_EXPIRY]
-        self.alerts.extend(new_alerts)
-        if len(self.alerts) > self.MAX_ALERTS:
-            self.alerts = self.alerts[-self.MAX_ALERTS:]
+                    )
+                    store.add(alert)
+                    new_alerts.append(alert)
         
         # ── History recording ─────────────────────────────────────────────────
         entry = {"time": now}
@@ -172,7 +183,7 @@ class TrafficAnalyzer:
         """
         vehicle_tracks = [t for t in tracks if t.is_vehicle]
         person_dets = [d for d in detections if d.is_person]
-        now = time.time()
+        now = clock.now()
 
         if not vehicle_tracks:
             self._pending_collisions.clear()
@@ -345,7 +356,11 @@ class TrafficAnalyzer:
         return inter / max(union, 1)
     
     def _build_metrics(self, tracks, lane_stats: Dict, detections=None) -> Dict:
-        """Build serializable metrics dict for dashboard."""
+        """
+        Build serializable metrics dict for dashboard. One name per value:
+        the old current_fps / vehicle_count / lanes aliases are re-added for
+        protocol-1 clients by backend.state_protocol.legacy_state().
+        """
         vehicle_tracks = [t for t in tracks if t.is_vehicle]
 
         wait_times = [t.wait_time for t in vehicle_tracks]
@@ -370,33 +385,25 @@ class TrafficAnalyzer:
                 "congestion_index": round(s.congestion_index, 3),
                 "queue_length":    s.queue_length,
                 "avg_wait_time":   round(s.avg_wait_time, 1),
+                "wait_p50":        round(s.wait_p50, 1),
+                "wait_p90":        round(s.wait_p90, 1),
+                "wait_p99":        round(s.wait_p99, 1),
+                "waits_completed": s.waits_completed,
+                "queue_wait_p90":  round(s.queue_wait_p90, 1),
                 "congestion_level": s.congestion_level,
                 "ambulance_present": s.ambulance_present,
             }
 
         return {
             "fps":              round(self.current_fps, 1),
-            "current_fps":      round(self.current_fps, 1),
             "total_vehicles":   len(vehicle_tracks),
-            "vehicle_count":    len(vehicle_tracks),
             "total_persons":    sum(1 for t in tracks if t.is_person),
             "ambulance_active": any(t.is_ambulance for t in tracks),
             "avg_wait_sec":     round(avg_wait, 1),
-            "session_uptime":   round(time.time() - self.session_start, 0),
-            "total_alerts":     len(self.alerts),
+            "session_uptime":   round(clock.now() - self.session_start, 0),
+            "total_alerts":     len(self.alert_store),
             "vehicle_types":    vehicle_types,
             "lane_stats":       lane_stats_out,
-            "lanes": {
-                name: {
-                    "vehicles":   s.vehicle_count,
-                    "density":    round(s.density_ratio * 100, 1),
-                    "queue":      s.queue_length,
-                    "avg_wait":   round(s.avg_wait_time, 1),
-                    "congestion": s.congestion_level,
-                    "ambulance":  s.ambulance_present,
-                }
-                for name, s in lane_stats.items()
-            },
         }
     
     def draw_overlay(self, frame, lane_stats: Dict) -> None:
@@ -404,11 +411,10 @@ class TrafficAnalyzer:
         import cv2
         h, w = frame.shape[:2]
         
-        # Bottom bar
+        # Bottom bar: 70% (15, 15, 15) over the frame, blended in place
         bar_h = 50
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (0, h - bar_h), (w, h), (15, 15, 15), -1)
-        cv2.addWeighted(overlay, 0.7, frame, 0.3, 0, frame)
+        bar = frame[h - bar_h:h]
+        cv2.addWeighted(bar, 0.3, bar, 0.0, 15 * 0.7, bar)
         
         stats_items = list(lane_stats.items())
         col_w = w // max(len(stats_items), 1)
@@ -442,11 +448,12 @@ class TrafficAnalyzer:
         if not self.count_history:
             return {}
         
-        now = time.time()
+        now = clock.now()
         labels = [round(now - e["time"], 1) for e in self.count_history]
         
         result = {"labels": labels}
-        for lane in ["North", "South", "East", "West"]:
+        lanes = [k for k in self.count_history[-1] if k != "time"]
+        for lane in lanes:
             result[lane] = [e.get(lane, 0) for e in self.count_history]
         
         return result
\ No newline at end of file
@@ -0,0 +1,181 @@
+"""
+core/wait_sketch.py — Streaming Wait-Time Quantile Sketches
+============================================================
+Constant-memory P50/P90/P99 of completed vehicle waits per lane.
+
+Design: log-bucketed histogram (DDSketch-style). Every value lands in
+bucket ceil(log_gamma(v)), so any quantile is returned within a fixed
+relative error (default 2%) using a few hundred integer counters,
+regardless of how many waits were observed.
+
+Sketches with the same parameters merge by adding their counters, so
+per-camera sketches combine into a junction view and per-slice sketches
+combine into a time window (see RollingWaitSketch).
+"""
+
+import math
+import time
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+
+class WaitSketch:
+    """Mergeable relative-error quantile sketch for wait times (seconds)."""
+
+    def __init__(self, relative_accuracy: float = 0.02,
+                 min_value: float = 0.1, max_value: float = 3600.0):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+
+        self._gamma     = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._offset    = math.ceil(math.log(min_value) / self._log_gamma)
+        # Bucket 0 holds values below min_value, the last bucket values above max_value
+        n_buckets = math.ceil(math.log(max_value) / self._log_gamma) - self._offset + 3
+
+        self.counts = np.zeros(n_buckets, dtype=np.int64)
+        self.count  = 0
+        self.total  = 0.0
+        self.max    = 0.0
+
+    def _index(self, value: float) -> int:
+        if value < self.min_value:
+            return 0
+        idx = math.ceil(math.log(value) / self._log_gamma) - self._offset + 1
+        return min(max(idx, 1), len(self.counts) - 1)
+
+    def _bucket_value(self, idx: int) -> float:
+        if idx == 0:
+            return 0.0
+        if idx == len(self.counts) - 1:
+            return self.max
+        exp = idx + self._offset - 1
+        return 2.0 * self._gamma ** exp / (self._gamma + 1)
+
+    def add(self, value: float, n: int = 1):
+        """Record a wait of `value` seconds (`n` times)."""
+        self.counts[self._index(value)] += n
+        self.count += n
+        self.total += value * n
+        if value > self.max:
+            self.max = value
+
+    def compatible(self, other: "WaitSketch") -> bool:
+        return (self.relative_accuracy == other.relative_accuracy
+                and self.min_value == other.min_value
+                and self.max_value == other.max_value)
+
+    def merge(self, other: "WaitSketch") -> "WaitSketch":
+        """Fold another sketch (e.g. another camera or time slice) into this one."""
+        if not self.compatible(other):
+            raise ValueError("Cannot merge WaitSketches with different parameters")
+        self.counts += other.counts
+        self.count  += other.count
+        self.total  += other.total
+        self.max     = max(self.max, other.max)
+        return self
+
+    def copy(self) -> "WaitSketch":
+        s = WaitSketch(self.relative_accuracy, self.min_value, self.max_value)
+        return s.merge(self)
+
+    def clear(self):
+        self.counts[:] = 0
+        self.count = 0
+        self.total = 0.0
+        self.max   = 0.0
+
+    def quantiles(self, qs: Sequence[float]) -> List[float]:
+        """Values at quantiles qs (0–1); 0.0 for an empty sketch."""
+        if self.count == 0:
+            return [0.0 for _ in qs]
+        cum = np.cumsum(self.counts)
+        out = []
+        for q in qs:
+            rank = q * (self.count - 1)
+            idx  = int(np.searchsorted(cum, rank, side="right"))
+            out.append(min(self._bucket_value(min(idx, len(cum) - 1)), self.max))
+        return out
+
+    def quantile(self, q: float) -> float:
+        return self.quantiles([q])[0]
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self) -> Dict:
+        """Sparse serializable form (for shipping sketches between processes/cameras)."""
+        nz = np.nonzero(self.counts)[0]
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "min_value": self.min_value,
+            "max_value": self.max_value,
+            "buckets":   {int(i): int(self.counts[i]) for i in nz},
+            "count":     self.count,
+            "total":     self.total,
+            "max":       self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "WaitSketch":
+        s = cls(d["relative_accuracy"], d["min_value"], d["max_value"])
+        for idx, n in d["buckets"].items():
+            s.counts[int(idx)] = n
+        s.count = d["count"]
+        s.total = d["total"]
+        s.max   = d["max"]
+        return s
+
+
+class RollingWaitSketch:
+    """
+    Sliding-window sketch: a ring of `slices` WaitSketches, each covering
+    window/slices seconds. Memory stays constant; quantiles cover roughly
+    the last `window` seconds. A lifetime sketch is kept alongside.
+    """
+
+    def __init__(self, window: float = 300.0, slices: int = 10, **sketch_kwargs):
+        self.window    = window
+        self.slice_len = window / slices
+        self._slices   = [WaitSketch(**sketch_kwargs) for _ in range(slices)]
+        self._slice_id = [None] * slices     # absolute slice number held by each ring slot
+        self.lifetime  = WaitSketch(**sketch_kwargs)
+
+        self._cache_key = None
+        self._cache_val: Optional[List[float]] = None
+
+    def _slot(self, now: float) -> int:
+        sid  = int(now // self.slice_len)
+        slot = sid % len(self._slices)
+        if self._slice_id[slot] != sid:
+            self._slices[slot].clear()
+            self._slice_id[slot] = sid
+        return slot
+
+    def add(self, value: float, now: float = None):
+        now = now if now is not None else time.time()
+        self._slices[self._slot(now)].add(value)
+        self.lifetime.add(value)
+
+    def merged(self, now: float = None) -> WaitSketch:
+        """A WaitSketch covering the live window."""
+        now = now if now is not None else time.time()
+        current = int(now // self.slice_len)
+        oldest  = current - len(self._slices) + 1
+        lt  = self.lifetime
+        out = WaitSketch(lt.relative_accuracy, lt.min_value, lt.max_value)
+        for sketch, sid in zip(self._slices, self._slice_id):
+            if sid is not None and oldest <= sid <= current:
+                out.merge(sketch)
+        return out
+
+    def quantiles(self, qs: Sequence[float], now: float = None) -> List[float]:
+        """Window quantiles, cached until a new wait arrives or a slice rolls over."""
+        now = now if now is not None else time.time()
+        key = (self.lifetime.count, int(now // self.slice_len), tuple(qs))
+        if key != self._cache_key:
+            self._cache_val = self.merged(now).quantiles(qs)
+            self._cache_key = key
+        return self._cache_val
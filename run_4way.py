@@ -3,6 +3,7 @@ run_4way.py — Launcher for the 4-Way Split Screen Web Dashboard
 ================================================================
 Usage:
   python run_4way.py --v_north north.mp4 --v_south south.mp4 --v_east east.mp4 --v_west west.mp4
+  python run_4way.py --topology topologies/example.json
 """
 
 import subprocess
@@ -21,6 +22,8 @@ def parse_args():
     p.add_argument("--v_south", type=str, default="ambulance.mp4")
     p.add_argument("--v_east",  type=str, default="vehicle-collision.mp4")
     p.add_argument("--v_west",  type=str, default="south.mp4")
+    p.add_argument("--topology", type=str, default=None,
+                   help="Camera/junction topology file (JSON or YAML); overrides --v_*")
     p.add_argument("--port",    type=int, default=8000)
     p.add_argument("--host",    type=str, default="0.0.0.0")
     p.add_argument("--no-browser", action="store_true")
@@ -42,7 +45,8 @@ def main():
     
     import uvicorn
     from backend import main_4way
-    main_4way.init_processor(args.v_north, args.v_south, args.v_east, args.v_west)
+    main_4way.init_processor(args.v_north, args.v_south, args.v_east, args.v_west,
+                              topology=args.topology)
     
     uvicorn.run(main_4way.app, host=args.host, port=args.port, log_level="info")
 
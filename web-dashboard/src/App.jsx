@@ -6,6 +6,14 @@ import DetectionStats from './components/DetectionStats';
 import LaneAnalytics from './components/LaneAnalytics';
 import Alerts from './components/Alerts';
 import IncidentMonitor from './components/IncidentMonitor';
+import { createStateReceiver } from './stateProtocol';
+
+// Topics each view needs, with max rates in Hz (0 = every change)
+function topicsFor(view) {
+  return view === 'dashboard'
+    ? { metrics: 10, signals: 0, alerts: 0 }
+    : { metrics: 2, incidents: 0 };
+}
 
 function App() {
   const [currentView, setCurrentView] = useState('dashboard');
@@ -13,9 +21,9 @@ function App() {
     metrics: {},
     signals: {},
     alerts: [],
-    frame_b64: null,
   });
 
+  const [liveAlerts, setLiveAlerts] = useState([]);
   const [isConnected, setIsConnected] = useState(false);
   const startTime = useRef(Date.now());
   const [uptime, setUptime] = useState('00:00');
@@ -31,13 +39,30 @@ function App() {
     return () => clearInterval(t);
   }, []);
 
+  const topicsRef = useRef(topicsFor(currentView));
+  const wsRef = useRef(null);
+
+  useEffect(() => {
+    // Switch subscriptions in place; the server sends snapshots for new topics
+    const topics = topicsFor(currentView);
+    topicsRef.current = topics;
+    const ws = wsRef.current;
+    if (ws && ws.readyState === WebSocket.OPEN) {
+      ws.send(JSON.stringify({ type: 'subscribe', topics }));
+    }
+  }, [currentView]);
+
   useEffect(() => {
     let ws;
     let wsRetries = 0;
 
     function connectWS() {
       // Connect to the fastapi backend
-      ws = new WebSocket(`ws://${window.location.hostname}:8000/ws`);
+      // Protocol 2: per-topic snapshot on subscribe, then patches with only what changed
+      const spec = Object.entries(topicsRef.current).map(([t, hz]) => `${t}:${hz}`).join(',');
+      ws = new WebSocket(`ws://${window.location.hostname}:8000/ws?proto=2&topics=${spec}`);
+      wsRef.current = ws;
+      const receive = createStateReceiver();
 
       ws.onopen = () => {
         setIsConnected(true);
@@ -46,8 +71,10 @@ function App() {
 
       ws.onmessage = (evt) => {
         try {
-          const data = JSON.parse(evt.data);
-          setState(data);
+          const update = receive(JSON.parse(evt.data));
+          if (!update) return;
+          if (update.state === null) ws.send(JSON.stringify({ type: 'resync', topic: update.topic }));
+          else setState(prev => ({ ...prev, [update.topic]: update.state }));
         } catch (e) {
           console.error("Failed to parse websocket message", e);
         }
@@ -69,6 +96,25 @@ function App() {
     };
   }, []);
 
+  useEffect(() => {
+    // Alerts arrive here as soon as they are raised; EventSource resumes via Last-Event-ID
+    const es = new EventSource(`http://${window.location.hostname}:8000/api/alerts/stream`);
+    es.addEventListener('alert', (evt) => {
+      try {
+        const alert = JSON.parse(evt.data);
+        setLiveAlerts(prev => [...prev, alert].slice(-5));
+      } catch (e) {
+        console.error("Failed to parse alert event", e);
+      }
+    });
+    return () => es.close();
+  }, []);
+
+  // State alerts are authoritative; live alerts fill the gap until the next state push
+  const stateAlerts = state.alerts || [];
+  const lastStateId = stateAlerts.reduce((m, a) => Math.max(m, a.id || 0), 0);
+  const alerts = [...stateAlerts, ...liveAlerts.filter(a => a.id > lastStateId)].slice(-5);
+
   return (
     <>
       <Header
@@ -83,18 +129,18 @@ function App() {
         {currentView === 'dashboard' ? (
           <>
             <section className="video-section">
-              <VideoPlayer frameB64={state.frame_b64} fps={state.metrics?.current_fps} />
+              <VideoPlayer fps={state.metrics?.fps} />
             </section>
 
             <aside className="sidebar">
               <SignalPanel signals={state.signals} laneStats={state.metrics?.lane_stats} />
               <DetectionStats vehicleTypes={state.metrics?.vehicle_types} />
               <LaneAnalytics laneStats={state.metrics?.lane_stats} />
-              <Alerts alerts={state.alerts} />
+              <Alerts alerts={alerts} />
             </aside>
           </>
         ) : (
-          <IncidentMonitor />
+          <IncidentMonitor summaries={state.incidents} />
         )}
       </main>
     </>
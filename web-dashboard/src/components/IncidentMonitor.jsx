@@ -1,28 +1,58 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 
-export default function IncidentMonitor() {
+const API = `http://${window.location.hostname}:8000/api/incidents`;
+const MAX_INCIDENTS = 15;
+
+export default function IncidentMonitor({ summaries }) {
     const [incidents, setIncidents] = useState([]);
     const [loading, setLoading] = useState(true);
+    const lastId = useRef(0);
+    const epoch = useRef(null);
+    const inFlight = useRef(false);
+    const again = useRef(false);
 
     useEffect(() => {
         const fetchIncidents = async () => {
+            // One request at a time: overlapping ones would share a cursor
+            if (inFlight.current) {
+                again.current = true;
+                return;
+            }
+            inFlight.current = true;
             try {
-                const res = await fetch(`http://${window.location.hostname}:8000/api/incidents`);
+                // Metadata only, and only what we have not seen; images load by URL
+                const res = await fetch(`${API}?since=${lastId.current}&epoch=${epoch.current ?? ''}`);
                 if (res.ok) {
-                    const data = await res.json();
-                    setIncidents(data);
+                    const { epoch: current, incidents: data } = await res.json();
+                    if (current !== epoch.current) {
+                        // New store (ids restarted): drop the cursor and what we had
+                        epoch.current = current;
+                        lastId.current = 0;
+                        setIncidents([]);
+                    }
+                    if (data.length > 0) {
+                        lastId.current = Math.max(lastId.current, ...data.map(i => i.id));
+                        setIncidents(prev => {
+                            const known = new Set(prev.map(i => i.id));
+                            return [...data.filter(i => !known.has(i.id)), ...prev].slice(0, MAX_INCIDENTS);
+                        });
+                    }
                 }
             } catch (err) {
                 console.error("Failed to fetch incidents", err);
             } finally {
                 setLoading(false);
+                inFlight.current = false;
+                if (again.current) {
+                    again.current = false;
+                    fetchIncidents();
+                }
             }
         };
 
+        // Refetch only when the "incidents" topic changes
         fetchIncidents();
-        const interval = setInterval(fetchIncidents, 2000);
-        return () => clearInterval(interval);
-    }, []);
+    }, [summaries]);
 
     const getTypeColor = (type) => {
         switch (type) {
@@ -67,20 +97,17 @@ export default function IncidentMonitor() {
                 </div>
             ) : (
                 <div style={{ display: 'grid', gridTemplateColumns: 'repeat(auto-fill, minmax(350px, 1fr))', gap: '20px' }}>
-                    {incidents.map((incident, idx) => (
-                        <div key={idx} className="glass-panel" style={{ overflow: 'hidden', display: 'flex', flexDirection: 'column' }}>
+                    {incidents.map((incident) => (
+                        <div key={`${incident.epoch}-${incident.id}`} className="glass-panel" style={{ overflow: 'hidden', display: 'flex', flexDirection: 'column' }}>
                             <div style={{ position: 'relative', height: '200px', background: '#000' }}>
-                                {incident.frame_b64 ? (
+                                <a href={`${API}/${incident.id}/image?epoch=${incident.epoch}`} target="_blank" rel="noreferrer">
                                     <img
-                                        src={`data:image/jpeg;base64,${incident.frame_b64}`}
+                                        src={`${API}/${incident.id}/image?epoch=${incident.epoch}&thumb=true`}
                                         alt="Incident Snapshot"
+                                        loading="lazy"
                                         style={{ width: '100%', height: '100%', objectFit: 'cover' }}
                                     />
-                                ) : (
-                                    <div style={{ display: 'flex', height: '100%', alignItems: 'center', justifyContent: 'center', color: 'var(--muted)' }}>
-                                        No Image Provided
-                                    </div>
-                                )}
+                                </a>
                                 <div style={{
                                     position: 'absolute', top: '12px', right: '12px',
                                     background: 'rgba(0,0,0,0.7)', backdropFilter: 'blur(4px)',
@@ -1,5 +1,6 @@
 export default function LaneAnalytics({ laneStats = {} }) {
-    const lanes = ['North', 'South', 'East', 'West'];
+    const names = Object.keys(laneStats);
+    const lanes = names.length ? names : ['North', 'South', 'East', 'West'];
 
     return (
         <div className="glass-panel" style={{ padding: '16px' }}>
@@ -21,7 +22,7 @@ export default function LaneAnalytics({ laneStats = {} }) {
                     if (density >= 40) barColor = 'var(--yellow)';
                     if (density >= 75) barColor = 'var(--red)';
 
-                    const nameColor = `var(--${lane.toLowerCase()})`;
+                    const nameColor = `var(--${lane.toLowerCase()}, var(--text))`;
 
                     return (
                         <div key={lane}>
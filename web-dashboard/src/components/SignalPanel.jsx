@@ -1,6 +1,7 @@
 export default function SignalPanel({ signals, laneStats }) {
     const data = signals?.signals || {};
-    const lanes = ['North', 'South', 'East', 'West'];
+    const names = Object.keys(data);
+    const lanes = names.length ? names : ['North', 'South', 'East', 'West'];
 
     return (
         <div className="glass-panel" style={{ padding: '16px' }}>
@@ -72,7 +73,7 @@ export default function SignalPanel({ signals, laneStats }) {
 
                                 {/* Info block */}
                                 <div style={{ flex: 1 }}>
-                                    <div style={{ fontSize: '14px', fontWeight: '800', textTransform: 'uppercase', letterSpacing: '1px', color: `var(--${lane.toLowerCase()})` }}>
+                                    <div style={{ fontSize: '14px', fontWeight: '800', textTransform: 'uppercase', letterSpacing: '1px', color: `var(--${lane.toLowerCase()}, var(--text))` }}>
                                         {lane}
                                     </div>
                                     <div style={{ fontSize: '10px', fontWeight: '600', textTransform: 'uppercase', color: stColor }}>
@@ -1,17 +1,54 @@
-import { useEffect, useRef } from 'react';
+import { useEffect, useRef, useState } from 'react';
 
-export default function VideoPlayer({ frameB64, fps }) {
+// Binary frame header — keep in sync with backend/frame_protocol.py
+const HEADER_SIZE = 20;
+const MAGIC = 0x4d524654; // "TFRM" read as little-endian uint32
+
+export default function VideoPlayer({ fps }) {
     const imgRef = useRef(null);
+    const urlRef = useRef(null);
+    const [hasFrame, setHasFrame] = useState(false);
 
     useEffect(() => {
-        if (frameB64 && imgRef.current) {
-            imgRef.current.src = `data:image/jpeg;base64,${frameB64}`;
-        }
-    }, [frameB64]);
+        let ws;
+        let reconnectTimer;
+        let closed = false;
+
+        const connect = () => {
+            ws = new WebSocket(`ws://${window.location.hostname}:8000/ws/video`);
+            ws.binaryType = 'arraybuffer';
+
+            ws.onmessage = (evt) => {
+                if (!(evt.data instanceof ArrayBuffer) || evt.data.byteLength <= HEADER_SIZE) return;
+                const view = new DataView(evt.data);
+                if (view.getUint32(0, true) !== MAGIC) return;
+
+                const blob = new Blob([new Uint8Array(evt.data, HEADER_SIZE)], { type: 'image/jpeg' });
+                const url = URL.createObjectURL(blob);
+                if (imgRef.current) imgRef.current.src = url;
+                if (urlRef.current) URL.revokeObjectURL(urlRef.current);
+                urlRef.current = url;
+                setHasFrame(true);
+            };
+
+            ws.onclose = () => {
+                if (!closed) reconnectTimer = setTimeout(connect, 2000);
+            };
+            ws.onerror = () => ws.close();
+        };
+
+        connect();
+        return () => {
+            closed = true;
+            clearTimeout(reconnectTimer);
+            if (ws) ws.close();
+            if (urlRef.current) URL.revokeObjectURL(urlRef.current);
+        };
+    }, []);
 
     return (
         <div style={{ width: '100%', height: '100%', position: 'relative' }}>
-            {!frameB64 ? (
+            {!hasFrame && (
                 <div style={{
                     position: 'absolute', inset: 0, display: 'flex',
                     flexDirection: 'column', alignItems: 'center',
@@ -20,13 +57,13 @@ export default function VideoPlayer({ frameB64, fps }) {
                     <div style={{ fontSize: '48px', marginBottom: '16px' }}>📷</div>
                     <p style={{ fontSize: '14px' }}>Waiting for video stream...</p>
                 </div>
-            ) : (
-                <img
-                    ref={imgRef}
-                    className="video-feed"
-                    alt="Live Traffic Feed"
-                />
             )}
+            <img
+                ref={imgRef}
+                className="video-feed"
+                alt="Live Traffic Feed"
+                style={{ display: hasFrame ? undefined : 'none' }}
+            />
 
             {/* Camera Badge Overlay */}
             <div className="glass-panel" style={{
@@ -0,0 +1,56 @@
+// Client side of the /ws?proto=2 state protocol — see backend/state_protocol.py
+
+function merge(target, changes) {
+  const out = { ...target };
+  for (const [key, value] of Object.entries(changes)) {
+    const prev = out[key];
+    const bothObjects = value && typeof value === 'object' && !Array.isArray(value)
+      && prev && typeof prev === 'object' && !Array.isArray(prev);
+    out[key] = bothObjects ? merge(prev, value) : value;
+  }
+  return out;
+}
+
+export function applyPatch(state, changes, deletions = []) {
+  const out = merge(state, changes);
+  for (const path of deletions) {
+    // merge() already copied every object along a changed path; copy the rest
+    let node = out;
+    for (const key of path.slice(0, -1)) {
+      if (!node[key] || typeof node[key] !== 'object') { node = null; break; }
+      node[key] = { ...node[key] };
+      node = node[key];
+    }
+    if (node) delete node[path[path.length - 1]];
+  }
+  return out;
+}
+
+/**
+ * Feed decoded messages in order. Returns { topic, state } with the new
+ * full value of that topic; { topic, state: null } once when a patch
+ * doesn't apply to what we hold (caller should send a resync for the
+ * topic); undefined while waiting for that snapshot.
+ */
+export function createStateReceiver() {
+  const topics = {};   // topic → { seq, state }
+  return (msg) => {
+    const topic = msg.topic || 'state';
+    const held = topics[topic];
+    if (msg.type === 'snapshot') {
+      topics[topic] = { seq: msg.seq, state: msg.state };
+      return { topic, state: msg.state };
+    }
+    if (msg.type === 'patch') {
+      if (!held) return undefined;
+      if (msg.base !== held.seq) {
+        delete topics[topic];
+        return { topic, state: null };
+      }
+      const state = applyPatch(held.state, msg.patch, msg.del);
+      topics[topic] = { seq: msg.seq, state };
+      return { topic, state };
+    }
+    return undefined;
+  };
+}